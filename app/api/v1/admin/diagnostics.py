@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends
+
+from app.core.authorization import require_permission
+from app.core.metrics import metrics
+from app.core.query_advisor import query_advisor
+from app.schemas.responses import ApiResponse
+
+router = APIRouter()
+
+
+@router.get(
+    "/queries", dependencies=[Depends(require_permission("diagnostics", "read"))]
+)
+async def get_query_diagnostics():
+    if not query_advisor.enabled:
+        return ApiResponse.not_found("Query diagnostics are disabled")
+
+    return ApiResponse.ok(data=query_advisor.report())
+
+
+@router.delete(
+    "/queries", dependencies=[Depends(require_permission("diagnostics", "delete"))]
+)
+async def reset_query_diagnostics():
+    query_advisor.reset()
+
+    return ApiResponse.ok("Query diagnostics cleared")
+
+
+@router.get(
+    "/statements", dependencies=[Depends(require_permission("diagnostics", "read"))]
+)
+async def get_statements():
+    """The SQL behind each `query_id` label of /metrics."""
+    return ApiResponse.ok(
+        data=[
+            {
+                "query_id": stats.query_id,
+                "statement": stats.statement,
+                "calls": stats.latency.count,
+                "total_seconds": stats.latency.sum,
+                "rows": stats.rows,
+                "errors": stats.errors,
+            }
+            for stats in metrics.queries()
+        ]
+    )
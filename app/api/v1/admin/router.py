@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from . import diagnostics
+
+
+admin_router = APIRouter(prefix="/admin", tags=["Administration"])
+
+admin_router.include_router(
+    diagnostics.router, prefix="/diagnostics", tags=["diagnostics"]
+)
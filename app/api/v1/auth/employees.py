@@ -1,33 +1,102 @@
-from fastapi import APIRouter, Query
-from typing import Optional
+from fastapi import APIRouter, Header, Query, Request
+from typing import List, Literal, Optional
 
-from app.schemas.employees import CreateEmployeeSchema, UpdateEmployeeSchema
+from app.config.database import RequestDB
+from app.schemas.employees import (
+    BulkPatchEmployee,
+    CreateEmployeeSchema,
+    PatchEmployeeSchema,
+    UpdateEmployeeSchema,
+)
+from app.modules.auth.employees.search import SEARCH_MAX_LENGTH, SEARCH_MIN_LENGTH
 from app.modules.auth.employees.service import EmployeeService
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter()
 
 
 @router.get("")
 async def get_employees(
+    db: RequestDB,
     first_name: Optional[str] = Query(None),
     email: Optional[str] = Query(None),
     last_name: Optional[str] = Query(None),
     phone: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+):
+    service = EmployeeService(db)
+
+    return await service.get(
+        first_name, last_name, email, phone, limit, cursor, if_none_match
+    )
+
+
+@router.get("/search")
+async def search_employees(
+    db: RequestDB,
+    q: str = Query(..., min_length=SEARCH_MIN_LENGTH, max_length=SEARCH_MAX_LENGTH),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+):
+    service = EmployeeService(db)
+
+    return await service.search(q, limit, cursor)
+
+
+@router.get("/stream")
+async def stream_employees(
+    first_name: Optional[str] = Query(None),
+    email: Optional[str] = Query(None),
+    last_name: Optional[str] = Query(None),
+    phone: Optional[str] = Query(None),
+    format: Literal["ndjson", "json"] = Query("ndjson"),
 ):
     service = EmployeeService()
 
-    return await service.get(first_name, last_name, email, phone)
+    return service.stream(first_name, last_name, email, phone, format)
 
 
 @router.post("")
-async def create_employee(payload: CreateEmployeeSchema):
-    service = EmployeeService()
+async def create_employee(payload: CreateEmployeeSchema, db: RequestDB):
+    service = EmployeeService(db)
 
     return await service.create(payload)
 
 
-@router.put("")
-async def upload_employee(payload: UpdateEmployeeSchema):
+@router.post("/bulk")
+async def bulk_create_employees(request: Request):
     service = EmployeeService()
 
+    return await service.bulk_create(
+        request.headers.get("content-type", ""), await request.body()
+    )
+
+
+@router.put("")
+async def upload_employee(payload: UpdateEmployeeSchema, db: RequestDB):
+    service = EmployeeService(db)
+
     return await service.update(payload)
+
+
+# registered before /{id}, which would otherwise match "bulk"
+@router.patch("/bulk")
+async def bulk_patch_employees(items: List[BulkPatchEmployee], db: RequestDB):
+    service = EmployeeService(db)
+
+    return await service.bulk_patch(items)
+
+
+@router.patch("/{id}")
+async def patch_employee(
+    id: int,
+    payload: PatchEmployeeSchema,
+    db: RequestDB,
+    if_match: Optional[str] = Header(None),
+    fields: Optional[str] = Query(None),
+):
+    service = EmployeeService(db)
+
+    return await service.patch(id, payload, if_match, fields)
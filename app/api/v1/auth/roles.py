@@ -1,31 +1,65 @@
-from fastapi import APIRouter, Query
-from typing import Optional
+from fastapi import APIRouter, Header, Query
+from typing import List, Optional
 
+from app.config.database import RequestDB
 from app.modules.auth.roles.service import RoleService
-from app.schemas.auth import CreateRole, UpdateRole
+from app.schemas.auth import BulkPatchRole, CreateRole, PatchRole, UpdateRole
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter()
 
 
-@router.get("check")
-async def check_role(name=Query(...)):
-    service = RoleService()
-    return await service.check_name(name)
+@router.get("/check")
+async def check_role(
+    db: RequestDB,
+    name=Query(...),
+    if_none_match: Optional[str] = Header(None),
+):
+    service = RoleService(db)
+    return await service.check_name(name, if_none_match)
 
 
 @router.get("")
-async def get_roles(name: Optional[str] = None, is_active: Optional[bool] = None):
-    service = RoleService()
-    return await service.get(name, is_active)
+async def get_roles(
+    db: RequestDB,
+    name: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+):
+    service = RoleService(db)
+    return await service.get(name, is_active, limit, cursor, if_none_match)
 
 
 @router.post("")
-async def create_role(data: CreateRole):
-    service = RoleService()
-    return await service.create(data.name, data.description, data.is_active)
+async def create_role(data: CreateRole, db: RequestDB):
+    service = RoleService(db)
+    return await service.create(
+        data.name, data.description, data.is_active, data.permission_ids
+    )
 
 
 @router.put("")
-async def update_role(data: UpdateRole):
-    service = RoleService()
+async def update_role(data: UpdateRole, db: RequestDB):
+    service = RoleService(db)
     return await service.update(data.id, data.name, data.description, data.is_active)
+
+
+# registered before /{id}, which would otherwise match "bulk"
+@router.patch("/bulk")
+async def bulk_patch_roles(items: List[BulkPatchRole], db: RequestDB):
+    service = RoleService(db)
+    return await service.bulk_patch(items)
+
+
+@router.patch("/{id}")
+async def patch_role(
+    id: int,
+    data: PatchRole,
+    db: RequestDB,
+    if_match: Optional[str] = Header(None),
+    fields: Optional[str] = Query(None),
+):
+    service = RoleService(db)
+    return await service.patch(id, data, if_match, fields)
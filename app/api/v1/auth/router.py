@@ -1,9 +1,23 @@
-from fastapi import APIRouter
-from . import roles, employees
+from fastapi import APIRouter, Depends
+
+from app.core.security import get_current_employee
+from . import roles, employees, session
 
 
 auth_router = APIRouter(prefix="/auth", tags=["Authentication & Authorization"])
 
-auth_router.include_router(roles.router, prefix="/roles", tags=["roles"])
+auth_router.include_router(session.router, tags=["session"])
+
+auth_router.include_router(
+    roles.router,
+    prefix="/roles",
+    tags=["roles"],
+    dependencies=[Depends(get_current_employee)],
+)
 
-auth_router.include_router(employees.router, prefix="/employees", tags=["employees"])
+auth_router.include_router(
+    employees.router,
+    prefix="/employees",
+    tags=["employees"],
+    dependencies=[Depends(get_current_employee)],
+)
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+
+from app.modules.auth.session.service import SessionService
+from app.schemas.auth import LoginSchema
+
+router = APIRouter()
+
+
+@router.post("/login")
+async def login(payload: LoginSchema):
+    service = SessionService()
+    return await service.login(payload)
@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 
 
+from .admin.router import admin_router
 from .auth.router import auth_router
 
 api_router = APIRouter()
 
 api_router_auth = api_router.include_router(auth_router)
+api_router.include_router(admin_router)
@@ -1,11 +1,22 @@
+import asyncio
 from logging import getLogger
+from time import perf_counter
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Optional
+from typing import Annotated, Any, AsyncGenerator, Dict, Optional
 
 import asyncpg
-from fastapi import HTTPException, status
+from fastapi import Depends, HTTPException, status
 
+from app.config.pool import AdaptiveLimiter, AdaptivePoolController, pool_bounds
+from app.config.replicas import (
+    ReplicaPool,
+    ReplicaSet,
+    parse_replica_hosts,
+    reads_pinned_to_primary,
+)
+from app.core.metrics import metrics
 from app.core.settings import settings
+from app.database.warmup import warm_pool
 
 logger = getLogger(__name__)
 
@@ -13,24 +24,68 @@ logger = getLogger(__name__)
 class DatabaseManager:
     def __init__(self):
         self.pool: Optional[asyncpg.Pool] = None
+        self.limiter: Optional[AdaptiveLimiter] = None
+        self.controller: Optional[AdaptivePoolController] = None
+        self.replicas = ReplicaSet(
+            [
+                ReplicaPool(host, port)
+                for host, port in parse_replica_hosts(settings.DB_REPLICA_HOSTS)
+            ]
+        )
+        self.__replica_leases: Dict[asyncpg.Connection, ReplicaPool] = {}
+        self.__held_since: Dict[asyncpg.Connection, float] = {}
+        # moving average of how long a primary connection stays acquired
+        self.__hold_time = 0.0
+
+    @staticmethod
+    def _pool_options() -> Dict[str, Any]:
+        return {
+            "user": settings.DB_USER,
+            "password": settings.DB_PASSWORD,
+            "database": settings.DB_NAME,
+            "command_timeout": 60,
+            "max_queries": 50000,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "max_inactive_connection_lifetime": 300.0,  # 5 minutos
+        }
 
     async def connect(self):
+        bounds = pool_bounds()
         try:
-            self.pool = await asyncpg.create_pool(
-                host=settings.DB_HOST,
-                port=settings.DB_PORT,
-                user=settings.DB_USER,
-                password=settings.DB_PASSWORD,
-                database=settings.DB_NAME,
-                command_timeout=60,
-                min_size=1 if settings.ENVIRONMENT == "dev" else 5,
-                max_size=5 if settings.ENVIRONMENT == "dev" else 20,
-                max_queries=50000,
-                max_inactive_connection_lifetime=300.0,  # 5 minutos
+            # a replica that is down only leaves reads on the primary
+            self.pool, _ = await asyncio.gather(
+                asyncpg.create_pool(
+                    host=settings.DB_HOST,
+                    port=settings.DB_PORT,
+                    min_size=bounds["min_size"],
+                    max_size=bounds["max_size"],
+                    **self._pool_options(),
+                ),
+                self.replicas.connect(
+                    min_size=1,
+                    max_size=settings.DB_REPLICA_POOL_MAX_SIZE or bounds["max_size"],
+                    **self._pool_options(),
+                ),
             )
             logger.info(
-                f"Database connection pool initialized for {settings.ENVIRONMENT}"
+                f"Database connection pool initialized for {settings.ENVIRONMENT} "
+                f"(min={bounds['min_size']}, max={bounds['max_size']})"
+            )
+
+            # without the adaptive controller the limit stays at max_size
+            initial_limit = (
+                bounds["min_size"] if settings.DB_POOL_ADAPTIVE else bounds["max_size"]
+            )
+            self.limiter = AdaptiveLimiter(max(1, initial_limit))
+            self.controller = AdaptivePoolController(
+                self.limiter,
+                min_size=max(1, bounds["min_size"]),
+                max_size=bounds["max_size"],
+                target_wait=settings.DB_POOL_TARGET_WAIT_MS / 1000,
+                interval=settings.DB_POOL_ADJUST_INTERVAL_SECONDS,
             )
+            if settings.DB_POOL_ADAPTIVE:
+                self.controller.start()
 
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
@@ -39,28 +94,131 @@ class DatabaseManager:
                 detail="Database connection failed",
             )
 
+    async def warm_up(self) -> int:
+        """
+        Caches the hot statements on the connections the primary and every
+        replica pool opened at creation, each pool up to its own min_size.
+        """
+        pools = [self.pool] + [
+            replica.pool for replica in self.replicas.replicas if replica.pool
+        ]
+        warmed = await asyncio.gather(*(warm_pool(pool) for pool in pools))
+        return sum(warmed)
+
+    async def create_connection(self) -> asyncpg.Connection:
+        """Standalone connection outside the pool, for LISTEN and side work."""
+        return await asyncpg.connect(
+            host=settings.DB_HOST,
+            port=settings.DB_PORT,
+            user=settings.DB_USER,
+            password=settings.DB_PASSWORD,
+            database=settings.DB_NAME,
+        )
+
+    async def acquire(self, readonly: bool = False) -> asyncpg.Connection:
+        """
+        Primary connection by default. With readonly=True a healthy replica is
+        used, unless the request asked to read its own writes and has written.
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+
+        if readonly and not reads_pinned_to_primary():
+            replica = self.replicas.pick()
+            if replica is not None:
+                start = perf_counter()
+                conn = await replica.acquire()
+                metrics.observe_acquire(perf_counter() - start)
+                self.__replica_leases[conn] = replica
+                return conn
+
+        start = perf_counter()
+        await self.limiter.acquire(priority=not readonly)
+        try:
+            conn = await self.pool.acquire()
+        except BaseException:
+            self.limiter.release()
+            raise
+
+        now = perf_counter()
+        metrics.observe_acquire(now - start)
+        self.controller.record_wait(now - start)
+        self.__held_since[conn] = now
+        return conn
+
+    async def release(self, conn: asyncpg.Connection):
+        replica = self.__replica_leases.pop(conn, None)
+        if replica is not None:
+            await replica.release(conn)
+            return
+
+        held_since = self.__held_since.pop(conn, None)
+        if held_since is not None:
+            hold = perf_counter() - held_since
+            self.__hold_time += 0.1 * (hold - self.__hold_time)
+
+        try:
+            await self.pool.release(conn)
+        finally:
+            self.limiter.release()
+
+    def estimated_wait(self, readonly: bool = False) -> float:
+        """
+        Seconds an acquire made now would queue, on the pool acquire() would
+        hand it out from: the waiters ahead of it are served `limit` at a
+        time, and each holds its connection for the average hold time. On
+        the primary, writes only queue behind other writes.
+        """
+        if readonly and not reads_pinned_to_primary():
+            replica = self.replicas.peek()
+            if replica is not None:
+                return replica.estimated_wait()
+
+        if not self.limiter or self.limiter.in_use < self.limiter.limit:
+            return 0.0
+
+        ahead = self.limiter.waiters_ahead(priority=not readonly)
+        return (ahead + 1) / self.limiter.limit * self.__hold_time
+
+    def is_replica(self, conn: asyncpg.Connection) -> bool:
+        return conn in self.__replica_leases
+
+    def pool_stats(self) -> Dict[str, Any]:
+        if not self.pool:
+            return {}
+
+        size = self.pool.get_size()
+        idle = self.pool.get_idle_size()
+        return {
+            **self.controller.stats(),
+            "size": size,
+            "idle": idle,
+            "replicas": self.replicas.stats(),
+        }
+
     async def disconnect(self):
+        if self.controller:
+            await self.controller.stop()
+
+        await self.replicas.close()
+
         if self.pool:
             await self.pool.close()
             logger.info("Database connection pool closed")
 
     @asynccontextmanager
-    async def get_connection(self) -> AsyncGenerator[asyncpg.Connection, None]:
-        if not self.pool:
-            raise RuntimeError("Database not connected")
-
-        conn = await self.pool.acquire()
+    async def get_connection(
+        self, readonly: bool = False
+    ) -> AsyncGenerator[asyncpg.Connection, None]:
+        conn = await self.acquire(readonly)
         try:
             yield conn
         finally:
-            await self.pool.release(conn)
+            await self.release(conn)
 
     @asynccontextmanager
     async def get_transaction(self) -> AsyncGenerator[asyncpg.Connection, None]:
-        if not self.pool:
-            raise RuntimeError("Database not connected")
-
-        conn = await self.pool.acquire()
+        conn = await self.acquire()
         trans = None
         try:
             trans = conn.transaction()
@@ -74,7 +232,7 @@ class DatabaseManager:
                 logger.error(f"Transaction rolled back due to error {e}")
             raise
         finally:
-            await self.pool.release(conn)
+            await self.release(conn)
 
     async def health_check(self) -> bool:
         try:
@@ -88,11 +246,85 @@ class DatabaseManager:
 db_manager: DatabaseManager = DatabaseManager()
 
 
-async def get_db_connection() -> AsyncGenerator[asyncpg.Connection, None]:
-    async for conn in db_manager.get_connection():
-        yield conn
+class RequestConnection:
+    """
+    Connection scope shared by every service of one request. Nothing is
+    acquired until the first query, and that connection is reused by every
+    query after it, so a handler pays one pool acquire instead of one per
+    query. Reads may start on a replica; the first write takes a primary
+    connection that also serves the reads after it.
+
+    With transactional=True everything runs on the primary inside a single
+    transaction, committed when the handler returns and rolled back when it
+    raises. Queries on one scope must run one after another, never gathered.
+    """
+
+    def __init__(self, manager: DatabaseManager, transactional: bool = False):
+        self._manager = manager
+        self.transactional = transactional
+        self.__primary: Optional[asyncpg.Connection] = None
+        self.__replica: Optional[asyncpg.Connection] = None
+        self.__transaction = None
+
+    async def acquire(self, readonly: bool = False) -> asyncpg.Connection:
+        if self.__primary is not None:
+            return self.__primary
+
+        if readonly and not self.transactional:
+            if self.__replica is not None:
+                return self.__replica
+
+            conn = await self._manager.acquire(readonly=True)
+            if self._manager.is_replica(conn):
+                self.__replica = conn
+            else:
+                self.__primary = conn
+            return conn
+
+        self.__primary = await self._manager.acquire()
+        if self.transactional:
+            self.__transaction = self.__primary.transaction()
+            await self.__transaction.start()
+        return self.__primary
+
+    async def close(self, failed: bool = False):
+        try:
+            if self.__transaction is not None:
+                transaction, self.__transaction = self.__transaction, None
+                if failed:
+                    await transaction.rollback()
+                else:
+                    await transaction.commit()
+        finally:
+            for conn in (self.__replica, self.__primary):
+                if conn is not None:
+                    await self._manager.release(conn)
+            self.__replica = self.__primary = None
+
+
+async def get_request_connection() -> AsyncGenerator[RequestConnection, None]:
+    db = RequestConnection(db_manager)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_request_transaction() -> AsyncGenerator[RequestConnection, None]:
+    db = RequestConnection(db_manager, transactional=True)
+    failed = True
+    try:
+        yield db
+        failed = False
+    finally:
+        await db.close(failed)
 
 
-async def get_db_transition() -> AsyncGenerator[asyncpg.Connection, None]:
-    async for conn in db_manager.get_transaction():
-        yield conn
+# scope="function" releases the connection (and commits) before the response
+# is sent, instead of after the client received it
+RequestDB = Annotated[
+    RequestConnection, Depends(get_request_connection, scope="function")
+]
+RequestTransaction = Annotated[
+    RequestConnection, Depends(get_request_transaction, scope="function")
+]
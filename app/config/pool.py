@@ -0,0 +1,196 @@
+import asyncio
+from collections import deque
+from logging import getLogger
+from typing import Any, Deque, Dict, Optional
+
+from app.core.settings import settings
+
+logger = getLogger(__name__)
+
+
+def reserved_connections() -> int:
+    """
+    Connections a worker opens outside its pool: the authorization LISTEN,
+    plus the EXPLAIN connection when query diagnostics are on.
+    """
+    return 1 + int(settings.QUERY_DIAGNOSTICS)
+
+
+def pool_bounds() -> Dict[str, int]:
+    """
+    Pool size bounds for this worker. The upper bound is capped by this
+    worker's share of DB_CONNECTION_BUDGET, so all workers together can never
+    open more connections than the budget allows.
+    """
+    is_dev = settings.ENVIRONMENT == "dev"
+    min_size = settings.DB_POOL_MIN_SIZE or (1 if is_dev else 5)
+    max_size = settings.DB_POOL_MAX_SIZE or (5 if is_dev else 20)
+
+    if settings.DB_CONNECTION_BUDGET:
+        share = settings.DB_CONNECTION_BUDGET // max(1, settings.WEB_CONCURRENCY)
+        max_size = min(max_size, max(1, share - reserved_connections()))
+
+    return {"min_size": min(min_size, max_size), "max_size": max_size}
+
+
+class AdaptiveLimiter:
+    """
+    Semaphore whose limit can change at runtime. It sits in front of
+    pool.acquire() and decides how many pool connections may be in use.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.__waiters: Deque[asyncio.Future] = deque()
+        # served before __waiters, so writes are not starved by reads
+        self.__priority_waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiters(self) -> int:
+        return len(self.__waiters) + len(self.__priority_waiters)
+
+    def waiters_ahead(self, priority: bool = False) -> int:
+        return len(self.__priority_waiters) if priority else self.waiters
+
+    async def acquire(self, priority: bool = False):
+        if self.in_use < self.limit and not self.waiters:
+            self.__grant()
+            return
+
+        waiters = self.__priority_waiters if priority else self.__waiters
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                try:
+                    waiters.remove(future)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self):
+        self.in_use -= 1
+        self.__wake()
+
+    def resize(self, limit: int):
+        self.limit = limit
+        self.__wake()
+
+    def reset_peak(self) -> int:
+        peak, self.peak_in_use = self.peak_in_use, self.in_use
+        return peak
+
+    def __grant(self):
+        self.in_use += 1
+        if self.in_use > self.peak_in_use:
+            self.peak_in_use = self.in_use
+
+    def __wake(self):
+        while self.in_use < self.limit:
+            waiters = self.__priority_waiters or self.__waiters
+            if not waiters:
+                return
+            future = waiters.popleft()
+            if not future.done():
+                self.__grant()
+                future.set_result(None)
+
+
+class AdaptivePoolController:
+    """
+    Every interval, compares the p99 acquire wait of the window against the
+    target: grows the limit by ~25% when requests queue, shrinks it by one
+    when the pool sat mostly idle. Connections above the limit are closed by
+    asyncpg once idle for max_inactive_connection_lifetime.
+    """
+
+    def __init__(
+        self,
+        limiter: AdaptiveLimiter,
+        min_size: int,
+        max_size: int,
+        target_wait: float,
+        interval: float,
+    ):
+        self.limiter = limiter
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_wait = target_wait
+        self.interval = interval
+        self.__window: list = []
+        self.__recent: Deque[float] = deque(maxlen=1024)
+        self.__task: Optional[asyncio.Task] = None
+
+    def record_wait(self, seconds: float):
+        self.__window.append(seconds)
+        self.__recent.append(seconds)
+
+    @staticmethod
+    def _p99(values) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+    def p99_wait(self) -> float:
+        return self._p99(self.__recent)
+
+    def adjust(self):
+        window, self.__window = self.__window, []
+        p99 = self._p99(window)
+        peak = self.limiter.reset_peak()
+        limit = self.limiter.limit
+
+        if p99 > self.target_wait and limit < self.max_size:
+            new_limit = min(self.max_size, limit + max(1, limit // 4))
+        elif (
+            p99 < self.target_wait / 2
+            and peak < limit / 2
+            and limit > self.min_size
+        ):
+            new_limit = limit - 1
+        else:
+            return
+
+        self.limiter.resize(new_limit)
+        logger.info(
+            f"Pool limit {limit} -> {new_limit} "
+            f"(p99 wait {p99 * 1000:.1f} ms, peak in use {peak})"
+        )
+
+    def start(self):
+        if self.__task is None:
+            self.__task = asyncio.create_task(self.__run())
+
+    async def stop(self):
+        if self.__task is not None:
+            task, self.__task = self.__task, None
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def __run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.adjust()
+            except Exception as e:
+                logger.error(f"Pool controller failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limiter.limit,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "in_use": self.limiter.in_use,
+            "waiters": self.limiter.waiters,
+            "p99_wait_ms": self.p99_wait() * 1000,
+        }
@@ -0,0 +1,242 @@
+import asyncio
+from contextvars import ContextVar
+from logging import getLogger
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from app.core.settings import settings
+
+logger = getLogger(__name__)
+
+# 0 on a primary or a replica that replayed everything it received
+SELECT_REPLICATION_LAG = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END::float8;
+"""
+
+READ_YOUR_WRITES_HEADER = b"x-read-your-writes"
+
+
+def parse_replica_hosts(value: str) -> List[Tuple[str, int]]:
+    hosts = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        hosts.append((host, int(port) if port else settings.DB_PORT))
+    return hosts
+
+
+class ReplicaPool:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.pool: Optional[asyncpg.Pool] = None
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.in_use = 0
+        self.waiting = 0
+        # moving average of how long a connection stays acquired
+        self.hold_time = 0.0
+        self.__leases: Dict[asyncpg.Connection, Tuple[asyncpg.Pool, float]] = {}
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    async def connect(self, **pool_kwargs):
+        try:
+            self.pool = await asyncpg.create_pool(
+                host=self.host, port=self.port, **pool_kwargs
+            )
+            logger.info(f"Replica pool {self.name} initialized")
+        except Exception as e:
+            self.pool = None
+            self.healthy = False
+            logger.error(f"Failed to connect to replica {self.name}: {e}")
+
+    async def check(self, max_lag: float):
+        if self.pool is None:
+            self.healthy = False
+            return
+
+        try:
+            async with self.pool.acquire(timeout=5) as conn:
+                self.lag = await conn.fetchval(SELECT_REPLICATION_LAG, timeout=5)
+        except Exception as e:
+            if self.healthy:
+                logger.warning(f"Replica {self.name} out of rotation: {e}")
+            self.healthy = False
+            self.lag = None
+            return
+
+        healthy = self.lag <= max_lag
+        if healthy != self.healthy:
+            logger.warning(
+                f"Replica {self.name} {'back in' if healthy else 'out of'} rotation "
+                f"(lag {self.lag:.1f}s)"
+            )
+        self.healthy = healthy
+
+    async def acquire(self) -> asyncpg.Connection:
+        pool = self.pool
+        self.waiting += 1
+        try:
+            conn = await pool.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_use += 1
+        self.__leases[conn] = (pool, perf_counter())
+        return conn
+
+    async def release(self, conn: asyncpg.Connection):
+        pool, held_since = self.__leases.pop(conn)
+        self.in_use -= 1
+        self.hold_time += 0.1 * (perf_counter() - held_since - self.hold_time)
+        await pool.release(conn)
+
+    def estimated_wait(self) -> float:
+        """Same estimate as DatabaseManager.estimated_wait, for this pool."""
+        if self.pool is None or self.in_use < self.pool.get_max_size():
+            return 0.0
+        return (self.waiting + 1) / self.pool.get_max_size() * self.hold_time
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "size": self.pool.get_size() if self.pool else 0,
+            "idle": self.pool.get_idle_size() if self.pool else 0,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+        }
+
+
+class ReplicaSet:
+    def __init__(self, replicas: List[ReplicaPool]):
+        self.replicas = replicas
+        self.__next = 0
+        self.__task: Optional[asyncio.Task] = None
+
+    def peek(self) -> Optional[ReplicaPool]:
+        """The replica pick() would return next, without taking the turn."""
+        count = len(self.replicas)
+        for offset in range(count):
+            replica = self.replicas[(self.__next + offset) % count]
+            if replica.healthy and replica.pool is not None:
+                return replica
+        return None
+
+    def pick(self) -> Optional[ReplicaPool]:
+        """Round-robin over healthy replicas, None when there is none."""
+        replica = self.peek()
+        if replica is not None:
+            self.__next = self.replicas.index(replica) + 1
+        return replica
+
+    async def connect(self, **pool_kwargs):
+        await asyncio.gather(*(r.connect(**pool_kwargs) for r in self.replicas))
+        await self.check()
+        if self.replicas and self.__task is None:
+            self.__task = asyncio.create_task(self.__run(pool_kwargs))
+
+    async def check(self):
+        await asyncio.gather(
+            *(r.check(settings.DB_REPLICA_MAX_LAG_SECONDS) for r in self.replicas)
+        )
+
+    async def __run(self, pool_kwargs: Dict[str, Any]):
+        while True:
+            await asyncio.sleep(settings.DB_REPLICA_CHECK_INTERVAL_SECONDS)
+            try:
+                await asyncio.gather(
+                    *(
+                        r.connect(**pool_kwargs)
+                        for r in self.replicas
+                        if r.pool is None
+                    )
+                )
+                await self.check()
+            except Exception as e:
+                logger.error(f"Replica health check failed: {e}")
+
+    async def close(self):
+        if self.__task is not None:
+            task, self.__task = self.__task, None
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        await asyncio.gather(*(r.close() for r in self.replicas))
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [replica.stats() for replica in self.replicas]
+
+
+class RequestConsistency:
+    __slots__ = ("read_your_writes", "wrote")
+
+    def __init__(self, read_your_writes: bool):
+        self.read_your_writes = read_your_writes
+        self.wrote = False
+
+
+_consistency: ContextVar[Optional[RequestConsistency]] = ContextVar(
+    "db_consistency", default=None
+)
+
+
+def mark_write():
+    state = _consistency.get()
+    if state is not None:
+        state.wrote = True
+
+
+def reads_pinned_to_primary() -> bool:
+    state = _consistency.get()
+    return state is not None and state.read_your_writes and state.wrote
+
+
+class ConsistencyMiddleware:
+    """
+    Opens a consistency scope per request. With `X-Read-Your-Writes: true`
+    (or DB_READ_YOUR_WRITES by default) reads after the request's first
+    write go to the primary instead of a replica.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        read_your_writes = settings.DB_READ_YOUR_WRITES
+        for name, value in scope["headers"]:
+            if name == READ_YOUR_WRITES_HEADER:
+                read_your_writes = value.lower() in (b"1", b"true", b"yes")
+                break
+
+        token = _consistency.set(RequestConsistency(read_your_writes))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _consistency.reset(token)
@@ -0,0 +1,231 @@
+"""
+Admission control for the API routes. Each request has to pass three checks,
+in order, before any handler runs. A request that fails one is answered at
+once instead of queueing inside the pool:
+
+- per client, a token bucket refilled at ADMISSION_CLIENT_RATE per second up
+  to ADMISSION_CLIENT_BURST; empty answers 429
+- per route, at most ADMISSION_ROUTE_MAX_CONCURRENCY requests in flight, or
+  the ADMISSION_ROUTE_LIMITS override; full answers 503
+- the estimated wait for a connection (DatabaseManager.estimated_wait), on
+  the replica a read would use or else the primary, against the budget of
+  the request's class; over it answers 503
+
+Both 429 and 503 carry Retry-After. Reads (GET, HEAD, OPTIONS) and writes
+are separate classes: reads are shed at the lower ADMISSION_READ_MAX_WAIT_MS,
+and the pool limiter serves waiting writes first, so list scans give way
+before a write is turned away. A check set to 0 is disabled.
+"""
+
+import math
+from collections import OrderedDict
+from logging import getLogger
+from time import monotonic
+from typing import Any, Dict, Optional, Sequence
+
+from fastapi import Response
+from jose import JWTError
+from starlette.routing import BaseRoute, Match
+
+from app.config.database import db_manager
+from app.core.security import verify_request_token
+from app.core.settings import settings
+from app.schemas.responses import from_status
+
+logger = getLogger(__name__)
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# clients tracked at once; the least recently seen are forgotten first
+MAX_TRACKED_CLIENTS = 10000
+
+# a full route frees up as soon as one of its requests ends
+ROUTE_RETRY_AFTER_SECONDS = 1
+
+
+def parse_route_limits(value: str) -> Dict[str, int]:
+    """'GET /api/v1/x/{id}=4, POST /api/v1/x=2' -> {'GET /api/v1/x/{id}': 4, ...}"""
+    limits = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        route, _, limit = item.rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        limits[f"{method.upper()} {path.strip()}"] = int(limit)
+    return limits
+
+
+def _rejection(status_code: int, message: str, retry_after: float) -> Response:
+    response = from_status(status_code, message)
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+    def take(self, rate: float, burst: int, now: float) -> float:
+        """Takes a token; returns 0, or the seconds until one is available."""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        enabled: bool,
+        client_rate: float,
+        client_burst: int,
+        route_limit: int,
+        route_limits: Dict[str, int],
+        read_max_wait_ms: int,
+        write_max_wait_ms: int,
+    ):
+        self.enabled = enabled
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.route_limit = route_limit
+        self.route_limits = route_limits
+        self.read_budget = read_max_wait_ms / 1000
+        self.write_budget = write_max_wait_ms / 1000
+        self.__clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.__in_flight: Dict[str, int] = {}
+        self.__metrics = {
+            "admitted": 0,
+            "throttled": 0,
+            "shed_route": 0,
+            "shed_pool": 0,
+        }
+
+    def admit(self, client: str, method: str, route: str) -> Optional[Response]:
+        """
+        None when the request may run, and then it counts against `route`
+        until release(route). Otherwise the 429 or 503 to answer with.
+        """
+        retry_after = self.__take_token(client)
+        if retry_after:
+            self.__metrics["throttled"] += 1
+            return _rejection(429, "Too many requests", retry_after)
+
+        limit = self.route_limits.get(route, self.route_limit)
+        if limit and self.__in_flight.get(route, 0) >= limit:
+            self.__metrics["shed_route"] += 1
+            return _rejection(503, "Route at capacity", ROUTE_RETRY_AFTER_SECONDS)
+
+        readonly = method in READ_METHODS
+        budget = self.read_budget if readonly else self.write_budget
+        wait = db_manager.estimated_wait(readonly)
+        if budget and wait > budget:
+            self.__metrics["shed_pool"] += 1
+            return _rejection(503, "Server overloaded", wait)
+
+        self.__metrics["admitted"] += 1
+        self.__in_flight[route] = self.__in_flight.get(route, 0) + 1
+        return None
+
+    def release(self, route: str):
+        self.__in_flight[route] -= 1
+        if not self.__in_flight[route]:
+            del self.__in_flight[route]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.__metrics,
+            "in_flight": sum(self.__in_flight.values()),
+            "tracked_clients": len(self.__clients),
+        }
+
+    def __take_token(self, client: str) -> float:
+        if not self.client_rate:
+            return 0.0
+
+        now = monotonic()
+        bucket = self.__clients.get(client)
+        if bucket is None:
+            bucket = self.__clients[client] = TokenBucket(self.client_burst, now)
+            if len(self.__clients) > MAX_TRACKED_CLIENTS:
+                self.__clients.popitem(last=False)
+        else:
+            self.__clients.move_to_end(client)
+
+        return bucket.take(self.client_rate, self.client_burst, now)
+
+
+class AdmissionControlMiddleware:
+    """Runs admission_controller.admit for every request under API_V1_STR."""
+
+    def __init__(self, app, routes: Sequence[BaseRoute] = ()):
+        self.app = app
+        # the router resolves scope["route"] only after the middleware stack,
+        # so the route template is matched here
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not admission_controller.enabled
+            or not scope["path"].startswith(settings.API_V1_STR)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        route = f"{scope['method']} {self.__route_path(scope)}"
+        rejection = admission_controller.admit(
+            self.__client(scope), scope["method"], route
+        )
+        if rejection is not None:
+            await rejection(scope, receive, send)
+            return
+
+        # counted until the response ends, streamed bodies included
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_controller.release(route)
+
+    def __route_path(self, scope) -> str:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return scope["path"]
+
+    @staticmethod
+    def __client(scope) -> str:
+        # the verified subject when there is one: clients behind one NAT or
+        # proxy share an address, not a session. An unverified token is not
+        # an identity, or a fresh random one per request would get a fresh
+        # bucket; it counts against the address instead.
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    state = scope.setdefault("state", {})
+                    try:
+                        return f"sub:{verify_request_token(state, token)['sub']}"
+                    except (JWTError, KeyError):
+                        pass
+                break
+
+        client = scope.get("client")
+        return f"addr:{client[0]}" if client else "addr:"
+
+
+admission_controller: AdmissionController = AdmissionController(
+    settings.ADMISSION_CONTROL,
+    settings.ADMISSION_CLIENT_RATE,
+    settings.ADMISSION_CLIENT_BURST,
+    settings.ADMISSION_ROUTE_MAX_CONCURRENCY,
+    parse_route_limits(settings.ADMISSION_ROUTE_LIMITS),
+    settings.ADMISSION_READ_MAX_WAIT_MS,
+    settings.ADMISSION_WRITE_MAX_WAIT_MS,
+)
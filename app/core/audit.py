@@ -0,0 +1,275 @@
+"""
+Write-behind audit log. After a successful write, services call
+`await audit_log.record(...)`. The event goes to an in-memory queue, and a
+background task COPYs the queue into public.audit_log. A flush runs when
+AUDIT_BATCH_SIZE events are waiting or every AUDIT_FLUSH_INTERVAL_SECONDS,
+whichever comes first. Requests never wait on the audit write itself.
+
+When the database is slow or down, flushes retry with backoff and the
+queue fills up to AUDIT_QUEUE_MAX_SIZE. From there AUDIT_OVERFLOW decides:
+
+- "block" slows writers down until there is room, for up to
+  AUDIT_BLOCK_TIMEOUT_SECONDS
+- "drop" sheds events at once
+
+Dropped events are counted in the `audit_dropped` gauge.
+
+A batch whose COPY keeps failing is retried AUDIT_FLUSH_MAX_ATTEMPTS times.
+After that it is written to the `app.core.audit.dead_letter` logger and
+dropped, so one bad batch cannot stall every event queued behind it.
+
+Events still queued when the process is killed are lost. With
+AUDIT_FLUSH_ON_SHUTDOWN the lifespan drains the queue before the pool
+closes, so a normal shutdown or deploy keeps every event.
+"""
+
+import asyncio
+import json
+from collections import deque
+from datetime import datetime, timezone
+from itertools import islice
+from logging import getLogger
+from time import perf_counter
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+from app.core.security import current_employee_id
+from app.core.settings import settings
+from app.database.query_manager import QueryManager
+
+logger = getLogger(__name__)
+dead_letter_logger = getLogger(f"{__name__}.dead_letter")
+
+AUDIT_SCHEMA = "public"
+AUDIT_TABLE = "audit_log"
+AUDIT_COLUMNS = ["occurred_at", "actor_id", "action", "entity", "entity_id", "changes"]
+
+# values never written to the trail, only the fact that they changed
+REDACTED_FIELDS = frozenset({"password"})
+
+RETRY_DELAY_SECONDS = 1.0
+MAX_RETRY_DELAY_SECONDS = 30.0
+
+
+def _changes_json(changes: Optional[Dict[str, Any]]) -> Optional[str]:
+    if changes is None:
+        return None
+    redacted = {
+        field: "[redacted]" if field in REDACTED_FIELDS else value
+        for field, value in changes.items()
+    }
+    return json.dumps(redacted, default=str, ensure_ascii=False)
+
+
+class AuditLog:
+    def __init__(
+        self,
+        max_size: int,
+        batch_size: int,
+        interval: float,
+        overflow: str,
+        block_timeout: float,
+        flush_on_shutdown: bool,
+        max_attempts: int,
+    ):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.interval = interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.flush_on_shutdown = flush_on_shutdown
+        self.max_attempts = max_attempts
+        self.__queue: Deque[Tuple] = deque()
+        self.__task: Optional[asyncio.Task] = None
+        self.__wakeup: Optional[asyncio.Event] = None
+        self.__space: Optional[asyncio.Event] = None
+        self.__stopping = False
+        # failed COPYs of the batch at the head of the queue
+        self.__attempts = 0
+        self.__metrics = {
+            "recorded": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "blocked": 0,
+            "flush_failures": 0,
+            "dead_lettered": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    def start(self):
+        if self.__task is None:
+            self.__stopping = False
+            self.__wakeup = asyncio.Event()
+            self.__space = asyncio.Event()
+            self.__task = asyncio.create_task(self.__run())
+
+    async def record(
+        self,
+        action: str,
+        entity: str,
+        entity_id: Optional[int],
+        changes: Optional[Dict[str, Any]] = None,
+    ):
+        await self.record_many(action, entity, [(entity_id, changes)])
+
+    async def record_many(
+        self,
+        action: str,
+        entity: str,
+        events: Iterable[Tuple[Optional[int], Optional[Dict[str, Any]]]],
+    ):
+        """
+        One event per (entity_id, changes), all with the same actor and time.
+        In "block" mode the whole call waits at most AUDIT_BLOCK_TIMEOUT_SECONDS.
+        """
+        occurred_at = datetime.now(timezone.utc)
+        actor_id = current_employee_id()
+        deadline = perf_counter() + self.block_timeout
+
+        for entity_id, changes in events:
+            if not await self.__make_room(deadline):
+                self.__drop()
+                continue
+
+            self.__queue.append(
+                (
+                    occurred_at,
+                    actor_id,
+                    action,
+                    entity,
+                    entity_id,
+                    _changes_json(changes),
+                )
+            )
+            self.__metrics["recorded"] += 1
+
+        if len(self.__queue) >= self.batch_size and self.__wakeup is not None:
+            self.__wakeup.set()
+
+    async def shutdown(self):
+        if self.__task is None:
+            return
+
+        task, self.__task = self.__task, None
+        self.__stopping = True
+
+        if not self.flush_on_shutdown and self.__queue:
+            logger.warning(f"Discarding {len(self.__queue)} queued audit events")
+            self.__queue.clear()
+
+        self.__wakeup.set()
+        try:
+            await asyncio.wait_for(task, settings.GRACEFUL_SHUTDOWN_SECONDS)
+        except asyncio.TimeoutError:
+            logger.error(f"Audit log lost {len(self.__queue)} events at shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.__metrics, "queued": len(self.__queue)}
+
+    async def __make_room(self, deadline: float) -> bool:
+        if len(self.__queue) < self.max_size:
+            return True
+
+        # nothing drains the queue before start() or after shutdown()
+        if self.overflow == "drop" or self.__task is None:
+            return False
+
+        self.__metrics["blocked"] += 1
+        while len(self.__queue) >= self.max_size:
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                return False
+
+            self.__space.clear()
+            try:
+                await asyncio.wait_for(self.__space.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def __drop(self):
+        self.__metrics["dropped"] += 1
+        # one line per thousand, a sustained overload would flood the log
+        if self.__metrics["dropped"] % 1000 == 1:
+            logger.warning(
+                f"Audit queue full, {self.__metrics['dropped']} events dropped so far"
+            )
+
+    async def __run(self):
+        # set while retrying a failed flush, which does not wait for a trigger
+        delay: Optional[float] = None
+        while True:
+            if delay is None and not self.__stopping:
+                try:
+                    await asyncio.wait_for(self.__wakeup.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self.__wakeup.clear()
+
+            if await self.__flush():
+                if self.__stopping:
+                    return
+                delay = None
+            else:
+                delay = (
+                    min(delay * 2, MAX_RETRY_DELAY_SECONDS)
+                    if delay
+                    else RETRY_DELAY_SECONDS
+                )
+                await asyncio.sleep(delay)
+
+    async def __flush(self) -> bool:
+        """COPYs the queue in batches; False when a batch failed and stays queued."""
+        while self.__queue:
+            # events leave the queue only once stored, so they keep counting
+            # against max_size while their COPY is in flight
+            batch = list(islice(self.__queue, self.batch_size))
+
+            start = perf_counter()
+            try:
+                await QueryManager().copy_records(
+                    AUDIT_TABLE, batch, AUDIT_COLUMNS, AUDIT_SCHEMA
+                )
+            except Exception as e:
+                self.__metrics["flush_failures"] += 1
+                self.__attempts += 1
+                logger.error(f"Audit flush of {len(batch)} events failed: {e}")
+                if self.__attempts < self.max_attempts:
+                    return False
+
+                self.__dead_letter(batch)
+                continue
+
+            for _ in batch:
+                self.__queue.popleft()
+            self.__attempts = 0
+            self.__metrics["flushed"] += len(batch)
+            self.__metrics["last_flush_ms"] = (perf_counter() - start) * 1000
+            self.__space.set()
+
+        return True
+
+    def __dead_letter(self, batch):
+        logger.error(
+            f"Dropping {len(batch)} audit events after {self.__attempts} failed "
+            f"flushes, see the {dead_letter_logger.name} log"
+        )
+        for event in batch:
+            self.__queue.popleft()
+            dead_letter_logger.error(
+                json.dumps(dict(zip(AUDIT_COLUMNS, event)), default=str)
+            )
+
+        self.__attempts = 0
+        self.__metrics["dead_lettered"] += len(batch)
+        self.__space.set()
+
+
+audit_log: AuditLog = AuditLog(
+    settings.AUDIT_QUEUE_MAX_SIZE,
+    settings.AUDIT_BATCH_SIZE,
+    settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+    settings.AUDIT_OVERFLOW,
+    settings.AUDIT_BLOCK_TIMEOUT_SECONDS,
+    settings.AUDIT_FLUSH_ON_SHUTDOWN,
+    settings.AUDIT_FLUSH_MAX_ATTEMPTS,
+)
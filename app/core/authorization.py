@@ -0,0 +1,180 @@
+import asyncio
+from logging import getLogger
+from typing import Any, Dict, Optional, Tuple
+
+import asyncpg
+from fastapi import Depends, HTTPException, status
+
+from app.config.database import db_manager
+from app.core.security import get_current_employee
+from app.database.query_manager import QueryManager
+from app.database.seeder_query import AUTHORIZATION_CHANNEL
+
+logger = getLogger(__name__)
+
+SELECT_PERMISSIONS = """
+    SELECT id, resource, action FROM "user".permissions ORDER BY id;
+"""
+
+SELECT_ROLE_PERMISSIONS = """
+    SELECT rp.role_id, rp.permission_id
+    FROM "user".role_permissions rp
+    JOIN "user".roles r ON r.id = rp.role_id
+    WHERE r.is_active = true;
+"""
+
+SELECT_PERMISSIONS_OF_ROLE = """
+    SELECT rp.permission_id
+    FROM "user".role_permissions rp
+    JOIN "user".roles r ON r.id = rp.role_id
+    WHERE rp.role_id = $1 AND r.is_active = true;
+"""
+
+
+class AuthorizationIndex:
+    """
+    In-memory RBAC index: every (resource, action) permission owns one bit and
+    every role is an int bitmask, so a check is two dict lookups and a shift.
+    Postgres triggers NOTIFY on changes; a role change reloads only that role,
+    a permission change rebuilds the bit layout.
+    """
+
+    def __init__(self):
+        self.__bits: Dict[Tuple[str, str], int] = {}
+        self.__permission_bits: Dict[int, int] = {}
+        self.__roles: Dict[int, int] = {}
+        self.__listener: Optional[asyncpg.Connection] = None
+        self.__tasks: set = set()
+        self.__stopping = False
+        self.__refresh_lock = asyncio.Lock()
+
+    def can(self, role_id: Optional[int], resource: str, action: str) -> bool:
+        bit = self.__bits.get((resource, action))
+        if bit is None or role_id is None:
+            return False
+        return bool(self.__roles.get(role_id, 0) >> bit & 1)
+
+    def permissions_of(self, role_id: int) -> set:
+        mask = self.__roles.get(role_id, 0)
+        return {key for key, bit in self.__bits.items() if mask >> bit & 1}
+
+    async def load(self):
+        async with self.__refresh_lock:
+            await self.__load()
+
+    async def reload_role(self, role_id: int):
+        async with self.__refresh_lock:
+            await self.__reload_role(role_id)
+
+    async def __load(self):
+        # read from the primary: a NOTIFY may arrive before replicas replay it
+        async with db_manager.get_connection() as conn:
+            qm = QueryManager(conn)
+            permissions = await qm.select(SELECT_PERMISSIONS)
+            role_permissions = await qm.select(SELECT_ROLE_PERMISSIONS)
+
+        bits = {}
+        permission_bits = {}
+        for bit, permission in enumerate(permissions):
+            bits[(permission["resource"], permission["action"])] = bit
+            permission_bits[permission["id"]] = bit
+
+        roles: Dict[int, int] = {}
+        for row in role_permissions:
+            bit = permission_bits.get(row["permission_id"])
+            if bit is not None:
+                roles[row["role_id"]] = roles.get(row["role_id"], 0) | 1 << bit
+
+        self.__bits, self.__permission_bits, self.__roles = bits, permission_bits, roles
+        logger.info(
+            f"Authorization index loaded: {len(bits)} permissions, {len(roles)} roles"
+        )
+
+    async def __reload_role(self, role_id: int):
+        async with db_manager.get_connection() as conn:
+            rows = await QueryManager(conn).select(SELECT_PERMISSIONS_OF_ROLE, (role_id,))
+
+        mask = 0
+        for row in rows:
+            bit = self.__permission_bits.get(row["permission_id"])
+            if bit is None:
+                # permission newer than the bit layout, rebuild everything
+                await self.__load()
+                return
+            mask |= 1 << bit
+
+        roles = dict(self.__roles)
+        if mask:
+            roles[role_id] = mask
+        else:
+            roles.pop(role_id, None)
+        self.__roles = roles
+
+    async def start(self):
+        self.__stopping = False
+        await self.__listen()
+        await self.load()
+
+    async def stop(self):
+        self.__stopping = True
+        for task in list(self.__tasks):
+            task.cancel()
+
+        if self.__listener is not None:
+            listener, self.__listener = self.__listener, None
+            await listener.close()
+
+    async def __listen(self):
+        self.__listener = await db_manager.create_connection()
+        self.__listener.add_termination_listener(self.__on_listener_lost)
+        await self.__listener.add_listener(AUTHORIZATION_CHANNEL, self.__on_notify)
+
+    def __on_notify(self, connection, pid, channel, payload: str):
+        if payload.startswith("role:"):
+            self.__spawn(self.reload_role(int(payload[5:])))
+        else:
+            self.__spawn(self.load())
+
+    def __on_listener_lost(self, connection):
+        if not self.__stopping:
+            logger.warning("Authorization listener lost, reconnecting")
+            self.__spawn(self.__reconnect())
+
+    async def __reconnect(self, delay: float = 1.0):
+        while not self.__stopping:
+            try:
+                await self.__listen()
+                # notifications may have been missed while disconnected
+                await self.load()
+                return
+            except Exception as e:
+                logger.error(f"Authorization listener reconnect failed: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    def __spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.__tasks.add(task)
+        task.add_done_callback(self.__on_task_done)
+
+    def __on_task_done(self, task: asyncio.Task):
+        self.__tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Authorization index refresh failed: {task.exception()}")
+
+
+authorization_index: AuthorizationIndex = AuthorizationIndex()
+
+
+def require_permission(resource: str, action: str):
+    async def dependency(
+        claims: Dict[str, Any] = Depends(get_current_employee),
+    ) -> Dict[str, Any]:
+        if not authorization_index.can(claims.get("role_id"), resource, action):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Missing permission {action} on {resource}",
+            )
+        return claims
+
+    return dependency
@@ -0,0 +1,96 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Response, status
+
+from app.database.query_manager import QueryManager
+from app.database.warmup import hot_statement
+
+# must-revalidate lets a shared cache store responses to authenticated
+# requests; no-cache sends every reuse back here, through the auth check,
+# where an unchanged table answers 304 without running the main query
+CACHE_CONTROL = "no-cache, must-revalidate"
+
+SELECT_TABLE_VERSIONS = hot_statement(
+    """
+    SELECT table_name, version FROM public.table_versions
+    WHERE table_name = ANY($1::text[]);
+    """,
+    [],
+)
+
+
+async def table_etag(qm: QueryManager, *tables: str) -> str:
+    """
+    ETag covering every row of `tables` (as "schema.table"). Read it through
+    the same QueryManager as the data and before it: the tag can then only
+    be older than the body, which costs one extra refetch, never newer, which
+    would keep a stale body cached.
+    """
+    rows = await qm.select(SELECT_TABLE_VERSIONS, (list(tables),))
+    versions = {row["table_name"]: row["version"] for row in rows}
+
+    return '"' + ".".join(str(versions.get(table, 0)) for table in tables) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    # If-None-Match uses the weak comparison, W/ prefixes are ignored
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
+
+
+def with_etag(response: Response, etag: str) -> Response:
+    if 200 <= response.status_code < 300:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+class PreconditionError(ValueError):
+    pass
+
+
+def row_etag(updated_at: datetime) -> str:
+    return f'"{updated_at.isoformat()}"'
+
+
+def if_match_version(if_match: Optional[str]) -> Optional[datetime]:
+    """
+    updated_at the client last saw, from an If-Match carrying a row_etag (the
+    bare updated_at value is accepted too). None for "*", which only asks for
+    the row to exist. Raises PreconditionError for a missing header or one
+    that is not a single strong row ETag.
+    """
+    if not if_match:
+        raise PreconditionError("If-Match header is required")
+
+    tag = if_match.strip()
+    if tag == "*":
+        return None
+
+    # If-Match uses the strong comparison, a weak tag never matches
+    if tag.startswith("W/") or "," in tag:
+        raise PreconditionError("If-Match must be a single strong ETag")
+
+    try:
+        version = datetime.fromisoformat(tag.strip('"'))
+    except ValueError:
+        raise PreconditionError("If-Match is not a row ETag")
+
+    if version.tzinfo is None:
+        raise PreconditionError("If-Match is not a row ETag")
+    return version
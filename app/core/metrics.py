@@ -0,0 +1,260 @@
+import hashlib
+import time
+from bisect import bisect_left
+from logging import getLogger
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.settings import settings
+
+logger = getLogger(__name__)
+
+# seconds; the last bucket is +Inf
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+MAX_QUERY_SHAPES = 500
+
+# shared by every statement seen after MAX_QUERY_SHAPES
+OVERFLOW_QUERY_ID = "other"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. Recording is a bisect plus three increments with
+    no locks: everything is updated from the event loop thread.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+def query_fingerprint(statement: str) -> str:
+    return hashlib.sha1(statement.encode()).hexdigest()[:12]
+
+
+class QueryStats:
+    """
+    Per statement. /metrics is unauthenticated, so its series carry the
+    `query_id` fingerprint and never the SQL text; the admin diagnostics
+    endpoint maps ids back to statements.
+    """
+
+    __slots__ = ("statement", "query_id", "latency", "rows", "errors")
+
+    def __init__(self, statement: str, query_id: Optional[str] = None):
+        self.statement = statement
+        self.query_id = query_id or query_fingerprint(statement)
+        self.latency = Histogram()
+        self.rows = 0
+        self.errors = 0
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(f'{key}="{_escape_label(str(value))}"' for key, value in labels.items())
+        + "}"
+    )
+
+
+def _render_histogram(
+    lines: List[str], name: str, histogram: Histogram, labels: Dict[str, Any]
+):
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(
+            f"{name}_bucket{_format_labels({**labels, 'le': bound})} {cumulative}"
+        )
+    lines.append(
+        f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {histogram.count}"
+    )
+    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+
+class MetricsRegistry:
+    def __init__(self, slow_query_threshold_ms: int):
+        self.slow_query_threshold = slow_query_threshold_ms / 1000
+        self.__queries: Dict[str, QueryStats] = {}
+        self.__overflow = QueryStats(OVERFLOW_QUERY_ID, OVERFLOW_QUERY_ID)
+        self.__requests: Dict[Tuple[str, str, int], Histogram] = {}
+        self.pool_acquire = Histogram()
+        self.__collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def __query_stats(self, query: str) -> QueryStats:
+        stats = self.__queries.get(query)
+        if stats is None:
+            if len(self.__queries) >= MAX_QUERY_SHAPES:
+                return self.__overflow
+            stats = self.__queries[query] = QueryStats(" ".join(query.split()))
+        return stats
+
+    def observe_query(
+        self, query: str, seconds: float, rows: int = 0, error: bool = False
+    ):
+        stats = self.__query_stats(query)
+        stats.latency.observe(seconds)
+        stats.rows += rows
+        if error:
+            stats.errors += 1
+
+        if seconds >= self.slow_query_threshold:
+            statement = (
+                stats.statement
+                if stats is not self.__overflow
+                else " ".join(query.split())
+            )
+            logger.warning(
+                f"Slow query {stats.query_id} ({seconds * 1000:.1f} ms, {rows} rows): "
+                f"{statement}"
+            )
+
+    def observe_acquire(self, seconds: float):
+        self.pool_acquire.observe(seconds)
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route, status)
+        histogram = self.__requests.get(key)
+        if histogram is None:
+            histogram = self.__requests[key] = Histogram()
+        histogram.observe(seconds)
+
+    def register_collector(self, name: str, collect: Callable[[], Dict[str, Any]]):
+        """Exposes `collect()`'s numeric values as gauges named `<name>_<key>`."""
+        self.__collectors[name] = collect
+
+    def queries(self) -> List[QueryStats]:
+        queries = list(self.__queries.values())
+        if self.__overflow.latency.count:
+            queries.append(self.__overflow)
+        return queries
+
+    def render(self) -> str:
+        lines: List[str] = []
+        queries = self.queries()
+
+        lines.append("# TYPE db_query_duration_seconds histogram")
+        for stats in queries:
+            _render_histogram(
+                lines,
+                "db_query_duration_seconds",
+                stats.latency,
+                {"query_id": stats.query_id},
+            )
+
+        lines.append("# TYPE db_query_rows_total counter")
+        for stats in queries:
+            lines.append(
+                f"db_query_rows_total{_format_labels({'query_id': stats.query_id})} "
+                f"{stats.rows}"
+            )
+
+        lines.append("# TYPE db_query_errors_total counter")
+        for stats in queries:
+            lines.append(
+                f"db_query_errors_total{_format_labels({'query_id': stats.query_id})} "
+                f"{stats.errors}"
+            )
+
+        lines.append("# TYPE db_pool_acquire_seconds histogram")
+        _render_histogram(lines, "db_pool_acquire_seconds", self.pool_acquire, {})
+
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route, status), histogram in self.__requests.items():
+            _render_histogram(
+                lines,
+                "http_request_duration_seconds",
+                histogram,
+                {"method": method, "route": route, "status": status},
+            )
+
+        for name, collect in self.__collectors.items():
+            try:
+                values = collect()
+            except Exception as e:
+                logger.error(f"Metrics collector {name} failed: {e}")
+                continue
+
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {name}_{key} gauge")
+                    lines.append(f"{name}_{key} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics: MetricsRegistry = MetricsRegistry(settings.SLOW_QUERY_THRESHOLD_MS)
+
+
+class RequestMetricsMiddleware:
+    """Records latency per matched route template, not per raw path."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path: Optional[str] = getattr(route, "path", None) or "unmatched"
+            metrics.observe_request(
+                scope["method"], path, status_code, time.perf_counter() - start
+            )
@@ -0,0 +1,286 @@
+"""
+Opt-in query diagnostics (QUERY_DIAGNOSTICS). QueryManager reports every read
+slower than SLOW_QUERY_THRESHOLD_MS. A sample of those reads is re-run under
+EXPLAIN (ANALYZE, BUFFERS) on a connection of their own, outside the pool,
+inside a read-only transaction that is always rolled back.
+
+Plans are aggregated per query shape: the builder emits one text per
+combination of filters. When a plan scans a table sequentially and discards
+most of what it reads, an index is suggested from the shape's predicates:
+
+- ILIKE columns: a trigram GIN index
+- equality columns: a composite btree, ending in the ORDER BY column
+- boolean filters: the WHERE of a partial index on either of the above
+"""
+
+import asyncio
+import json
+import random
+import re
+from logging import getLogger
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+
+from app.core.metrics import MAX_QUERY_SHAPES
+from app.core.settings import settings
+
+logger = getLogger(__name__)
+
+EXPLAIN = "EXPLAIN (ANALYZE, BUFFERS, VERBOSE, FORMAT JSON) "
+EXPLAIN_TIMEOUT_SECONDS = 30.0
+
+# samples waiting for the side connection; beyond this they are dropped
+MAX_PENDING_EXPLAINS = 4
+
+# a sequential scan that throws away fewer rows than this is left alone
+SEQ_SCAN_MIN_ROWS_REMOVED = 1000
+
+SELECT_TABLE_INDEXES = """
+    SELECT indexdef FROM pg_indexes
+    WHERE schemaname = $1 AND tablename = $2
+    ORDER BY indexname;
+"""
+
+_PREDICATE = re.compile(r"\b([a-z_][a-z0-9_]*) (=|ILIKE) \$(\d+)", re.IGNORECASE)
+_ORDER_BY = re.compile(r"\bORDER BY ([a-z_][a-z0-9_]*)", re.IGNORECASE)
+
+
+class Predicates:
+    """What an index for a query shape has to serve, read from the SQL."""
+
+    def __init__(self, query: str, params: Sequence[Any]):
+        self.equal: List[str] = []
+        self.ilike: List[str] = []
+        # boolean equalities become the WHERE of a partial index
+        self.flags: List[Tuple[str, bool]] = []
+
+        for column, operator, index in _PREDICATE.findall(query):
+            value = params[int(index) - 1] if int(index) <= len(params) else None
+            if operator.upper() == "ILIKE":
+                self.ilike.append(column)
+            elif isinstance(value, bool):
+                self.flags.append((column, value))
+            else:
+                self.equal.append(column)
+
+        order_by = _ORDER_BY.search(query)
+        self.order_by = order_by.group(1) if order_by else None
+
+
+def suggest_indexes(schema: str, table: str, predicates: Predicates) -> List[str]:
+    where = " AND ".join(
+        column if value else f"NOT {column}" for column, value in predicates.flags
+    )
+    suffix = "_partial" if where else ""
+    where = f" WHERE {where}" if where else ""
+
+    suggestions = [
+        f"CREATE INDEX CONCURRENTLY idx_{table}_{column}_trgm{suffix} "
+        f'ON "{schema}".{table} USING gin ({column} gin_trgm_ops){where};'
+        for column in dict.fromkeys(predicates.ilike)
+    ]
+
+    columns = list(dict.fromkeys(predicates.equal))
+    if predicates.order_by and predicates.order_by not in columns:
+        columns.append(predicates.order_by)
+
+    # with ILIKE and no equality the trigram index is the selective one
+    if predicates.equal or (where and columns and not predicates.ilike):
+        suggestions.append(
+            f"CREATE INDEX CONCURRENTLY idx_{table}_{'_'.join(columns)}{suffix} "
+            f'ON "{schema}".{table} USING btree ({", ".join(columns)}){where};'
+        )
+    return suggestions
+
+
+def _index_signature(definition: str) -> str:
+    # pg_indexes.indexdef and a suggestion agree from USING onwards
+    return definition.split(" USING ", 1)[-1].rstrip(";").lower()
+
+
+def _plan_nodes(plan: Dict[str, Any]):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+class ShapeReport:
+    __slots__ = (
+        "statement",
+        "samples",
+        "total_ms",
+        "max_ms",
+        "shared_hit_blocks",
+        "shared_read_blocks",
+        "seq_scans",
+        "suggestions",
+        "indexes",
+    )
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.samples = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.shared_hit_blocks = 0
+        self.shared_read_blocks = 0
+        self.seq_scans: Dict[str, Dict[str, Any]] = {}
+        self.suggestions: Dict[str, None] = {}
+        self.indexes: Dict[str, List[str]] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "statement": self.statement,
+            "samples": self.samples,
+            "mean_ms": self.total_ms / self.samples if self.samples else 0.0,
+            "max_ms": self.max_ms,
+            "shared_hit_blocks": self.shared_hit_blocks,
+            "shared_read_blocks": self.shared_read_blocks,
+            "seq_scans": list(self.seq_scans.values()),
+            "suggested_indexes": list(self.suggestions),
+            "existing_indexes": self.indexes,
+        }
+
+
+class QueryAdvisor:
+    def __init__(self, enabled: bool, sample_rate: float, max_samples: int):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.max_samples = max_samples
+        self.threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+        self.__shapes: Dict[str, ShapeReport] = {}
+        self.__pending: Dict[str, int] = {}
+        self.__tasks: set = set()
+        self.__conn: Optional[asyncpg.Connection] = None
+        self.__lock = asyncio.Lock()
+
+    def observe(self, query: str, params: Sequence[Any], seconds: float):
+        """Called by QueryManager after each read; cheap when nothing is sampled."""
+        if not self.enabled or seconds < self.threshold:
+            return
+
+        if not query.lstrip(" \t\r\n(").upper().startswith("SELECT"):
+            return
+
+        shape = self.__shapes.get(query)
+        taken = (shape.samples if shape else 0) + self.__pending.get(query, 0)
+        if taken >= self.max_samples:
+            return
+
+        if shape is None and len(self.__shapes) >= MAX_QUERY_SHAPES:
+            return
+
+        if len(self.__tasks) >= MAX_PENDING_EXPLAINS:
+            return
+
+        if random.random() >= self.sample_rate:
+            return
+
+        self.__pending[query] = self.__pending.get(query, 0) + 1
+        task = asyncio.create_task(self.__sample(query, tuple(params)))
+        self.__tasks.add(task)
+        task.add_done_callback(self.__tasks.discard)
+
+    def report(self) -> List[Dict[str, Any]]:
+        shapes = sorted(self.__shapes.values(), key=lambda s: s.total_ms, reverse=True)
+        return [shape.to_dict() for shape in shapes]
+
+    def reset(self):
+        self.__shapes.clear()
+
+    async def stop(self):
+        for task in list(self.__tasks):
+            task.cancel()
+        await asyncio.gather(*self.__tasks, return_exceptions=True)
+
+        if self.__conn is not None:
+            conn, self.__conn = self.__conn, None
+            await conn.close()
+
+    async def __connection(self) -> asyncpg.Connection:
+        if self.__conn is None or self.__conn.is_closed():
+            from app.config.database import db_manager
+
+            self.__conn = await db_manager.create_connection()
+        return self.__conn
+
+    async def __sample(self, query: str, params: Tuple):
+        try:
+            async with self.__lock:
+                conn = await self.__connection()
+                plan = await self.__explain(conn, query, params)
+                await self.__record(conn, query, params, plan)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"EXPLAIN sample failed: {e}")
+        finally:
+            self.__pending[query] -= 1
+            if not self.__pending[query]:
+                del self.__pending[query]
+
+    @staticmethod
+    async def __explain(
+        conn: asyncpg.Connection, query: str, params: Tuple
+    ) -> Dict[str, Any]:
+        # ANALYZE executes the statement: never let it write anything
+        transaction = conn.transaction(readonly=True)
+        await transaction.start()
+        try:
+            result = await conn.fetchval(
+                EXPLAIN + query.strip().rstrip(";"),
+                *params,
+                timeout=EXPLAIN_TIMEOUT_SECONDS,
+            )
+        finally:
+            await transaction.rollback()
+
+        return json.loads(result)[0]
+
+    async def __record(
+        self, conn: asyncpg.Connection, query: str, params: Tuple, plan: Dict
+    ):
+        shape = self.__shapes.get(query)
+        if shape is None:
+            shape = self.__shapes[query] = ShapeReport(" ".join(query.split()))
+
+        execution_ms = plan.get("Execution Time", 0.0)
+        shape.samples += 1
+        shape.total_ms += execution_ms
+        shape.max_ms = max(shape.max_ms, execution_ms)
+        shape.shared_hit_blocks += plan["Plan"].get("Shared Hit Blocks", 0)
+        shape.shared_read_blocks += plan["Plan"].get("Shared Read Blocks", 0)
+
+        for node in _plan_nodes(plan["Plan"]):
+            if node.get("Node Type") != "Seq Scan":
+                continue
+
+            loops = node.get("Actual Loops", 1)
+            removed = node.get("Rows Removed by Filter", 0) * loops
+            if removed < SEQ_SCAN_MIN_ROWS_REMOVED:
+                continue
+
+            schema, table = node.get("Schema", "public"), node["Relation Name"]
+            relation = f"{schema}.{table}"
+            shape.seq_scans[relation] = {
+                "relation": relation,
+                "filter": node.get("Filter"),
+                "rows": node.get("Actual Rows", 0) * loops,
+                "rows_removed": removed,
+            }
+
+            existing = await conn.fetch(SELECT_TABLE_INDEXES, schema, table)
+            shape.indexes[relation] = [row["indexdef"] for row in existing]
+            signatures = {_index_signature(row["indexdef"]) for row in existing}
+
+            for suggestion in suggest_indexes(schema, table, Predicates(query, params)):
+                if _index_signature(suggestion) not in signatures:
+                    shape.suggestions[suggestion] = None
+
+
+query_advisor: QueryAdvisor = QueryAdvisor(
+    settings.QUERY_DIAGNOSTICS,
+    settings.QUERY_DIAGNOSTICS_SAMPLE_RATE,
+    settings.QUERY_DIAGNOSTICS_MAX_SAMPLES,
+)
@@ -0,0 +1,337 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+from typing import Any, Dict, List, Optional, Tuple
+
+import bcrypt
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+
+from app.core.settings import settings
+
+logger = getLogger(__name__)
+
+# bcrypt only reads the first 72 bytes; bcrypt>=5 raises instead of truncating
+BCRYPT_MAX_BYTES = 72
+
+
+def _hash_passwords(passwords: List[str], rounds: int) -> List[str]:
+    return [
+        bcrypt.hashpw(
+            password.encode("utf-8")[:BCRYPT_MAX_BYTES], bcrypt.gensalt(rounds)
+        ).decode("ascii")
+        for password in passwords
+    ]
+
+
+def _verify_password(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(
+            password.encode("utf-8")[:BCRYPT_MAX_BYTES], hashed.encode("ascii")
+        )
+    except ValueError:
+        return False
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a process pool so hashing and verification never block the
+    event loop. Single operations are rejected with 503 once `max_pending`
+    jobs are queued; bulk hashing waits for capacity instead.
+    """
+
+    def __init__(self, workers: Optional[int], rounds: int, max_pending: int):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self.__executor: Optional[ProcessPoolExecutor] = None
+        self.__pending = 0
+        self.__capacity: Optional[asyncio.Condition] = None
+        self.__dummy_hash: Optional["asyncio.Future[List[str]]"] = None
+        self.__metrics: Dict[str, Any] = {
+            "hashed": 0,
+            "verified": 0,
+            "rejected": 0,
+            "jobs": 0,
+            "total_seconds": 0.0,
+            "max_seconds": 0.0,
+        }
+
+    def start(self):
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(
+                f"Password hasher started with {self.workers} workers "
+                f"(bcrypt rounds={self.rounds})"
+            )
+
+    async def shutdown(self):
+        if self.__executor is not None:
+            executor, self.__executor = self.__executor, None
+            await asyncio.to_thread(executor.shutdown, True)
+            logger.info("Password hasher stopped")
+
+    async def __run(self, fn, *args):
+        self.start()
+        loop = asyncio.get_running_loop()
+
+        self.__pending += 1
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self.__executor, fn, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.__pending -= 1
+            self.__metrics["jobs"] += 1
+            self.__metrics["total_seconds"] += elapsed
+            self.__metrics["max_seconds"] = max(self.__metrics["max_seconds"], elapsed)
+            await self.__notify_capacity()
+
+    async def __notify_capacity(self):
+        if self.__capacity is not None:
+            async with self.__capacity:
+                self.__capacity.notify_all()
+
+    def __admit(self):
+        if self.__pending >= self.max_pending:
+            self.__metrics["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password service is busy, try again later",
+                headers={"Retry-After": "1"},
+            )
+
+    async def hash(self, password: str) -> str:
+        self.__admit()
+        hashed = await self.__run(_hash_passwords, [password], self.rounds)
+        self.__metrics["hashed"] += 1
+        return hashed[0]
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        self.__admit()
+        result = await self.__run(_verify_password, password, hashed)
+        self.__metrics["verified"] += 1
+        return result
+
+    async def dummy_hash(self) -> str:
+        """
+        Hash of a random password at the configured rounds, computed once.
+        Checking a password against it costs what a real check does, so a
+        login for an unknown email takes as long as a wrong password.
+        """
+        if self.__dummy_hash is None:
+            self.__dummy_hash = asyncio.ensure_future(
+                self.__run(_hash_passwords, [secrets.token_urlsafe(16)], self.rounds)
+            )
+        try:
+            hashed = await asyncio.shield(self.__dummy_hash)
+        except Exception:
+            self.__dummy_hash = None
+            raise
+        return hashed[0]
+
+    async def hash_many(self, passwords: List[str], chunk_size: int = 32) -> List[str]:
+        """
+        Hashes in chunks, keeping at most `workers` chunks in flight so a bulk
+        import leaves queue room for logins and single creates.
+        """
+        if self.__capacity is None:
+            self.__capacity = asyncio.Condition()
+
+        chunks = [
+            passwords[i : i + chunk_size] for i in range(0, len(passwords), chunk_size)
+        ]
+        in_flight = asyncio.Semaphore(self.workers)
+
+        async def run_chunk(chunk: List[str]) -> List[str]:
+            async with in_flight:
+                async with self.__capacity:
+                    await self.__capacity.wait_for(
+                        lambda: self.__pending < self.max_pending
+                    )
+                return await self.__run(_hash_passwords, chunk, self.rounds)
+
+        results = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+        self.__metrics["hashed"] += len(passwords)
+
+        return [hashed for chunk in results for hashed in chunk]
+
+    def stats(self) -> Dict[str, Any]:
+        jobs = self.__metrics["jobs"]
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "pending": self.__pending,
+            "max_pending": self.max_pending,
+            "hashed": self.__metrics["hashed"],
+            "verified": self.__metrics["verified"],
+            "rejected": self.__metrics["rejected"],
+            "avg_ms": self.__metrics["total_seconds"] / jobs * 1000 if jobs else 0.0,
+            "max_ms": self.__metrics["max_seconds"] * 1000,
+        }
+
+
+password_hasher: PasswordHasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    rounds=settings.PASSWORD_HASH_ROUNDS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+class TokenCache:
+    """
+    Bounded LRU of already verified JWT claims keyed by the token's SHA-256
+    digest. Entries never outlive the token's own `exp`, so a cache hit is as
+    valid as a fresh signature check.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.__entries: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+        self.verifications = 0
+        self.verify_seconds = 0.0
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        key = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+
+        entry = self.__entries.get(key)
+        if entry is not None:
+            claims, expires_at = entry
+            if expires_at > now:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return claims
+            del self.__entries[key]
+
+        self.misses += 1
+        start = time.perf_counter()
+        try:
+            claims = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            )
+        finally:
+            self.verifications += 1
+            self.verify_seconds += time.perf_counter() - start
+
+        expires_at = min(float(claims.get("exp", now)), now + self.ttl_seconds)
+        if expires_at > now and self.max_size > 0:
+            self.__entries[key] = (claims, expires_at)
+            if len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+        return claims
+
+    def clear(self):
+        self.__entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.__entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_verify_ms": (
+                self.verify_seconds / self.verifications * 1000
+                if self.verifications
+                else 0.0
+            ),
+        }
+
+
+token_cache: TokenCache = TokenCache(
+    max_size=settings.TOKEN_CACHE_SIZE,
+    ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS,
+)
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# ASGI scope["state"] key holding (token, claims or None) once verified
+VERIFIED_TOKEN_STATE = "verified_token"
+
+
+def verify_request_token(state: Dict[str, Any], token: str) -> Dict[str, Any]:
+    """
+    token_cache.verify, at most once per request: the outcome is kept in the
+    request's ASGI state, so the admission middleware and the auth dependency
+    count a single cache lookup. Raises JWTError like verify.
+    """
+    verified = state.get(VERIFIED_TOKEN_STATE)
+    if verified is None or verified[0] != token:
+        try:
+            claims = token_cache.verify(token)
+        except JWTError:
+            claims = None
+        verified = state[VERIFIED_TOKEN_STATE] = (token, claims)
+
+    if verified[1] is None:
+        raise JWTError("Invalid or expired token")
+    return verified[1]
+
+
+def create_access_token(subject: Any, claims: Optional[Dict[str, Any]] = None) -> str:
+    now = datetime.now(timezone.utc)
+    payload = {
+        **(claims or {}),
+        "sub": str(subject),
+        "iat": now,
+        "exp": now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    }
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+# claims of the authenticated employee, for code that runs below the routes
+_current_claims: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "current_claims", default=None
+)
+
+
+def current_employee_id() -> Optional[int]:
+    claims = _current_claims.get()
+    subject = claims.get("sub") if claims else None
+    return int(subject) if subject and subject.isdigit() else None
+
+
+async def get_current_employee(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> Dict[str, Any]:
+    if credentials is None or credentials.scheme.lower() != "bearer":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    try:
+        claims = verify_request_token(
+            request.scope.setdefault("state", {}), credentials.credentials
+        )
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # async dependencies share the endpoint's context, so services see this
+    _current_claims.set(claims)
+    return claims
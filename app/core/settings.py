@@ -1,4 +1,4 @@
-from typing import Literal
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -9,15 +9,74 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PASSWORD: str
     DB_NAME: str
+    DB_STATEMENT_CACHE_SIZE: int = 256
+    DB_POOL_MIN_SIZE: Optional[int] = None
+    DB_POOL_MAX_SIZE: Optional[int] = None
+    DB_POOL_ADAPTIVE: bool = True
+    DB_POOL_TARGET_WAIT_MS: float = 5.0
+    DB_POOL_ADJUST_INTERVAL_SECONDS: float = 5.0
+    # max connections shared by all workers; None means no budget
+    DB_CONNECTION_BUDGET: Optional[int] = None
+    # left free for admin sessions and other clients when app.server derives
+    # the budget from the server's max_connections
+    DB_CONNECTION_HEADROOM: int = 10
+    WEB_CONCURRENCY: int = 1
+    # comma separated host[:port] list, e.g. "replica1:5432,replica2"
+    DB_REPLICA_HOSTS: str = ""
+    DB_REPLICA_POOL_MAX_SIZE: Optional[int] = None
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_CHECK_INTERVAL_SECONDS: float = 5.0
+    DB_READ_YOUR_WRITES: bool = False
+    SLOW_QUERY_THRESHOLD_MS: int = 500
+    # opt-in EXPLAIN (ANALYZE, BUFFERS) sampling of slow reads, see query_advisor
+    QUERY_DIAGNOSTICS: bool = False
+    QUERY_DIAGNOSTICS_SAMPLE_RATE: float = 0.1
+    QUERY_DIAGNOSTICS_MAX_SAMPLES: int = 20
 
     # API
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "ADA Restauraciones"
+    GRACEFUL_SHUTDOWN_SECONDS: int = 30
+
+    # ADMISSION CONTROL (app.core.admission); 0 disables a check
+    ADMISSION_CONTROL: bool = True
+    ADMISSION_CLIENT_RATE: float = 50.0
+    ADMISSION_CLIENT_BURST: int = 100
+    ADMISSION_ROUTE_MAX_CONCURRENCY: int = 64
+    # comma separated "METHOD /route/template=limit" overrides, e.g.
+    # "GET /api/v1/auth/employees/stream=4"
+    ADMISSION_ROUTE_LIMITS: str = ""
+    # estimated pool wait past which requests are answered 503
+    ADMISSION_READ_MAX_WAIT_MS: int = 250
+    ADMISSION_WRITE_MAX_WAIT_MS: int = 1000
+
+    # IMPORTS
+    # every row is bcrypt-hashed while the request waits, sharing the hasher
+    # pool with logins, so one import stays small; split larger files
+    BULK_IMPORT_MAX_ROWS: int = 1000
+    BULK_UPDATE_MAX_ROWS: int = 10000
+
+    # AUDIT
+    AUDIT_QUEUE_MAX_SIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    # with a full queue "block" waits up to AUDIT_BLOCK_TIMEOUT_SECONDS for
+    # room and then drops the event, "drop" drops it right away
+    AUDIT_OVERFLOW: Literal["block", "drop"] = "block"
+    AUDIT_BLOCK_TIMEOUT_SECONDS: float = 2.0
+    AUDIT_FLUSH_ON_SHUTDOWN: bool = True
+    # failed COPYs of one batch before it is dead-lettered to the log
+    AUDIT_FLUSH_MAX_ATTEMPTS: int = 10
 
     # SECURITY
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    PASSWORD_HASH_MAX_PENDING: int = 64
 
     # ENVIRONMENT
     ENVIRONMENT: Literal["dev", "prod"] = "dev"
@@ -0,0 +1,141 @@
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.database.query_cache import CompiledQuery, QueryCache
+
+_PLACEHOLDER = re.compile(r"\$(\d+)")
+_RETURNING = re.compile(r"\bRETURNING\b", re.IGNORECASE)
+_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+_LOCKING = re.compile(
+    r"\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE|KEY\s+SHARE)\b", re.IGNORECASE
+)
+
+FUSABLE_KINDS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+class Statement(NamedTuple):
+    """
+    One step of a batch. `name` makes its rows available to the statements
+    after it in a fused batch, e.g. `INSERT ... SELECT role.id FROM role`.
+    """
+
+    query: str
+    params: Tuple = ()
+    name: Optional[str] = None
+
+
+class StatementResult(NamedTuple):
+    name: str
+    rows: List[Dict[str, Any]]
+    rowcount: int
+
+
+class FusedBatch(NamedTuple):
+    compiled: CompiledQuery
+    names: Tuple[str, ...]
+    # False for DML without RETURNING: only its row count comes back
+    returns_rows: Tuple[bool, ...]
+
+
+def _kind(query: str) -> str:
+    return query.lstrip(" \t\r\n(").split(None, 1)[0].upper()
+
+
+def returns_rows(query: str) -> bool:
+    return _kind(query) in ("SELECT", "WITH", "VALUES", "TABLE") or bool(
+        _RETURNING.search(query)
+    )
+
+
+def is_read_only(statements: Sequence[Statement]) -> bool:
+    """True when every statement is a plain SELECT, which a replica can run."""
+    return all(
+        _kind(statement.query) == "SELECT" and not _LOCKING.search(statement.query)
+        for statement in statements
+    )
+
+
+def statement_names(statements: Sequence[Statement]) -> Tuple[str, ...]:
+    names = tuple(
+        statement.name or f"s{index}" for index, statement in enumerate(statements)
+    )
+    for name in names:
+        if not _NAME.match(name):
+            raise ValueError(f"Invalid statement name {name!r}")
+    if len(set(names)) != len(names):
+        raise ValueError("Statement names must be unique within a batch")
+    return names
+
+
+def _compile_fused(statements: Sequence[Statement]) -> FusedBatch:
+    names = statement_names(statements)
+    ctes: List[str] = []
+    outputs: List[str] = []
+    flags: List[bool] = []
+    offset = 0
+
+    for name, statement in zip(names, statements):
+        query = statement.query.strip().rstrip(";")
+        if _kind(query) not in FUSABLE_KINDS:
+            raise ValueError(
+                f"Only SELECT/INSERT/UPDATE/DELETE can be fused, got {query[:40]!r}"
+            )
+
+        has_rows = returns_rows(query)
+        if not has_rows:
+            # a CTE needs RETURNING to be counted; the 1s never leave the server
+            query += " RETURNING 1"
+
+        shift = offset
+        query = _PLACEHOLDER.sub(lambda m: f"${int(m.group(1)) + shift}", query)
+        offset += len(statement.params)
+
+        ctes.append(f"{name} AS (\n{query}\n)")
+        if has_rows:
+            outputs.append(f"ARRAY(SELECT t FROM {name} t) AS {name}_rows")
+            # json keeps the column order, so this names the record fields
+            outputs.append(
+                f"ARRAY(SELECT json_object_keys(row_to_json(t)) "
+                f"FROM (SELECT * FROM {name} LIMIT 1) t) AS {name}_columns"
+            )
+        else:
+            outputs.append(f"(SELECT count(*) FROM {name}) AS {name}_count")
+        flags.append(has_rows)
+
+    sql = "WITH " + ",\n".join(ctes) + "\nSELECT " + ",\n    ".join(outputs) + ";"
+    return FusedBatch(CompiledQuery(sql, offset), names, tuple(flags))
+
+
+# fused batches by statement shape, apart from query_cache's single statements
+fused_cache: QueryCache[FusedBatch] = QueryCache(max_size=256)
+
+
+def fuse(statements: Sequence[Statement]) -> Tuple[FusedBatch, Tuple]:
+    """
+    Folds the statements into a single `WITH ... SELECT` so the whole batch is
+    one round trip and one implicit transaction. Every statement sees the
+    snapshot taken before the batch: later steps only see earlier ones
+    through their names, never through the tables they modified.
+
+    Rows come back as typed records, so every returned column must be of a
+    built-in type. Placeholders are renumbered textually; `$n` must not
+    appear inside string literals.
+    """
+    key = ("batch", tuple((s.query, s.name, len(s.params)) for s in statements))
+    batch = fused_cache.get_or_compile(key, lambda: _compile_fused(statements))
+
+    params = tuple(value for statement in statements for value in statement.params)
+    return batch, params
+
+
+def unpack_fused(batch: FusedBatch, record) -> List[StatementResult]:
+    results = []
+    for name, has_rows in zip(batch.names, batch.returns_rows):
+        if not has_rows:
+            results.append(StatementResult(name, [], record[f"{name}_count"]))
+            continue
+
+        columns = record[f"{name}_columns"] or []
+        rows = [dict(zip(columns, row)) for row in record[f"{name}_rows"] or []]
+        results.append(StatementResult(name, rows, len(rows)))
+    return results
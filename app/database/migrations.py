@@ -0,0 +1,141 @@
+import hashlib
+import time
+from logging import getLogger
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import asyncpg
+
+from app.config.database import db_manager
+from app.database.seeder_query import MIGRATIONS
+
+logger = getLogger(__name__)
+
+# pg_advisory_lock key shared by every process running migrations
+MIGRATIONS_LOCK_KEY = 0x5441_4C4C  # "TALL"
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS public.schema_migrations (
+    name TEXT PRIMARY KEY,
+    checksum CHAR(64) NOT NULL,
+    duration_ms DOUBLE PRECISION NOT NULL,
+    applied_at TIMESTAMPTZ DEFAULT NOW()
+);
+"""
+
+SELECT_APPLIED_MIGRATIONS = """
+    SELECT name, checksum FROM public.schema_migrations;
+"""
+
+INSERT_APPLIED_MIGRATION = """
+    INSERT INTO public.schema_migrations (name, checksum, duration_ms)
+    VALUES ($1, $2, $3);
+"""
+
+
+class MigrationDriftError(RuntimeError):
+    """An applied step's SQL was edited; changes need a new step."""
+
+
+class Migration(NamedTuple):
+    name: str
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.strip().encode()).hexdigest()
+
+
+class MigrationResult(NamedTuple):
+    name: str
+    status: str
+    duration_ms: float
+
+
+async def _applied_checksums(conn: asyncpg.Connection) -> Dict[str, str]:
+    try:
+        rows = await conn.fetch(SELECT_APPLIED_MIGRATIONS)
+    except asyncpg.UndefinedTableError:
+        return {}
+    return {row["name"]: row["checksum"] for row in rows}
+
+
+def _pending(
+    migrations: Sequence[Migration], applied: Dict[str, str]
+) -> List[Migration]:
+    """
+    Steps never applied. Raises MigrationDriftError when an applied step's
+    SQL changed: its statements are idempotent CREATE ... IF NOT EXISTS, so
+    running them again would record the edit as applied and change nothing.
+    """
+    drifted = [
+        m.name
+        for m in migrations
+        if m.name in applied and applied[m.name] != m.checksum
+    ]
+    if drifted:
+        raise MigrationDriftError(
+            f"Applied migrations were edited: {', '.join(drifted)}. "
+            f"Restore them and append a new step with the change."
+        )
+
+    return [m for m in migrations if m.name not in applied]
+
+
+async def run_migrations(
+    steps: Sequence[Tuple[str, str]] = MIGRATIONS,
+) -> List[MigrationResult]:
+    """
+    Applies the steps not yet recorded, refusing to start when a recorded
+    step's SQL has changed since. When nothing is pending this is a single
+    SELECT with no locks; otherwise concurrent starters queue on an advisory
+    lock and re-check, so only one of them does the work.
+    """
+    migrations = [Migration(name, sql) for name, sql in steps]
+    results: List[MigrationResult] = []
+
+    async with db_manager.get_connection() as conn:
+        if not _pending(migrations, await _applied_checksums(conn)):
+            logger.info(f"Schema up to date ({len(migrations)} migrations)")
+            return results
+
+        lock_start = time.perf_counter()
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATIONS_LOCK_KEY)
+        logger.info(
+            f"Migration lock acquired in "
+            f"{(time.perf_counter() - lock_start) * 1000:.1f} ms"
+        )
+
+        try:
+            await conn.execute(CREATE_MIGRATIONS_TABLE)
+            applied = await _applied_checksums(conn)
+            pending = {m.name for m in _pending(migrations, applied)}
+
+            for migration in migrations:
+                if migration.name not in pending:
+                    results.append(MigrationResult(migration.name, "skipped", 0.0))
+                    continue
+
+                start = time.perf_counter()
+                async with conn.transaction():
+                    await conn.execute(migration.sql)
+                    duration_ms = (time.perf_counter() - start) * 1000
+                    await conn.execute(
+                        INSERT_APPLIED_MIGRATION,
+                        migration.name,
+                        migration.checksum,
+                        duration_ms,
+                    )
+
+                results.append(MigrationResult(migration.name, "applied", duration_ms))
+                logger.info(
+                    f"Migration {migration.name} applied in {duration_ms:.1f} ms"
+                )
+
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATIONS_LOCK_KEY)
+
+    applied_count = sum(1 for result in results if result.status != "skipped")
+    total_ms = sum(result.duration_ms for result in results)
+    logger.info(f"{applied_count} migrations applied in {total_ms:.1f} ms")
+
+    return results
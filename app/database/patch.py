@@ -0,0 +1,181 @@
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.settings import settings
+from app.database.batch import Statement
+from app.database.query_builder import QueryBuilder
+from app.database.query_cache import CompiledQuery, query_cache
+from app.database.query_manager import QueryManager
+
+# returned on every patch: the key and the new version for the next If-Match
+PATCH_ALWAYS_RETURNED = ("id", "updated_at")
+
+
+def returning_columns(fields: Optional[str], allowed: Sequence[str]) -> List[str]:
+    """
+    Columns for RETURNING from a comma-separated `fields` query value, always
+    led by PATCH_ALWAYS_RETURNED. Raises ValueError naming any unknown column.
+    """
+    requested = [field.strip() for field in (fields or "").split(",") if field.strip()]
+
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    columns = list(PATCH_ALWAYS_RETURNED)
+    columns += [field for field in requested if field not in columns]
+    return columns
+
+
+async def patch_row(
+    qm: QueryManager,
+    schema: str,
+    table: str,
+    id: int,
+    values: Dict[str, Any],
+    version: Optional[datetime],
+    returning: List[str],
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Writes only `values` to row `id`, and only while its updated_at still
+    equals `version` (any version when None). There are no row locks: a
+    concurrent writer moves updated_at and this UPDATE matches nothing.
+
+    Returns the updated row and True. When nothing matched, it returns no
+    rows and whether the row exists, so the caller can answer 412 rather
+    than 404.
+    """
+    qb = QueryBuilder(schema, table)
+    qb.set_nullable(**values)
+    qb.where(id=id, updated_at=version)
+    query, params = qb.build_update(returning)
+
+    rows = await qm.write(query, params, True)
+    if rows:
+        return rows, True
+
+    qb = QueryBuilder(schema, table)
+    qb.select("id").where(id=id)
+    query, params = qb.build_select()
+
+    return [], bool(await qm.select(query, params))
+
+
+class RowPatch(NamedTuple):
+    id: int
+    values: Dict[str, Any]
+    # None writes whatever version the row is at
+    version: Optional[datetime] = None
+
+
+def row_patches(items: Sequence[Any]) -> List[RowPatch]:
+    """
+    RowPatch per bulk request item (`id`, `updated_at`, `changes`), with the
+    changes the client actually sent. Raises ValueError for an empty or
+    oversized request, a repeated id or an item without changes.
+    """
+    if not items:
+        raise ValueError("No rows to update")
+
+    if len(items) > settings.BULK_UPDATE_MAX_ROWS:
+        raise ValueError(
+            f"A single update accepts up to {settings.BULK_UPDATE_MAX_ROWS} rows"
+        )
+
+    patches = []
+    seen = set()
+    for item in items:
+        # one statement must not write the same row twice
+        if item.id in seen:
+            raise ValueError(f"id {item.id} appears more than once")
+        seen.add(item.id)
+
+        values = item.changes.model_dump(exclude_unset=True)
+        if not values:
+            raise ValueError(f"No fields to update for id {item.id}")
+        patches.append(RowPatch(item.id, values, item.updated_at))
+
+    return patches
+
+
+def build_bulk_update(
+    schema: str, table: str, columns: Tuple[str, ...], types: Dict[str, str]
+) -> str:
+    """
+    One UPDATE for every row that changes exactly `columns`: the ids,
+    versions and new values travel as parallel arrays and are joined back
+    through unnest, so the statement text depends on the column set only.
+
+        $1 ids  $2 versions  $3.. one array per column, in `columns` order
+    """
+
+    def compile_update() -> CompiledQuery:
+        arrays = ", ".join(
+            f"${index}::{types[column]}[]"
+            for index, column in enumerate(columns, start=3)
+        )
+        query = f"""
+            UPDATE "{schema}".{table} AS t
+            SET {", ".join(f"{column} = u.{column}" for column in columns)}
+            FROM unnest($1::int[], $2::timestamptz[], {arrays})
+                AS u(id, version, {", ".join(columns)})
+            WHERE t.id = u.id AND (u.version IS NULL OR t.updated_at = u.version)
+            RETURNING t.id, t.updated_at
+        """
+        return CompiledQuery(query, len(columns) + 2)
+
+    key = ("bulk_update", schema, table, columns)
+    return query_cache.get_or_compile(key, compile_update).sql
+
+
+async def bulk_patch_rows(
+    qm: QueryManager,
+    schema: str,
+    table: str,
+    patches: Sequence[RowPatch],
+    types: Dict[str, str],
+) -> List[Dict[str, Any]]:
+    """
+    Applies `patches` with one UPDATE per distinct set of changed columns,
+    all fused into a single atomic round trip. `types` maps each patchable
+    column to its Postgres type, and the ids must be unique.
+
+    Returns one outcome per patch, in order: "updated" with the new
+    updated_at, "conflict" when the row moved past its version, or
+    "not_found".
+    """
+    groups: Dict[Tuple[str, ...], List[RowPatch]] = {}
+    for patch in patches:
+        groups.setdefault(tuple(sorted(patch.values)), []).append(patch)
+
+    statements = []
+    for index, (columns, group) in enumerate(groups.items()):
+        params = (
+            [patch.id for patch in group],
+            [patch.version for patch in group],
+            *([patch.values[column] for patch in group] for column in columns),
+        )
+        query = build_bulk_update(schema, table, columns, types)
+        statements.append(Statement(query, params, f"g{index}"))
+
+    results = await qm.batch(statements, fuse=True)
+    updated = {
+        row["id"]: row["updated_at"] for result in results for row in result.rows
+    }
+
+    existing = set()
+    missed = [patch.id for patch in patches if patch.id not in updated]
+    if missed:
+        query = f'SELECT id FROM "{schema}".{table} WHERE id = ANY($1::int[])'
+        existing = {row["id"] for row in await qm.select(query, (missed,))}
+
+    outcomes = []
+    for patch in patches:
+        if patch.id in updated:
+            outcomes.append(
+                {"id": patch.id, "status": "updated", "updated_at": updated[patch.id]}
+            )
+        else:
+            status = "conflict" if patch.id in existing else "not_found"
+            outcomes.append({"id": patch.id, "status": status})
+    return outcomes
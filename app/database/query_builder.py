@@ -1,17 +1,21 @@
 from typing import Any, Optional, Tuple, List, Literal
 
+from app.database.query_cache import CompiledQuery, query_cache
+
 
 class QueryBuilder:
     def __init__(self, schema: str, table: str):
         self.__table = f'"{schema}".{table}'
-        self.__conditions: List[str] = []
+        self.__conditions: List[Tuple[str, str, int]] = []
         self.__insert_columns: List[str] = []
         self.__params: List[Any] = []
         self.__param_count = 1
         self.__select_fields = "*"
-        self.__set_fields: List[str] = []
-        self.__order_by_clause = ""
-        self.__limit_clause = ""
+        self.__set_fields: List[Tuple[str, int]] = []
+        self.__order_by: Optional[Tuple[str, str]] = None
+        self.__limit: Optional[Tuple[int, int]] = None
+        self.__keyset: Optional[Tuple[str, str, str, bool]] = None
+        self.__keyset_params: List[Any] = []
 
     def select(self, *fields: str) -> "QueryBuilder":
         if fields:
@@ -23,16 +27,26 @@ class QueryBuilder:
             if value:
                 self.__insert_columns.append(column)
                 self.__params.append(value)
+        return self
 
     def set(self, **fields) -> "QueryBuilder":
         for field, value in fields.items():
             if value is not None:
-                self.__set_fields.append(f"{field} = ${self.__param_count}")
+                self.__set_fields.append((field, self.__param_count))
                 self.__params.append(value)
                 self.__param_count += 1
 
         return self
 
+    def set_nullable(self, **fields) -> "QueryBuilder":
+        """Like set, but a None value is written as NULL instead of skipped."""
+        for field, value in fields.items():
+            self.__set_fields.append((field, self.__param_count))
+            self.__params.append(value)
+            self.__param_count += 1
+
+        return self
+
     def where(self, **filters) -> "QueryBuilder":
         self.__where_conditions(False, filters)
         return self
@@ -45,7 +59,7 @@ class QueryBuilder:
         conector = "ILIKE" if ilike else "="
         for field, value in filters.items():
             if value is not None:
-                self.__conditions.append(f"{field} {conector} ${self.__param_count}")
+                self.__conditions.append((field, conector, self.__param_count))
                 self.__params.append(value)
                 self.__param_count += 1
         return self
@@ -53,21 +67,71 @@ class QueryBuilder:
     def order_by(
         self, field: str, direction: Literal["ASC", "DESC"] = "ASC"
     ) -> "QueryBuilder":
-        self.__order_by_clause = f"ORDER BY {field} {direction}"
+        self.__order_by = (field, direction)
         return self
 
     def limit(self, limit: int, offset: int = 0) -> "QueryBuilder":
-        self.__limit_clause = f"LIMIT {limit} OFFSET {offset}"
+        self.__limit = (limit, offset)
         return self
 
+    def keyset(
+        self,
+        sort_key: str,
+        limit: int,
+        after: Optional[Tuple[Any, Any]] = None,
+        direction: Literal["ASC", "DESC"] = "ASC",
+        tiebreaker: str = "id",
+    ) -> "QueryBuilder":
+        """
+        Seek pagination on (sort_key, tiebreaker): rows strictly after the
+        `after` pair in the given direction, so deep pages cost the same as
+        the first one. Replaces any order_by/limit set on the builder.
+        """
+        self.__keyset = (sort_key, tiebreaker, direction, after is not None)
+        self.__keyset_params = []
+
+        if after is not None:
+            sort_value, tiebreaker_value = after
+            if sort_key != tiebreaker:
+                self.__keyset_params.append(sort_value)
+            self.__keyset_params.append(tiebreaker_value)
+
+        self.__keyset_params.append(limit)
+        return self
+
+    def __build_keyset_condition(self) -> str:
+        sort_key, tiebreaker, direction, has_after = self.__keyset
+        if not has_after:
+            return ""
+
+        comparator = ">" if direction == "ASC" else "<"
+        index = self.__param_count
+
+        if sort_key == tiebreaker:
+            return f"{tiebreaker} {comparator} ${index}"
+
+        return f"({sort_key}, {tiebreaker}) {comparator} (${index}, ${index + 1})"
+
     def __build_where_clause(self) -> str:
-        if self.__conditions:
-            return "WHERE " + " AND ".join(self.__conditions)
+        conditions = [
+            f"{field} {conector} ${index}"
+            for field, conector, index in self.__conditions
+        ]
+
+        if self.__keyset:
+            keyset_condition = self.__build_keyset_condition()
+            if keyset_condition:
+                conditions.append(keyset_condition)
+
+        if conditions:
+            return "WHERE " + " AND ".join(conditions)
         return ""
 
     def __build_set_clause(self) -> str:
         if self.__set_fields:
-            return "SET " + ", ".join(self.__set_fields)
+            return "SET " + ", ".join(
+                f"{field} = ${index}" for field, index in self.__set_fields
+            )
         return ""
 
     def __build_insert_clause(self) -> str:
@@ -75,66 +139,119 @@ class QueryBuilder:
             return "(" + ", ".join(self.__insert_columns) + ")"
         return ""
 
-    def __build_select_query(self) -> str:
-        where_clause = self.__build_where_clause()
+    def __build_order_by_clause(self) -> str:
+        if self.__keyset:
+            sort_key, tiebreaker, direction, _ = self.__keyset
+            if sort_key == tiebreaker:
+                return f"ORDER BY {tiebreaker} {direction}"
+            return f"ORDER BY {sort_key} {direction}, {tiebreaker} {direction}"
 
-        query = f"""
-            SELECT {self.__select_fields}
-            FROM {self.__table} 
-            {where_clause}
-            {self.__order_by_clause}
-            {self.__limit_clause}
-        """.strip()
+        if self.__order_by:
+            return f"ORDER BY {self.__order_by[0]} {self.__order_by[1]}"
+        return ""
+
+    def __build_limit_clause(self) -> str:
+        if self.__keyset:
+            return f"LIMIT ${self.__param_count + len(self.__keyset_params) - 1}"
+
+        if self.__limit:
+            return f"LIMIT ${self.__param_count} OFFSET ${self.__param_count + 1}"
+        return ""
+
+    @staticmethod
+    def __join(*clauses: str) -> str:
+        return " ".join(clause for clause in clauses if clause)
 
-        return query
+    def __select_params(self) -> List[Any]:
+        params = list(self.__params)
+        if self.__keyset:
+            params.extend(self.__keyset_params)
+        elif self.__limit:
+            params.extend(self.__limit)
+        return params
+
+    def __compile_select(self) -> CompiledQuery:
+        query = self.__join(
+            f"SELECT {self.__select_fields}",
+            f"FROM {self.__table}",
+            self.__build_where_clause(),
+            self.__build_order_by_clause(),
+            self.__build_limit_clause(),
+        )
+        return CompiledQuery(query, len(self.__select_params()))
+
+    def compile_select(self) -> Tuple[CompiledQuery, List[Any]]:
+        key = (
+            "select",
+            self.__table,
+            self.__select_fields,
+            tuple(self.__conditions),
+            self.__keyset or self.__order_by,
+            self.__limit is not None,
+        )
+        compiled = query_cache.get_or_compile(key, self.__compile_select)
+
+        return compiled, self.__select_params()
 
     def build_select(self) -> Tuple[str, Optional[Tuple]]:
-        query = self.__build_select_query()
-        return query, tuple(self.__params) if self.__params else None
+        compiled, params = self.compile_select()
+        return compiled.sql, compiled.bind(params)
 
-    def __build_insert_values(self) -> "QueryBuilder":
+    def __build_insert_values(self) -> str:
         if self.__insert_columns:
             placeholders = [f"${i + 1}" for i in range(len(self.__insert_columns))]
-            return "VALUES (" + " ,".join(placeholders) + ")"
+            return "VALUES (" + ", ".join(placeholders) + ")"
         return ""
 
-    def build_insert(self, returning: Optional[List[str]] = None) -> Tuple[str, Tuple]:
-        columns_clause = self.__build_insert_clause()
-        value_clause = self.__build_insert_values()
+    @staticmethod
+    def __build_returning_clause(returning: Optional[Tuple[str, ...]]) -> str:
+        if returning:
+            return f"RETURNING {', '.join(returning)}"
+        return ""
 
-        if not columns_clause:
+    def build_insert(self, returning: Optional[List[str]] = None) -> Tuple[str, Tuple]:
+        if not self.__insert_columns:
             raise ValueError("INSERT requerid at least one column")
 
-        returning_clause = ""
-        if returning:
-            returning_clause = f"RETURNING {', '.join(returning)}"
+        returning_fields = tuple(returning) if returning else None
 
-        query = f"""
-            INSERT INTO {self.__table} {columns_clause}
-            {value_clause}
-            {returning_clause}
-        """
+        def compile_insert() -> CompiledQuery:
+            query = self.__join(
+                f"INSERT INTO {self.__table} {self.__build_insert_clause()}",
+                self.__build_insert_values(),
+                self.__build_returning_clause(returning_fields),
+            )
+            return CompiledQuery(query, len(self.__insert_columns))
+
+        key = ("insert", self.__table, tuple(self.__insert_columns), returning_fields)
+        compiled = query_cache.get_or_compile(key, compile_insert)
 
-        return query, tuple(self.__params) if self.__params else None
+        return compiled.sql, compiled.bind(self.__params)
 
     def build_update(
         self, returning: Optional[List[str]] = None
     ) -> Tuple[str, Optional[Tuple]]:
-        set_clause = self.__build_set_clause()
-        where_clause = self.__build_where_clause()
-
-        if not set_clause:
+        if not self.__set_fields:
             raise ValueError("UPDATE requires at least one field in SET clause")
 
-        returning_clause = ""
-        if returning:
-            returning_clause = f"RETURNING {', '.join(returning)}"
+        returning_fields = tuple(returning) if returning else None
 
-        query = f"""
-            UPDATE {self.__table}
-            {set_clause}
-            {where_clause}
-            {returning_clause}
-        """
+        def compile_update() -> CompiledQuery:
+            query = self.__join(
+                f"UPDATE {self.__table}",
+                self.__build_set_clause(),
+                self.__build_where_clause(),
+                self.__build_returning_clause(returning_fields),
+            )
+            return CompiledQuery(query, len(self.__params))
+
+        key = (
+            "update",
+            self.__table,
+            tuple(self.__set_fields),
+            tuple(self.__conditions),
+            returning_fields,
+        )
+        compiled = query_cache.get_or_compile(key, compile_update)
 
-        return query, tuple(self.__params) if self.__params else None
+        return compiled.sql, compiled.bind(self.__params)
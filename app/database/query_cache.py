@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+class CompiledQuery(NamedTuple):
+    sql: str
+    param_count: int
+
+    def bind(self, params: Sequence[Any]) -> Optional[Tuple]:
+        if len(params) != self.param_count:
+            raise ValueError(
+                f"Query expects {self.param_count} params, got {len(params)}"
+            )
+        return tuple(params) if params else None
+
+
+class QueryCache(Generic[T]):
+    """
+    Compiled SQL keyed by query shape (table, fields, columns and operators).
+
+    The values never take part in the key, so every request with the same
+    filters reuses the same text and asyncpg's per-connection statement cache
+    skips the server-side parse/plan step as well. Past `max_size` shapes the
+    least recently used one is evicted. Each kind of compiled value gets its
+    own instance, so one kind never evicts another.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.__entries: "OrderedDict[Hashable, T]" = OrderedDict()
+        self.__max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compile(self, key: Hashable, compile_fn: Callable[[], T]) -> T:
+        compiled = self.__entries.get(key)
+        if compiled is not None:
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return compiled
+
+        self.misses += 1
+        compiled = compile_fn()
+
+        if self.__max_size > 0:
+            self.__entries[key] = compiled
+            if len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+        return compiled
+
+    def clear(self):
+        self.__entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.__entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+query_cache: QueryCache[CompiledQuery] = QueryCache()
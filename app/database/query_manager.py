@@ -1,14 +1,53 @@
+from contextlib import nullcontext
 from logging import getLogger
-from typing import Any, Dict, Optional, List, Tuple
+from time import perf_counter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
+    Optional,
+    List,
+    Sequence,
+    Tuple,
+)
 import asyncpg
 
+from app.config.replicas import mark_write
+from app.core.metrics import metrics
+from app.core.query_advisor import query_advisor
+from app.database.batch import (
+    Statement,
+    StatementResult,
+    fuse as fuse_statements,
+    is_read_only,
+    returns_rows,
+    statement_names,
+    unpack_fused,
+)
+from app.utils.encoders import RecordSet, encoder_for_columns, encoder_for_record
+
+if TYPE_CHECKING:
+    from app.config.database import RequestConnection
+
 logger = getLogger(__name__)
 
 
+def _affected_rows(status: str) -> int:
+    # command tags look like "UPDATE 3" or "INSERT 0 1"
+    count = status.rsplit(" ", 1)[-1]
+    return int(count) if count.isdigit() else 0
+
+
 class QueryManager:
-    def __init__(self, connection: Optional[asyncpg.Connection] = None):
+    def __init__(
+        self,
+        connection: Optional[asyncpg.Connection] = None,
+        db: Optional["RequestConnection"] = None,
+    ):
         self._conn = connection
-        self._owns_connection = connection is None
+        self._db = db
+        self._owns_connection = connection is None and db is None
 
     @property
     def _db_manager(self):
@@ -16,30 +55,47 @@ class QueryManager:
 
         return db_manager
 
-    async def _get_connection(self) -> asyncpg.Connection:
+    async def _get_connection(self, readonly: bool = False) -> asyncpg.Connection:
+        if not readonly:
+            mark_write()
+
         if self._conn:
             return self._conn
 
+        if self._db is not None:
+            return await self._db.acquire(readonly)
+
         if not self._db_manager.pool:
             raise RuntimeError(
                 "Database pool not initialized. Call db_manager.connect() first."
             )
 
-        return await self._db_manager.pool.acquire()
+        return await self._db_manager.acquire(readonly)
 
     async def _release_connection(self, conn: asyncpg.Connection):
         if self._owns_connection and self._db_manager.pool:
-            await self._db_manager.pool.release(conn)
+            await self._db_manager.release(conn)
 
     async def select(
         self, query: str, params: Optional[Tuple] = None
     ) -> List[Dict[str, Any]]:
+        conn = None
         try:
-            conn = await self._get_connection()
+            conn = await self._get_connection(readonly=True)
 
-            result = (
-                await conn.fetch(query, *params) if params else await conn.fetch(query)
-            )
+            start = perf_counter()
+            try:
+                result = (
+                    await conn.fetch(query, *params)
+                    if params
+                    else await conn.fetch(query)
+                )
+            except Exception:
+                metrics.observe_query(query, perf_counter() - start, error=True)
+                raise
+            elapsed = perf_counter() - start
+            metrics.observe_query(query, elapsed, len(result))
+            query_advisor.observe(query, params or (), elapsed)
 
             return [dict(row) for row in result]
 
@@ -47,6 +103,79 @@ class QueryManager:
             if conn:
                 await self._release_connection(conn)
 
+    async def select_records(
+        self, query: str, params: Optional[Tuple] = None
+    ) -> RecordSet:
+        """
+        Like select, but keeps the asyncpg records and pairs them with an
+        encoder for their column layout, so the response is written straight
+        from the records.
+        """
+        conn = None
+        try:
+            conn = await self._get_connection(readonly=True)
+            args = params or ()
+
+            start = perf_counter()
+            try:
+                records = await conn.fetch(query, *args)
+            except Exception:
+                metrics.observe_query(query, perf_counter() - start, error=True)
+                raise
+            elapsed = perf_counter() - start
+            metrics.observe_query(query, elapsed, len(records))
+            query_advisor.observe(query, args, elapsed)
+
+            # read from each result, so it follows schema changes behind
+            # SELECT * without tracking statements
+            encoder = (
+                encoder_for_record(records[0]) if records else encoder_for_columns(())
+            )
+            return RecordSet(records, encoder)
+
+        finally:
+            if conn:
+                await self._release_connection(conn)
+
+    async def stream(
+        self, query: str, params: Optional[Tuple] = None, batch_size: int = 500
+    ) -> AsyncIterator[List[asyncpg.Record]]:
+        """
+        Yields the result in batches from a server-side cursor, so memory stays
+        bounded by `batch_size` rows whatever the size of the result. The
+        connection is held until the consumer exhausts or closes the iterator,
+        which is after the handler returned, so a request scope is never used.
+        """
+        conn = None
+        rows = 0
+        failed = True
+        start = perf_counter()
+        try:
+            conn = self._conn or await self._db_manager.acquire(readonly=True)
+
+            async with conn.transaction(readonly=True):
+                batch: List[asyncpg.Record] = []
+                async for record in conn.cursor(
+                    query, *(params or ()), prefetch=batch_size
+                ):
+                    batch.append(record)
+                    if len(batch) >= batch_size:
+                        rows += len(batch)
+                        yield batch
+                        batch = []
+
+                if batch:
+                    rows += len(batch)
+                    yield batch
+
+            failed = False
+
+        finally:
+            # includes the time the client took to consume the stream
+            metrics.observe_query(query, perf_counter() - start, rows, failed)
+            if conn and self._conn is None:
+                await self._db_manager.release(conn)
+
     async def write(
         self, query: str, params: Optional[Tuple] = None, returning: bool = False
     ) -> List[Dict[str, Any]]:
@@ -54,64 +183,164 @@ class QueryManager:
         try:
             conn = await self._get_connection()
 
-            if returning:
-                result = (
-                    await conn.fetch(query, *params)
-                    if params
-                    else await conn.fetch(query)
-                )
-
-                return [dict(row) for row in result]
-
-            else:
-                result = (
-                    await conn.execute(query, *params)
-                    if params
-                    else await conn.execute(query)
-                )
+            start = perf_counter()
+            try:
+                if returning:
+                    result = (
+                        await conn.fetch(query, *params)
+                        if params
+                        else await conn.fetch(query)
+                    )
+                    rows = len(result)
+                else:
+                    result = (
+                        await conn.execute(query, *params)
+                        if params
+                        else await conn.execute(query)
+                    )
+                    rows = _affected_rows(result)
+            except Exception:
+                metrics.observe_query(query, perf_counter() - start, error=True)
+                raise
+            metrics.observe_query(query, perf_counter() - start, rows)
 
-                return []
+            return [dict(row) for row in result] if returning else []
 
         finally:
             if conn:
                 await self._release_connection(conn)
 
+    async def batch(
+        self, statements: Sequence[Statement], fuse: bool = False
+    ) -> List[StatementResult]:
+        """
+        Runs the statements atomically and returns one result per statement.
+        With fuse=True they travel as a single compound statement, one round
+        trip in total (see app.database.batch.fuse for what that implies);
+        otherwise they run one after another inside a transaction. A batch
+        of plain SELECTs is routed like select(), so it may run on a replica.
+        """
+        if not statements:
+            return []
+
+        conn = await self._get_connection(readonly=is_read_only(statements))
+        try:
+            if fuse and len(statements) > 1:
+                return await self.__run_fused(conn, statements)
+            return await self.__run_sequential(conn, statements)
+
+        except Exception as e:
+            logger.error(f"Batch failed: Rolling back: {e}")
+            raise
+        finally:
+            await self._release_connection(conn)
+
+    async def __run_fused(
+        self, conn: asyncpg.Connection, statements: Sequence[Statement]
+    ) -> List[StatementResult]:
+        batch, params = fuse_statements(statements)
+
+        sql = batch.compiled.sql
+
+        start = perf_counter()
+        try:
+            record = await conn.fetchrow(sql, *params)
+        except Exception:
+            metrics.observe_query(sql, perf_counter() - start, error=True)
+            raise
+
+        results = unpack_fused(batch, record)
+        metrics.observe_query(
+            sql, perf_counter() - start, sum(result.rowcount for result in results)
+        )
+        return results
+
+    async def __run_sequential(
+        self, conn: asyncpg.Connection, statements: Sequence[Statement]
+    ) -> List[StatementResult]:
+        results = []
+        # one statement is atomic on its own, BEGIN/COMMIT would only add trips
+        scope = conn.transaction() if len(statements) > 1 else nullcontext()
+
+        async with scope:
+            for name, statement in zip(statement_names(statements), statements):
+                query, params = statement.query, statement.params
+                start = perf_counter()
+                try:
+                    if returns_rows(query):
+                        rows = [dict(row) for row in await conn.fetch(query, *params)]
+                        count = len(rows)
+                    else:
+                        rows = []
+                        count = _affected_rows(await conn.execute(query, *params))
+                except Exception:
+                    metrics.observe_query(query, perf_counter() - start, error=True)
+                    raise
+                metrics.observe_query(query, perf_counter() - start, count)
+
+                results.append(StatementResult(name, rows, count))
+
+        return results
+
     async def transaction(
         self, queries: List[str], params_list: List[Tuple], returning: bool = False
-    ):
+    ) -> List[Dict[str, Any]]:
         if len(queries) != len(params_list):
             raise ValueError("The quantity of queries is different than params")
 
-        all_data = []
+        results = await self.batch(
+            [
+                Statement(query, tuple(params or ()))
+                for query, params in zip(queries, params_list)
+            ]
+        )
 
-        async with self._db_manager.get_transaction() as conn:
-            try:
-                for query, params in zip(queries, params_list):
-                    if returning:
-                        result = (
-                            await conn.fetch(query, *params)
-                            if params
-                            else await conn.fetch(query)
-                        )
-                        data = [dict(row) for row in result]
-                        all_data.extend(data)
-                    else:
-                        result = (
-                            await conn.execute(query, *params)
-                            if params
-                            else await conn.execute(query)
-                        )
+        return [row for result in results for row in result.rows] if returning else []
 
-                    returning if returning else []
+    async def copy_records(
+        self,
+        table: str,
+        records: List[Tuple],
+        columns: List[str],
+        schema: Optional[str] = None,
+    ) -> int:
+        conn = None
+        try:
+            conn = await self._get_connection()
 
-            except Exception as e:
-                logger.error(f"Transaction failed: Rolling back: {e}")
+            label = f"COPY {schema + '.' if schema else ''}{table}"
+            start = perf_counter()
+            try:
+                status = await conn.copy_records_to_table(
+                    table, records=records, columns=columns, schema_name=schema
+                )
+            except Exception:
+                metrics.observe_query(label, perf_counter() - start, error=True)
                 raise
 
+            rows = _affected_rows(status)
+            metrics.observe_query(label, perf_counter() - start, rows)
+            return rows
+
+        except Exception as e:
+            logger.error(f"COPY into {table} failed: {e}")
+            raise
+        finally:
+            if conn:
+                await self._release_connection(conn)
+
     async def bulk_execute(self, query: str, params_list: List[Tuple]):
+        conn = None
         try:
             conn = await self._get_connection()
-            await conn.executemany(query, params_list)
+
+            start = perf_counter()
+            try:
+                await conn.executemany(query, params_list)
+            except Exception:
+                metrics.observe_query(query, perf_counter() - start, error=True)
+                raise
+            metrics.observe_query(query, perf_counter() - start, len(params_list))
 
         except Exception as e:
             logger.error(f"Bulk operation failed: {e}")
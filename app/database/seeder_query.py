@@ -1,13 +1,3 @@
-# -- ----------------------------------------------------------------------------
-# --  CONFIG
-# -- ----------------------------------------------------------------------------
-
-CONFIGURE_TIMEZONE = """
-SET timezone = 'UTC';
-"""
-
-CREATE_CONFIGS = [CONFIGURE_TIMEZONE]
-
 # -- ----------------------------------------------------------------------------
 # --  SCHEMAS
 # -- ----------------------------------------------------------------------------
@@ -21,7 +11,15 @@ CREATE_SCHEMA_USER = """
 CREATE SCHEMA IF NOT EXISTS "user";
 """
 
-CREATE_SCHEMAS = [CREATE_SCHEMA_PUBLIC, CREATE_SCHEMA_USER]
+
+# -- ----------------------------------------------------------------------------
+# --  EXTENSIONS
+# -- ----------------------------------------------------------------------------
+
+CREATE_EXTENSION_PG_TRGM = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
+"""
+
 
 # -- ----------------------------------------------------------------------------
 # --  TABLES
@@ -93,13 +91,36 @@ CREATE TABLE IF NOT EXISTS "user".employees (
 );    
 """
 
+# change counters read by the ETag checks, bumped by triggers as writes commit
+CREATE_TABLE_TABLE_VERSIONS = """
+CREATE SEQUENCE IF NOT EXISTS public.table_versions_seq;
 
-CREATE_TABLES = [
-    CREATE_TABLE_ROLES,
-    CREATE_TABLE_PERMISSIONS,
-    CREATE_TABLE_ROLE_PERMISSIONS,
-    CREATE_TABLE_EMPLOYEES,
-]
+CREATE TABLE IF NOT EXISTS public.table_versions (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+"""
+
+# written in batches by app.core.audit; actor_id has no foreign key so the
+# trail outlives the employees in it
+CREATE_TABLE_AUDIT_LOG = """
+CREATE TABLE IF NOT EXISTS public.audit_log (
+    id BIGSERIAL PRIMARY KEY,
+    occurred_at TIMESTAMPTZ NOT NULL,
+    actor_id INTEGER NULL,
+    action VARCHAR(20) NOT NULL,
+    entity VARCHAR(50) NOT NULL,
+    entity_id INTEGER NULL,
+    changes JSONB NULL,
+    recorded_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_audit_log_entity
+    ON public.audit_log (entity, entity_id, occurred_at);
+CREATE INDEX IF NOT EXISTS idx_audit_log_actor
+    ON public.audit_log (actor_id, occurred_at);
+"""
 
 
 # -- ----------------------------------------------------------------------------
@@ -122,11 +143,13 @@ CREATE INDEX IF NOT EXISTS idx_employees_role_id ON "user".employees(role_id);
 CREATE INDEX IF NOT EXISTS idx_employees_is_active ON "user".employees(is_active);
 """
 
-CREATE_INDEXES = [
-    CREATE_INDEXES_PERMISSIONS,
-    CREATE_INDEXES_ROLE_PERMISSIONS,
-    CREATE_INDEXES_EMPLOYEES,
-]
+# serve similarity (%) and ILIKE '%...%' on names and email
+CREATE_INDEXES_EMPLOYEES_TRIGRAM = """
+CREATE INDEX IF NOT EXISTS idx_employees_first_name_trgm ON "user".employees USING gin (first_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_employees_last_name_trgm ON "user".employees USING gin (last_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_employees_email_trgm ON "user".employees USING gin (email gin_trgm_ops);
+"""
+
 
 # -- ----------------------------------------------------------------------------
 # --  FUNCTIONS
@@ -142,7 +165,91 @@ END;
 $$ LANGUAGE plpgsql;
 """
 
-CREATE_FUNCTIONS = [CREATE_FUNCTION_UPDATE_UPDATED_AT_COLUMN]
+AUTHORIZATION_CHANNEL = "authorization_changed"
+
+CREATE_FUNCTION_NOTIFY_AUTHORIZATION_CHANGE = f"""
+CREATE OR REPLACE FUNCTION public.notify_authorization_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'role_permissions' THEN
+        IF TG_OP <> 'INSERT' THEN
+            PERFORM pg_notify('{AUTHORIZATION_CHANNEL}', 'role:' || OLD.role_id);
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            PERFORM pg_notify('{AUTHORIZATION_CHANNEL}', 'role:' || NEW.role_id);
+        END IF;
+    ELSIF TG_TABLE_NAME = 'roles' THEN
+        PERFORM pg_notify('{AUTHORIZATION_CHANNEL}', 'role:' || OLD.id);
+    ELSE
+        PERFORM pg_notify('{AUTHORIZATION_CHANNEL}', 'all');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# versions come from a sequence, so they never repeat even if the table is wiped
+CREATE_FUNCTION_BUMP_TABLE_VERSION = """
+CREATE OR REPLACE FUNCTION public.bump_table_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.table_versions (table_name, version)
+    VALUES (TG_TABLE_SCHEMA || '.' || TG_TABLE_NAME, nextval('public.table_versions_seq'))
+    ON CONFLICT (table_name) DO UPDATE
+    SET version = EXCLUDED.version,
+        updated_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Runs at commit from a deferred row trigger, so the table_versions row is
+# locked only while the transaction commits, not for its whole duration,
+# and only transactions that changed rows ever get there. The first row of a
+# transaction bumps; a transaction-local flag makes every later row a no-op.
+CREATE_FUNCTION_BUMP_TABLE_VERSION_ON_COMMIT = """
+CREATE OR REPLACE FUNCTION public.bump_table_version_on_commit()
+RETURNS TRIGGER AS $$
+DECLARE
+    bumped TEXT := 'table_versions.bumped_' || TG_TABLE_SCHEMA || '_' || TG_TABLE_NAME;
+BEGIN
+    IF current_setting(bumped, true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM set_config(bumped, 'on', true);
+
+    INSERT INTO public.table_versions (table_name, version)
+    VALUES (TG_TABLE_SCHEMA || '.' || TG_TABLE_NAME, nextval('public.table_versions_seq'))
+    ON CONFLICT (table_name) DO UPDATE
+    SET version = nextval('public.table_versions_seq'),
+        updated_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Replaces the function above, whose conflict branch called nextval() again
+# and burned a second sequence value on every bump.
+CREATE_FUNCTION_BUMP_TABLE_VERSION_ON_COMMIT_EXCLUDED = """
+CREATE OR REPLACE FUNCTION public.bump_table_version_on_commit()
+RETURNS TRIGGER AS $$
+DECLARE
+    bumped TEXT := 'table_versions.bumped_' || TG_TABLE_SCHEMA || '_' || TG_TABLE_NAME;
+BEGIN
+    IF current_setting(bumped, true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM set_config(bumped, 'on', true);
+
+    INSERT INTO public.table_versions (table_name, version)
+    VALUES (TG_TABLE_SCHEMA || '.' || TG_TABLE_NAME, nextval('public.table_versions_seq'))
+    ON CONFLICT (table_name) DO UPDATE
+    SET version = EXCLUDED.version,
+        updated_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
 
 
 # -- ----------------------------------------------------------------------------
@@ -173,9 +280,137 @@ CREATE_TRIGGER_UPDATE_UPDATED_COLUMN_EMPLOYEES = trigger_update_updated_column(
     "user", "employees"
 )
 
-CREATE_TRIGGERS = [
-    CREATE_TRIGGER_UPDATE_UPDATED_COLUMN_ROLES,
-    CREATE_TRIGGER_UPDATE_UPDATED_COLUMN_PERMISSIONS,
-    CREATE_TRIGGER_UPDATE_UPDATED_COLUMN_ROLE_PERMISSIONS,
-    CREATE_TRIGGER_UPDATE_UPDATED_COLUMN_EMPLOYEES,
+
+def trigger_notify_authorization_change(schema: str, table: str, events: str):
+    return f"""
+DROP TRIGGER IF EXISTS trigger_{table}_authorization_change ON "{schema}".{table};
+CREATE TRIGGER trigger_{table}_authorization_change
+    AFTER {events} ON "{schema}".{table}
+    FOR EACH ROW
+    EXECUTE FUNCTION public.notify_authorization_change();
+"""
+
+
+CREATE_TRIGGER_AUTHORIZATION_CHANGE_ROLES = trigger_notify_authorization_change(
+    "user", "roles", "UPDATE OF is_active OR DELETE"
+)
+CREATE_TRIGGER_AUTHORIZATION_CHANGE_PERMISSIONS = trigger_notify_authorization_change(
+    "user", "permissions", "INSERT OR UPDATE OR DELETE"
+)
+CREATE_TRIGGER_AUTHORIZATION_CHANGE_ROLE_PERMISSIONS = (
+    trigger_notify_authorization_change(
+        "user", "role_permissions", "INSERT OR UPDATE OR DELETE"
+    )
+)
+
+
+def trigger_bump_table_version(schema: str, table: str):
+    return f"""
+DROP TRIGGER IF EXISTS trigger_{table}_table_version ON "{schema}".{table};
+CREATE TRIGGER trigger_{table}_table_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "{schema}".{table}
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.bump_table_version();
+"""
+
+
+CREATE_TRIGGER_TABLE_VERSION_ROLES = trigger_bump_table_version("user", "roles")
+CREATE_TRIGGER_TABLE_VERSION_EMPLOYEES = trigger_bump_table_version(
+    "user", "employees"
+)
+
+# replaces trigger_bump_table_version: constraint triggers are the only ones
+# that can be deferred to commit, and they are row-level, so a statement that
+# changes no rows never bumps. TRUNCATE has no rows and keeps its statement
+# trigger; it locks the whole table until commit anyway.
+def trigger_bump_table_version_on_commit(schema: str, table: str):
+    return f"""
+DROP TRIGGER IF EXISTS trigger_{table}_table_version ON "{schema}".{table};
+DROP TRIGGER IF EXISTS trigger_{table}_table_version_on_commit ON "{schema}".{table};
+CREATE CONSTRAINT TRIGGER trigger_{table}_table_version_on_commit
+    AFTER INSERT OR UPDATE OR DELETE ON "{schema}".{table}
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW
+    EXECUTE FUNCTION public.bump_table_version_on_commit();
+
+DROP TRIGGER IF EXISTS trigger_{table}_table_version_truncate ON "{schema}".{table};
+CREATE TRIGGER trigger_{table}_table_version_truncate
+    AFTER TRUNCATE ON "{schema}".{table}
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.bump_table_version();
+"""
+
+
+CREATE_TRIGGER_TABLE_VERSION_ON_COMMIT_ROLES = trigger_bump_table_version_on_commit(
+    "user", "roles"
+)
+CREATE_TRIGGER_TABLE_VERSION_ON_COMMIT_EMPLOYEES = (
+    trigger_bump_table_version_on_commit("user", "employees")
+)
+
+
+# -- ----------------------------------------------------------------------------
+# --  MIGRATIONS
+# -- ----------------------------------------------------------------------------
+# Applied in order and recorded in public.schema_migrations by name and
+# checksum. Append new steps at the end: startup refuses to run when a
+# recorded step has been edited, so a change always needs a step of its own.
+
+MIGRATIONS = [
+    ("schema_public", CREATE_SCHEMA_PUBLIC),
+    ("schema_user", CREATE_SCHEMA_USER),
+    ("table_roles", CREATE_TABLE_ROLES),
+    ("table_permissions", CREATE_TABLE_PERMISSIONS),
+    ("table_role_permissions", CREATE_TABLE_ROLE_PERMISSIONS),
+    ("table_employees", CREATE_TABLE_EMPLOYEES),
+    ("indexes_permissions", CREATE_INDEXES_PERMISSIONS),
+    ("indexes_role_permissions", CREATE_INDEXES_ROLE_PERMISSIONS),
+    ("indexes_employees", CREATE_INDEXES_EMPLOYEES),
+    ("function_update_updated_at_column", CREATE_FUNCTION_UPDATE_UPDATED_AT_COLUMN),
+    (
+        "function_notify_authorization_change",
+        CREATE_FUNCTION_NOTIFY_AUTHORIZATION_CHANGE,
+    ),
+    ("trigger_roles_updated_at", CREATE_TRIGGER_UPDATE_UPDATED_COLUMN_ROLES),
+    ("trigger_permissions_updated_at", CREATE_TRIGGER_UPDATE_UPDATED_COLUMN_PERMISSIONS),
+    (
+        "trigger_role_permissions_updated_at",
+        CREATE_TRIGGER_UPDATE_UPDATED_COLUMN_ROLE_PERMISSIONS,
+    ),
+    ("trigger_employees_updated_at", CREATE_TRIGGER_UPDATE_UPDATED_COLUMN_EMPLOYEES),
+    (
+        "trigger_roles_authorization_change",
+        CREATE_TRIGGER_AUTHORIZATION_CHANGE_ROLES,
+    ),
+    (
+        "trigger_permissions_authorization_change",
+        CREATE_TRIGGER_AUTHORIZATION_CHANGE_PERMISSIONS,
+    ),
+    (
+        "trigger_role_permissions_authorization_change",
+        CREATE_TRIGGER_AUTHORIZATION_CHANGE_ROLE_PERMISSIONS,
+    ),
+    ("extension_pg_trgm", CREATE_EXTENSION_PG_TRGM),
+    ("indexes_employees_trigram", CREATE_INDEXES_EMPLOYEES_TRIGRAM),
+    ("table_table_versions", CREATE_TABLE_TABLE_VERSIONS),
+    ("function_bump_table_version", CREATE_FUNCTION_BUMP_TABLE_VERSION),
+    ("trigger_roles_table_version", CREATE_TRIGGER_TABLE_VERSION_ROLES),
+    ("trigger_employees_table_version", CREATE_TRIGGER_TABLE_VERSION_EMPLOYEES),
+    ("table_audit_log", CREATE_TABLE_AUDIT_LOG),
+    (
+        "function_bump_table_version_on_commit",
+        CREATE_FUNCTION_BUMP_TABLE_VERSION_ON_COMMIT,
+    ),
+    (
+        "trigger_roles_table_version_on_commit",
+        CREATE_TRIGGER_TABLE_VERSION_ON_COMMIT_ROLES,
+    ),
+    (
+        "trigger_employees_table_version_on_commit",
+        CREATE_TRIGGER_TABLE_VERSION_ON_COMMIT_EMPLOYEES,
+    ),
+    (
+        "function_bump_table_version_on_commit_excluded",
+        CREATE_FUNCTION_BUMP_TABLE_VERSION_ON_COMMIT_EXCLUDED,
+    ),
 ]
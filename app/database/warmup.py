@@ -0,0 +1,63 @@
+"""
+Startup warm-up. Modules register the statements that most requests run with
+hot_statement(), along with harmless values to bind. warm_pool() runs each
+one through fetch() on every connection the pool opened at creation, so
+asyncpg's per-connection statement cache already holds them and the first
+requests after a deploy skip the Parse round trip.
+"""
+
+import asyncio
+from logging import getLogger
+from typing import Any, List, Tuple
+
+import asyncpg
+
+logger = getLogger(__name__)
+
+HOT_STATEMENTS: List[Tuple[str, Tuple[Any, ...]]] = []
+
+
+def hot_statement(query: str, *warmup_args: Any) -> str:
+    """
+    Registers `query` for warm-up and returns it unchanged. `warmup_args`
+    must match no rows (or ask for none) and be of the types the real
+    requests bind, so the cached statement is the one they reuse.
+    """
+    HOT_STATEMENTS.append((query, warmup_args))
+    return query
+
+
+async def prepare_hot_statements(conn: asyncpg.Connection) -> int:
+    prepared = 0
+    for query, args in HOT_STATEMENTS:
+        try:
+            # the same text the services run, so it is the same cache entry
+            await conn.fetch(query, *args)
+            prepared += 1
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logger.warning(f"Could not prepare hot statement: {e}")
+    return prepared
+
+
+async def warm_pool(pool: asyncpg.Pool) -> int:
+    """
+    Holds the connections `pool` opened at creation (its min_size) at once
+    and runs the hot statements on each. Returns how many connections were
+    warmed; a failure is logged and never stops startup.
+    """
+    size = pool.get_min_size()
+    results = await asyncio.gather(
+        *(pool.acquire() for _ in range(size)), return_exceptions=True
+    )
+    conns = [r for r in results if not isinstance(r, BaseException)]
+
+    try:
+        if len(conns) < size:
+            logger.warning(f"Warmed {len(conns)} of {size} connections")
+        await asyncio.gather(*(prepare_hot_statements(conn) for conn in conns))
+    except Exception as e:
+        logger.warning(f"Connection warm-up failed: {e}")
+    finally:
+        await asyncio.gather(*(pool.release(conn) for conn in conns))
+
+    return len(conns)
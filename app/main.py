@@ -1,38 +1,72 @@
+import asyncio
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 from logging import getLogger
+from time import perf_counter
+from typing import Any, Awaitable, Dict
 
 from app.config.database import db_manager
+from app.config.replicas import ConsistencyMiddleware
+from app.core.admission import AdmissionControlMiddleware, admission_controller
+from app.core.audit import audit_log
+from app.core.authorization import authorization_index
 from app.core.settings import settings
 from app.core.exceptions import global_exception_handler
-from app.database.seeder import run_seeder
+from app.core.metrics import RequestMetricsMiddleware, metrics
+from app.core.query_advisor import query_advisor
+from app.core.security import password_hasher, token_cache
+from app.database.batch import fused_cache
+from app.database.query_cache import query_cache
+from app.database.migrations import run_migrations
 
 from app.api.v1.main_router import api_router
 
 logger = getLogger(__name__)
 
 
+async def _timed(timings: Dict[str, float], phase: str, coro: Awaitable[Any]) -> Any:
+    start = perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[phase] = (perf_counter() - start) * 1000
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting ADA Restauraciones API")
+    timings: Dict[str, float] = {}
+    start = perf_counter()
 
     try:
-        logger.info("Initializing database connection pool...")
-        await db_manager.connect()
-        logger.info("Database pool connected")
+        password_hasher.start()
 
-        logger.info("Running database seeder...")
-        await run_seeder()
-        logger.info("Database seeding completed")
-
-        logger.info("Performing database health check...")
-        is_healthy = await db_manager.health_check()
+        logger.info("Initializing database connection pool...")
+        await _timed(timings, "connect", db_manager.connect())
+
+        logger.info("Running database migrations...")
+        await _timed(timings, "migrations", run_migrations())
+        audit_log.start()
+
+        # independent of each other once the schema is current
+        _, _, warmed, is_healthy = await asyncio.gather(
+            _timed(timings, "authorization", authorization_index.start()),
+            _timed(timings, "password_hasher", password_hasher.dummy_hash()),
+            _timed(timings, "warm_up", db_manager.warm_up()),
+            _timed(timings, "health_check", db_manager.health_check()),
+        )
+        logger.info(f"Warmed {warmed} database connections")
         if is_healthy:
             logger.info("Database health check passed")
         else:
             logger.warning("Database health check failed")
 
-        logger.info("Application startup completed successfully")
+        breakdown = ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in timings.items())
+        logger.info(
+            f"Application startup completed in "
+            f"{(perf_counter() - start) * 1000:.0f} ms ({breakdown})"
+        )
 
     except Exception as e:
         logger.error(f"APlication startup failed {e}")
@@ -44,10 +78,19 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down ADA Restauraciones")
 
     try:
+        await authorization_index.stop()
+        await query_advisor.stop()
+
+        # before the pool closes: the queued events are flushed through it
+        logger.info("Flushing audit log...")
+        await audit_log.shutdown()
+
         logger.info("Closing database connection pool...")
         await db_manager.disconnect()
         logger.info("Database pool disconnected")
 
+        await password_hasher.shutdown()
+
     except Exception as e:
         logger.error(f"Error during shutdown {e}")
 
@@ -65,6 +108,19 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 
 app.add_exception_handler(Exception, global_exception_handler)
 
+app.add_middleware(ConsistencyMiddleware)
+# inside the metrics middleware, so shed requests are counted too
+app.add_middleware(AdmissionControlMiddleware, routes=app.routes)
+app.add_middleware(RequestMetricsMiddleware)
+
+metrics.register_collector("db_pool", db_manager.pool_stats)
+metrics.register_collector("query_cache", query_cache.stats)
+metrics.register_collector("fused_batch_cache", fused_cache.stats)
+metrics.register_collector("token_cache", token_cache.stats)
+metrics.register_collector("password_hasher", password_hasher.stats)
+metrics.register_collector("audit", audit_log.stats)
+metrics.register_collector("admission", admission_controller.stats)
+
 
 @app.get("/")
 async def read_root():
@@ -81,3 +137,10 @@ async def health_check():
     db_healthy = await db_manager.health_check()
 
     return {"status": db_healthy}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
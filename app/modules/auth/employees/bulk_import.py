@@ -0,0 +1,165 @@
+import csv
+import json
+from io import StringIO
+from typing import Any, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from app.schemas.employees import CreateEmployeeSchema
+
+STAGING_TABLE = "employees_import"
+
+STAGING_COLUMNS = [
+    "row_num",
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "address",
+    "is_active",
+    "password",
+    "role_id",
+]
+
+IMPORT_ERROR_FIELDS = {
+    "duplicate_email": "email",
+    "invalid_role_id": "role_id",
+}
+
+CREATE_STAGING_TABLE = f"""
+CREATE TEMP TABLE {STAGING_TABLE} (
+    row_num INTEGER NOT NULL,
+    first_name VARCHAR(100) NOT NULL,
+    last_name VARCHAR(100) NOT NULL,
+    email VARCHAR(150) NOT NULL,
+    phone VARCHAR(20) NULL,
+    address TEXT NULL,
+    is_active BOOL NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    role_id INTEGER NOT NULL
+) ON COMMIT DROP;
+"""
+
+RANKED_STAGING = f"""
+WITH ranked AS (
+    SELECT
+        s.*,
+        row_number() OVER (PARTITION BY s.email ORDER BY s.row_num) AS email_rank
+    FROM {STAGING_TABLE} s
+)
+"""
+
+SELECT_REJECTED_ROWS = (
+    RANKED_STAGING
+    + """
+SELECT
+    ranked.row_num,
+    CASE
+        WHEN e.id IS NOT NULL OR ranked.email_rank > 1 THEN 'duplicate_email'
+        ELSE 'invalid_role_id'
+    END AS error
+FROM ranked
+LEFT JOIN "user".employees e ON e.email = ranked.email
+LEFT JOIN "user".roles r ON r.id = ranked.role_id
+WHERE e.id IS NOT NULL OR ranked.email_rank > 1 OR r.id IS NULL
+"""
+)
+
+MERGE_STAGING_ROWS = (
+    RANKED_STAGING
+    + """
+INSERT INTO "user".employees
+    (first_name, last_name, email, phone, address, is_active, password, role_id)
+SELECT
+    ranked.first_name,
+    ranked.last_name,
+    ranked.email,
+    ranked.phone,
+    ranked.address,
+    ranked.is_active,
+    ranked.password,
+    ranked.role_id
+FROM ranked
+JOIN "user".roles r ON r.id = ranked.role_id
+WHERE ranked.email_rank = 1
+    AND NOT EXISTS (SELECT 1 FROM "user".employees e WHERE e.email = ranked.email)
+ORDER BY ranked.row_num
+ON CONFLICT (email) DO NOTHING
+RETURNING id, email
+"""
+)
+
+
+class BulkPayloadError(ValueError):
+    pass
+
+
+def parse_rows(content_type: str, body: bytes) -> List[Dict[str, Any]]:
+    """
+    Accepts a JSON array of employees or a CSV document with a header row
+    (`Content-Type: text/csv`). Empty CSV cells are treated as missing.
+    """
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise BulkPayloadError("Payload must be UTF-8 encoded") from e
+
+    if content_type.split(";")[0].strip().lower() in ("text/csv", "application/csv"):
+        reader = csv.DictReader(StringIO(text))
+        return [
+            {key: value for key, value in row.items() if key and value != ""}
+            for row in reader
+        ]
+
+    try:
+        rows = json.loads(text)
+    except ValueError as e:
+        raise BulkPayloadError("Invalid JSON payload") from e
+
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise BulkPayloadError("Payload must be a JSON array of employees")
+
+    return rows
+
+
+def validate_rows(
+    rows: List[Dict[str, Any]],
+) -> Tuple[List[Tuple[int, CreateEmployeeSchema]], List[Dict[str, Any]]]:
+    valid: List[Tuple[int, CreateEmployeeSchema]] = []
+    rejected: List[Dict[str, Any]] = []
+
+    for row_num, row in enumerate(rows, 1):
+        try:
+            valid.append((row_num, CreateEmployeeSchema.model_validate(row)))
+        except ValidationError as e:
+            rejected.append(
+                {
+                    "row": row_num,
+                    "status": "error",
+                    "errors": [
+                        {
+                            "field": ".".join(str(loc) for loc in error["loc"]),
+                            "message": error["msg"],
+                        }
+                        for error in e.errors()
+                    ],
+                }
+            )
+
+    return valid, rejected
+
+
+def to_staging_record(
+    row_num: int, payload: CreateEmployeeSchema, password_hash: str
+) -> Tuple:
+    return (
+        row_num,
+        payload.first_name,
+        payload.last_name,
+        payload.email,
+        payload.phone,
+        payload.address,
+        payload.is_active,
+        password_hash,
+        payload.role_id,
+    )
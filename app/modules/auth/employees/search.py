@@ -0,0 +1,42 @@
+from typing import Sequence
+
+SEARCH_MIN_LENGTH = 2
+SEARCH_MAX_LENGTH = 100
+
+
+def build_search_query(columns: Sequence[str]) -> str:
+    """
+    Ranked fuzzy search over names and email. Every predicate of the inner
+    WHERE is served by the trigram GIN indexes: `%` matches misspellings
+    ("Hernadez"), ILIKE matches substrings too short to be similar
+    ("gon" in "gonzalez"). Pages seek on (score DESC, id).
+
+        $1 term  $2 ILIKE pattern  $3 score after  $4 id after  $5 limit
+    """
+    selected = ", ".join(columns)
+
+    return f"""
+    SELECT {selected}, score
+    FROM (
+        SELECT {selected},
+            GREATEST(
+                similarity(first_name, $1),
+                similarity(last_name, $1),
+                similarity(email, $1)
+            ) AS score
+        FROM "user".employees
+        WHERE is_active = true
+          AND (
+              first_name % $1 OR last_name % $1 OR email % $1
+              OR first_name ILIKE $2 OR last_name ILIKE $2 OR email ILIKE $2
+          )
+    ) ranked
+    WHERE $3::real IS NULL OR score < $3 OR (score = $3 AND id > $4::int)
+    ORDER BY score DESC, id
+    LIMIT $5;
+    """
+
+
+def like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
@@ -1,14 +1,106 @@
-from typing import Optional
+from typing import List, Literal, Optional
 
+import asyncpg
+from fastapi.responses import StreamingResponse
+
+from app.config.database import RequestConnection, db_manager
+from app.core.audit import audit_log
+from app.core.http_cache import (
+    PreconditionError,
+    etag_matches,
+    if_match_version,
+    not_modified,
+    row_etag,
+    table_etag,
+    with_etag,
+)
+from app.core.security import password_hasher
+from app.core.settings import settings
+from app.database.patch import (
+    bulk_patch_rows,
+    patch_row,
+    returning_columns,
+    row_patches,
+)
 from app.database.query_manager import QueryManager
 from app.database.query_builder import QueryBuilder
+from app.database.warmup import hot_statement
 from app.schemas.responses import ApiResponse
-from app.schemas.employees import CreateEmployeeSchema, UpdateEmployeeSchema
+from app.schemas.employees import (
+    BulkPatchEmployee,
+    CreateEmployeeSchema,
+    PatchEmployeeSchema,
+    UpdateEmployeeSchema,
+)
+from app.modules.auth.employees.bulk_import import (
+    CREATE_STAGING_TABLE,
+    IMPORT_ERROR_FIELDS,
+    MERGE_STAGING_ROWS,
+    SELECT_REJECTED_ROWS,
+    STAGING_COLUMNS,
+    STAGING_TABLE,
+    BulkPayloadError,
+    parse_rows,
+    to_staging_record,
+    validate_rows,
+)
+from app.modules.auth.employees.search import (
+    SEARCH_MIN_LENGTH,
+    build_search_query,
+    like_pattern,
+)
+from app.utils.encoders import stream_json_array, stream_ndjson
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    InvalidCursorError,
+    decode_cursor,
+    paginate,
+)
+
+
+EMPLOYEE_PUBLIC_COLUMNS = (
+    "id",
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "address",
+    "is_active",
+    "role_id",
+    "created_at",
+    "updated_at",
+)
+
+# Postgres types of the columns a bulk patch may write
+EMPLOYEE_PATCH_TYPES = {
+    "first_name": "text",
+    "last_name": "text",
+    "email": "text",
+    "phone": "text",
+    "address": "text",
+    "is_active": "bool",
+    "password": "text",
+    "role_id": "int",
+}
+
+# LIMIT 0: the warm-up only needs the statement cached, not the scan
+SEARCH_EMPLOYEES = hot_statement(
+    build_search_query(EMPLOYEE_PUBLIC_COLUMNS), "", "", None, None, 0
+)
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
 
 
 class EmployeeService:
-    def __init__(self):
-        self.qm = QueryManager()
+    SORT_KEY = "id"
+    TABLE = "user.employees"
+    STREAM_BATCH_SIZE = 500
+
+    def __init__(self, db: Optional[RequestConnection] = None):
+        self.qm = QueryManager(db=db)
 
     async def get(
         self,
@@ -16,35 +108,270 @@ class EmployeeService:
         last_name: Optional[str] = None,
         email: Optional[str] = None,
         phone: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        if_none_match: Optional[str] = None,
     ):
+        try:
+            after = decode_cursor(cursor)
+        except InvalidCursorError as e:
+            return ApiResponse.bad_request(str(e))
+
+        etag = await table_etag(self.qm, self.TABLE)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
         qb = QueryBuilder("user", "employees")
 
-        qb.select()
+        qb.select(*EMPLOYEE_PUBLIC_COLUMNS)
         qb.where(email=email, phone=phone, is_active=True)
         qb.where_like(first_name=first_name, last_name=last_name)
+        qb.keyset(self.SORT_KEY, limit + 1, after)
         query, params = qb.build_select()
 
-        data = await self.qm.select(query, params)
+        data = await self.qm.select_records(query, params)
+        data, next_cursor = paginate(data, limit, self.SORT_KEY)
+
+        return with_etag(
+            (
+                ApiResponse.ok(data=data, next_cursor=next_cursor)
+                if data
+                else ApiResponse.no_content("Not found")
+            ),
+            etag,
+        )
+
+    async def search(
+        self, term: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+    ):
+        term = term.strip()
+        if len(term) < SEARCH_MIN_LENGTH:
+            return ApiResponse.bad_request(
+                f"Search needs at least {SEARCH_MIN_LENGTH} characters"
+            )
+
+        try:
+            after = decode_cursor(cursor, float)
+        except InvalidCursorError as e:
+            return ApiResponse.bad_request(str(e))
+
+        score_after, id_after = after or (None, None)
+        params = (term, like_pattern(term), score_after, id_after, limit + 1)
+
+        data = await self.qm.select_records(SEARCH_EMPLOYEES, params)
+        data, next_cursor = paginate(data, limit, "score")
 
         return (
-            ApiResponse.ok(data=data) if data else ApiResponse.no_content("Not found")
+            ApiResponse.ok(data=data, next_cursor=next_cursor)
+            if data
+            else ApiResponse.no_content("Not found")
+        )
+
+    def stream(
+        self,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        email: Optional[str] = None,
+        phone: Optional[str] = None,
+        format: Literal["ndjson", "json"] = "ndjson",
+    ) -> StreamingResponse:
+        qb = QueryBuilder("user", "employees")
+
+        qb.select(*EMPLOYEE_PUBLIC_COLUMNS)
+        qb.where(email=email, phone=phone, is_active=True)
+        qb.where_like(first_name=first_name, last_name=last_name)
+        qb.order_by(self.SORT_KEY)
+        query, params = qb.build_select()
+
+        batches = self.qm.stream(query, params, self.STREAM_BATCH_SIZE)
+        encoder = stream_ndjson if format == "ndjson" else stream_json_array
+
+        return StreamingResponse(
+            encoder(batches), media_type=STREAM_MEDIA_TYPES[format]
         )
 
     async def create(self, payload: CreateEmployeeSchema):
+        values = payload.model_dump()
+        values["password"] = await password_hasher.hash(payload.password)
+
         qb = QueryBuilder("user", "employees")
-        qb.insert(**payload.model_dump())
-        query, params = qb.build_insert()
+        qb.insert(**values)
+        query, params = qb.build_insert(["id"])
 
-        await self.qm.write(query, params)
+        rows = await self.qm.write(query, params, True)
+        await audit_log.record("create", "employees", rows[0]["id"], values)
 
         return ApiResponse.created("User created")
 
+    async def bulk_create(self, content_type: str, body: bytes):
+        try:
+            rows = parse_rows(content_type, body)
+        except BulkPayloadError as e:
+            return ApiResponse.bad_request(str(e))
+
+        if not rows:
+            return ApiResponse.bad_request("No employees to import")
+
+        if len(rows) > settings.BULK_IMPORT_MAX_ROWS:
+            return ApiResponse.bad_request(
+                f"A single import accepts up to {settings.BULK_IMPORT_MAX_ROWS} rows"
+            )
+
+        valid, results = validate_rows(rows)
+
+        if valid:
+            hashes = await password_hasher.hash_many(
+                [payload.password for _, payload in valid]
+            )
+            records = [
+                to_staging_record(row_num, payload, hashed)
+                for (row_num, payload), hashed in zip(valid, hashes)
+            ]
+
+            async with db_manager.get_transaction() as conn:
+                qm = QueryManager(conn)
+
+                await qm.write(CREATE_STAGING_TABLE)
+                await qm.copy_records(STAGING_TABLE, records, STAGING_COLUMNS)
+
+                rejected = await qm.select(SELECT_REJECTED_ROWS)
+                inserted = await qm.write(MERGE_STAGING_ROWS, returning=True)
+
+            created_ids = {row["email"]: row["id"] for row in inserted}
+            errors = {row["row_num"]: row["error"] for row in rejected}
+            audited = []
+
+            for row_num, payload in valid:
+                if row_num not in errors and payload.email in created_ids:
+                    id = created_ids.pop(payload.email)
+                    results.append({"row": row_num, "status": "created", "id": id})
+                    audited.append((id, payload.model_dump()))
+                    continue
+
+                # rows missing from both sets lost an email race with another request
+                error = errors.get(row_num, "duplicate_email")
+                results.append(
+                    {
+                        "row": row_num,
+                        "status": "error",
+                        "errors": [
+                            {"field": IMPORT_ERROR_FIELDS[error], "message": error}
+                        ],
+                    }
+                )
+
+            await audit_log.record_many("create", "employees", audited)
+
+        results.sort(key=lambda result: result["row"])
+        created = sum(1 for result in results if result["status"] == "created")
+
+        if not created:
+            return ApiResponse.bad_request("No employees were imported", results)
+
+        return ApiResponse.created(
+            f"{created} of {len(rows)} employees imported", results
+        )
+
     async def update(self, payload: UpdateEmployeeSchema):
+        values = payload.model_dump(exclude={"id"})
+        values["password"] = await password_hasher.hash(payload.password)
+
         qb = QueryBuilder("user", "employees")
-        qb.set(**payload.model_dump())
-        query, params = qb.build_update(["*"])
+        qb.set(**values)
+        qb.where(id=payload.id)
+        query, params = qb.build_update(list(EMPLOYEE_PUBLIC_COLUMNS))
+
+        try:
+            data = await self.qm.write(query, params, True)
+        except asyncpg.UniqueViolationError:
+            return ApiResponse.conflict("Email already in use")
+        except asyncpg.ForeignKeyViolationError:
+            return ApiResponse.bad_request("Unknown role id")
 
-        data = await self.qm.write(query, params, True)
-        print("=" * 80, query)
+        if not data:
+            return ApiResponse.not_found("Employee not found")
+
+        await audit_log.record("update", "employees", payload.id, values)
 
         return ApiResponse.ok("The employee upload successfully", data)
+
+    async def patch(
+        self,
+        id: int,
+        payload: PatchEmployeeSchema,
+        if_match: Optional[str] = None,
+        fields: Optional[str] = None,
+    ):
+        if not if_match:
+            return ApiResponse.precondition_required(
+                "If-Match with the employee's ETag is required"
+            )
+
+        try:
+            version = if_match_version(if_match)
+            returning = returning_columns(fields, EMPLOYEE_PUBLIC_COLUMNS)
+        except (PreconditionError, ValueError) as e:
+            return ApiResponse.bad_request(str(e))
+
+        values = payload.model_dump(exclude_unset=True)
+        if not values:
+            return ApiResponse.bad_request("No fields to update")
+
+        if "password" in values:
+            values["password"] = await password_hasher.hash(values["password"])
+
+        try:
+            rows, found = await patch_row(
+                self.qm, "user", "employees", id, values, version, returning
+            )
+        except asyncpg.UniqueViolationError:
+            return ApiResponse.conflict("Email already in use")
+        except asyncpg.ForeignKeyViolationError:
+            return ApiResponse.bad_request("Unknown role id")
+
+        if not rows:
+            return (
+                ApiResponse.precondition_failed("Employee was modified since read")
+                if found
+                else ApiResponse.not_found("Employee not found")
+            )
+
+        await audit_log.record("update", "employees", id, values)
+
+        response = ApiResponse.ok("Employee updated", rows)
+        response.headers["ETag"] = row_etag(rows[0]["updated_at"])
+        return response
+
+    async def bulk_patch(self, items: List[BulkPatchEmployee]):
+        try:
+            patches = row_patches(items)
+        except ValueError as e:
+            return ApiResponse.bad_request(str(e))
+
+        with_password = [patch for patch in patches if "password" in patch.values]
+        if with_password:
+            hashes = await password_hasher.hash_many(
+                [patch.values["password"] for patch in with_password]
+            )
+            for patch, hashed in zip(with_password, hashes):
+                patch.values["password"] = hashed
+
+        try:
+            results = await bulk_patch_rows(
+                self.qm, "user", "employees", patches, EMPLOYEE_PATCH_TYPES
+            )
+        except asyncpg.UniqueViolationError:
+            return ApiResponse.conflict("Email already in use")
+        except asyncpg.ForeignKeyViolationError:
+            return ApiResponse.bad_request("Unknown role id")
+
+        updated = {result["id"] for result in results if result["status"] == "updated"}
+        await audit_log.record_many(
+            "update",
+            "employees",
+            [(patch.id, patch.values) for patch in patches if patch.id in updated],
+        )
+
+        return ApiResponse.ok(
+            f"{len(updated)} of {len(items)} employees updated", results
+        )
@@ -1,70 +1,236 @@
-from typing import Optional
-
-from app.database.query_manager import QueryManager, QueryResult
+from typing import List, Optional
+
+import asyncpg
+
+from app.config.database import RequestConnection
+from app.core.audit import audit_log
+from app.core.http_cache import (
+    PreconditionError,
+    etag_matches,
+    if_match_version,
+    not_modified,
+    row_etag,
+    table_etag,
+    with_etag,
+)
+from app.database.batch import Statement
+from app.database.patch import (
+    bulk_patch_rows,
+    patch_row,
+    returning_columns,
+    row_patches,
+)
+from app.database.query_manager import QueryManager
 from app.database.query_builder import QueryBuilder
-from app.schemas.responses import ApiResponse, from_status
+from app.schemas.auth import BulkPatchRole, PatchRole
+from app.schemas.responses import ApiResponse
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    InvalidCursorError,
+    decode_cursor,
+    paginate,
+)
+
+INSERT_ROLE_PERMISSIONS = """
+    INSERT INTO "user".role_permissions (role_id, permission_id)
+    SELECT new_role.id, permission_id
+    FROM new_role, unnest($1::int[]) AS permission_id
+    RETURNING permission_id;
+"""
+
+ROLE_PUBLIC_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "is_active",
+    "created_at",
+    "updated_at",
+)
+
+# Postgres types of the columns a bulk patch may write
+ROLE_PATCH_TYPES = {"name": "text", "description": "text", "is_active": "bool"}
 
 
 class RoleService:
-    def __init__(self):
-        self.qm = QueryManager()
+    SORT_KEY = "id"
+    TABLE = "user.roles"
+
+    def __init__(self, db: Optional[RequestConnection] = None):
+        self.qm = QueryManager(db=db)
+
+    async def check_name(self, name, if_none_match: Optional[str] = None):
+        etag = await table_etag(self.qm, self.TABLE)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
 
-    async def check_name(self, name):
         query = """
             SELECT 1 FROM "user".roles WHERE name = $1 LIMIT 1;
         """
         params = (name,)
 
         response = await self.qm.select(query, params)
-        exists_register = bool(response.data)
-
-        return (
-            ApiResponse.no_content()
-            if exists_register
-            else ApiResponse.not_found("Role not found")
+        exists_register = bool(response)
+
+        return with_etag(
+            (
+                ApiResponse.no_content()
+                if exists_register
+                else ApiResponse.not_found("Role not found")
+            ),
+            etag,
         )
 
-    async def get(self, name, active):
+    async def get(
+        self,
+        name,
+        active,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        if_none_match: Optional[str] = None,
+    ):
+        try:
+            after = decode_cursor(cursor)
+        except InvalidCursorError as e:
+            return ApiResponse.bad_request(str(e))
+
+        etag = await table_etag(self.qm, self.TABLE)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
         qb = QueryBuilder("user", "roles")
         qb.select().where(name=name, is_active=active)
+        qb.keyset(self.SORT_KEY, limit + 1, after)
 
         query, params = qb.build_select()
 
-        response = await self.qm.select(query, params)
-        exists_register = bool(response.data)
+        response = await self.qm.select_records(query, params)
+        data, next_cursor = paginate(response, limit, self.SORT_KEY)
 
-        return (
-            ApiResponse.ok(data=response.data)
-            if exists_register
-            else ApiResponse.no_content("Not found")
+        return with_etag(
+            (
+                ApiResponse.ok(data=data, next_cursor=next_cursor)
+                if data
+                else ApiResponse.no_content("Not found")
+            ),
+            etag,
         )
 
-    async def create(self, name, description, is_active) -> QueryResult:
+    async def create(
+        self, name, description, is_active, permission_ids: Optional[List[int]] = None
+    ):
         qb = QueryBuilder("user", "roles")
         qb.insert(name=name, description=description, is_active=is_active)
 
         query, params = qb.build_insert(["id", "name", "description", "is_active"])
-        response = await self.qm.write(query, params, True)
-
-        if not response.success:
-            raise from_status(
-                response.status_code, response.message, error_message=response.error
+        statements = [Statement(query, params or (), "new_role")]
+        if permission_ids:
+            statements.append(
+                Statement(INSERT_ROLE_PERMISSIONS, (permission_ids,), "attached")
             )
 
-        return ApiResponse.created("Role created successfully", response.data)
+        # role and its permissions in one round trip
+        try:
+            role, *attached = await self.qm.batch(statements, fuse=True)
+        except asyncpg.ForeignKeyViolationError:
+            return ApiResponse.bad_request("Unknown permission id")
+
+        response = role.rows
+        if attached:
+            response[0]["permission_ids"] = [
+                row["permission_id"] for row in attached[0].rows
+            ]
+
+        await audit_log.record("create", "roles", response[0]["id"], response[0])
+
+        return ApiResponse.created("Role created successfully", response)
 
     async def update(self, id, name, description, is_active):
         qb = QueryBuilder("user", "roles")
         qb.set(name=name, description=description, is_active=is_active)
         qb.where(id=id)
 
-        query, params = qb.build_update()
+        query, params = qb.build_update(["id"])
+
+        if not await self.qm.write(query, params, True):
+            return ApiResponse.not_found("Role not found")
+
+        await audit_log.record(
+            "update",
+            "roles",
+            id,
+            {
+                field: value
+                for field, value in (
+                    ("name", name),
+                    ("description", description),
+                    ("is_active", is_active),
+                )
+                if value is not None
+            },
+        )
+
+        return ApiResponse.ok("Update role")
+
+    async def patch(
+        self,
+        id: int,
+        payload: PatchRole,
+        if_match: Optional[str] = None,
+        fields: Optional[str] = None,
+    ):
+        if not if_match:
+            return ApiResponse.precondition_required(
+                "If-Match with the role's ETag is required"
+            )
 
-        response = await self.qm.write(query, params)
+        try:
+            version = if_match_version(if_match)
+            returning = returning_columns(fields, ROLE_PUBLIC_COLUMNS)
+        except (PreconditionError, ValueError) as e:
+            return ApiResponse.bad_request(str(e))
 
-        if not response.success:
-            raise from_status(
-                response.status_code, response.message, error_message=response.error
+        values = payload.model_dump(exclude_unset=True)
+        if not values:
+            return ApiResponse.bad_request("No fields to update")
+
+        try:
+            rows, found = await patch_row(
+                self.qm, "user", "roles", id, values, version, returning
+            )
+        except asyncpg.UniqueViolationError:
+            return ApiResponse.conflict("Role name already exists")
+
+        if not rows:
+            return (
+                ApiResponse.precondition_failed("Role was modified since read")
+                if found
+                else ApiResponse.not_found("Role not found")
             )
 
-        return ApiResponse.ok("Update role")
+        await audit_log.record("update", "roles", id, values)
+
+        response = ApiResponse.ok("Role updated", rows)
+        response.headers["ETag"] = row_etag(rows[0]["updated_at"])
+        return response
+
+    async def bulk_patch(self, items: List[BulkPatchRole]):
+        try:
+            patches = row_patches(items)
+        except ValueError as e:
+            return ApiResponse.bad_request(str(e))
+
+        try:
+            results = await bulk_patch_rows(
+                self.qm, "user", "roles", patches, ROLE_PATCH_TYPES
+            )
+        except asyncpg.UniqueViolationError:
+            return ApiResponse.conflict("Role name already exists")
+
+        updated = {result["id"] for result in results if result["status"] == "updated"}
+        await audit_log.record_many(
+            "update",
+            "roles",
+            [(patch.id, patch.values) for patch in patches if patch.id in updated],
+        )
+
+        return ApiResponse.ok(f"{len(updated)} of {len(items)} roles updated", results)
@@ -0,0 +1,47 @@
+from app.core.security import create_access_token, password_hasher
+from app.core.settings import settings
+from app.database.query_manager import QueryManager
+from app.database.warmup import hot_statement
+from app.schemas.auth import LoginSchema
+from app.schemas.responses import ApiResponse
+
+SELECT_CREDENTIALS = hot_statement(
+    """
+    SELECT id, role_id, password FROM "user".employees
+    WHERE email = $1 AND is_active = true LIMIT 1;
+    """,
+    "warmup@invalid",
+)
+
+
+class SessionService:
+    def __init__(self):
+        self.qm = QueryManager()
+
+    async def login(self, payload: LoginSchema):
+        rows = await self.qm.select(SELECT_CREDENTIALS, (payload.email,))
+        employee = rows[0] if rows else None
+
+        # an unknown email is checked against the dummy hash, so both paths
+        # cost one bcrypt check at the same rounds
+        if employee:
+            hashed = employee["password"]
+        else:
+            hashed = await password_hasher.dummy_hash()
+        is_valid = await password_hasher.verify(payload.password, hashed)
+
+        if not employee or not is_valid:
+            return ApiResponse.unauthorized("Invalid email or password")
+
+        token = create_access_token(employee["id"], {"role_id": employee["role_id"]})
+
+        return ApiResponse.ok(
+            "Login successful",
+            [
+                {
+                    "access_token": token,
+                    "token_type": "bearer",
+                    "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+                }
+            ],
+        )
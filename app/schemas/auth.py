@@ -1,5 +1,12 @@
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import List, Optional
+from pydantic import (
+    AwareDatetime,
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    Field,
+    field_validator,
+)
 
 from .shared import SchemasBase
 
@@ -11,12 +18,44 @@ class RoleBase(BaseModel):
 
 
 class CreateRole(RoleBase):
-    pass
+    permission_ids: List[int] = Field(default_factory=list)
 
 
 class UpdateRole(RoleBase):
     id: int
 
 
+class PatchRole(BaseModel):
+    """Partial update: only the fields present in the body are written."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    name: Optional[str] = Field(default=None, min_length=3, max_length=50)
+    description: Optional[str] = Field(default=None, max_length=255)
+    is_active: Optional[bool] = None
+
+    @field_validator("name", "is_active")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("cannot be null")
+        return value
+
+
+class BulkPatchRole(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    id: int
+    # when given, the row is only written if it is still at this version; a
+    # version without a UTC offset is rejected, as it is in If-Match
+    updated_at: Optional[AwareDatetime] = None
+    changes: PatchRole
+
+
 class RolSchema(SchemasBase, RoleBase):
     pass
+
+
+class LoginSchema(BaseModel):
+    email: EmailStr
+    password: str = Field(min_length=1, max_length=255)
@@ -1,5 +1,12 @@
 from typing import Optional
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import (
+    AwareDatetime,
+    BaseModel,
+    ConfigDict,
+    Field,
+    EmailStr,
+    field_validator,
+)
 from .shared import SchemasBase
 
 
@@ -26,5 +33,40 @@ class UpdateEmployeeSchema(EmployeeBase):
     id: int
 
 
+class PatchEmployeeSchema(BaseModel):
+    """Partial update: only the fields present in the body are written."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    first_name: Optional[str] = Field(default=None, min_length=1, max_length=100)
+    last_name: Optional[str] = Field(default=None, min_length=1, max_length=100)
+    email: Optional[EmailStr] = None
+    phone: Optional[str] = Field(default=None, min_length=8, max_length=20)
+    address: Optional[str] = Field(default=None, min_length=3, max_length=255)
+    is_active: Optional[bool] = None
+    password: Optional[str] = Field(default=None, min_length=8, max_length=255)
+    role_id: Optional[int] = Field(default=None, ge=1)
+
+    @field_validator(
+        "first_name", "last_name", "email", "is_active", "password", "role_id"
+    )
+    @classmethod
+    def not_null(cls, value):
+        # only phone and address may be cleared
+        if value is None:
+            raise ValueError("cannot be null")
+        return value
+
+
+class BulkPatchEmployee(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    id: int
+    # when given, the row is only written if it is still at this version; a
+    # version without a UTC offset is rejected, as it is in If-Match
+    updated_at: Optional[AwareDatetime] = None
+    changes: PatchEmployeeSchema
+
+
 class EmployeeSchema(SchemasBase, EmployeeBase):
     pass
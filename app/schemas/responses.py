@@ -1,10 +1,30 @@
+import json
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Callable
+from typing import Optional, List, Dict, Any, Callable, Union
 
-from fastapi.responses import JSONResponse
-from app.utils.serializers import serialize_data
+from fastapi.responses import JSONResponse, Response
+from app.utils.encoders import RecordSet, encode_rows
 
-TData = Optional[List[Dict[str, Any]]]
+TData = Optional[Union[List[Dict[str, Any]], RecordSet]]
+
+
+class RecordJSONResponse(Response):
+    """
+    Renders the envelope in one pass: metadata through json, `data` through
+    the record encoders, without building intermediate dicts per row.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Dict[str, Any]) -> bytes:
+        content = dict(content)
+        data = encode_rows(content.pop("data", None))
+        meta = json.dumps(content, ensure_ascii=False, separators=(",", ":"))
+
+        if meta == "{}":
+            return ('{"data":' + data + "}").encode("utf-8")
+
+        return (meta[:-1] + ',"data":' + data + "}").encode("utf-8")
 
 
 class ApiResponse:
@@ -13,16 +33,20 @@ class ApiResponse:
         message: str,
         data: TData = None,
         status_code: int = 200,
-    ) -> JSONResponse:
+        next_cursor: Optional[str] = None,
+    ) -> RecordJSONResponse:
         content = {
             "success": True,
             "message": message,
-            "data": serialize_data(data) if data else [],
+            "data": data,
             "status": status_code,
             "timestamp": datetime.now().isoformat(),
         }
 
-        return JSONResponse(content=content, status_code=status_code)
+        if next_cursor is not None:
+            content["next_cursor"] = next_cursor
+
+        return RecordJSONResponse(content=content, status_code=status_code)
 
     @staticmethod
     def error(
@@ -41,20 +65,24 @@ class ApiResponse:
         return JSONResponse(status_code=status_code, content=detail)
 
     @staticmethod
-    def ok(message: str = "Success", data: TData = None) -> JSONResponse:
-        return ApiResponse.success(message, data, 200)
+    def ok(
+        message: str = "Success",
+        data: TData = None,
+        next_cursor: Optional[str] = None,
+    ) -> RecordJSONResponse:
+        return ApiResponse.success(message, data, 200, next_cursor)
 
     @staticmethod
     def created(
         message: str = "Resource created successfully",
         data: TData = None,
-    ) -> JSONResponse:
+    ) -> RecordJSONResponse:
         return ApiResponse.success(message, data, 201)
 
     @staticmethod
     def no_content(
         message: str = "Operation completed successfully", data: TData = None
-    ) -> JSONResponse:
+    ) -> RecordJSONResponse:
         return ApiResponse.success(message, data, 204)
 
     @staticmethod
@@ -85,6 +113,27 @@ class ApiResponse:
     ) -> JSONResponse:
         return ApiResponse.error(message, errors, 409)
 
+    @staticmethod
+    def precondition_failed(
+        message: str = "Precondition failed",
+        errors: TData = None,
+    ) -> JSONResponse:
+        return ApiResponse.error(message, errors, 412)
+
+    @staticmethod
+    def precondition_required(
+        message: str = "Precondition required",
+        errors: TData = None,
+    ) -> JSONResponse:
+        return ApiResponse.error(message, errors, 428)
+
+    @staticmethod
+    def too_many_requests(
+        message: str = "Too many requests",
+        errors: TData = None,
+    ) -> JSONResponse:
+        return ApiResponse.error(message, errors, 429)
+
     @staticmethod
     def internal_error(
         message: str = "Internal server error",
@@ -92,6 +141,13 @@ class ApiResponse:
     ) -> JSONResponse:
         return ApiResponse.error(message, errors, 500)
 
+    @staticmethod
+    def service_unavailable(
+        message: str = "Service unavailable",
+        errors: TData = None,
+    ) -> JSONResponse:
+        return ApiResponse.error(message, errors, 503)
+
 
 STATUS_MAP: Dict[int, Callable] = {
     200: ApiResponse.ok,
@@ -102,7 +158,11 @@ STATUS_MAP: Dict[int, Callable] = {
     403: ApiResponse.forbidden,
     404: ApiResponse.not_found,
     409: ApiResponse.conflict,
+    412: ApiResponse.precondition_failed,
+    428: ApiResponse.precondition_required,
+    429: ApiResponse.too_many_requests,
     500: ApiResponse.internal_error,
+    503: ApiResponse.service_unavailable,
 }
 
 
@@ -111,7 +171,7 @@ def from_status(
     message: Optional[str] = None,
     data: TData = None,
     errors: TData = None,
-) -> JSONResponse:
+) -> Response:
     func = STATUS_MAP.get(status_code)
 
     if not func:
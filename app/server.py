@@ -0,0 +1,125 @@
+"""
+Production entrypoint:
+
+    python -m app.server                  # one worker per available core
+    python -m app.server --workers 4 --port 8000
+
+uvicorn's supervisor forks the workers and restarts any worker that dies or
+stops answering its health pings. On SIGTERM each worker stops accepting
+connections and drains in-flight requests for up to GRACEFUL_SHUTDOWN_SECONDS.
+Only after that does the lifespan shutdown close its pool.
+
+Every worker gets an equal share of DB_CONNECTION_BUDGET (see
+app.config.pool.pool_bounds). When no budget is configured, it is derived
+from the server's max_connections minus DB_CONNECTION_HEADROOM, so that
+workers x pool size always fits on the server.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from logging import getLogger
+from typing import Optional
+
+import asyncpg
+import uvicorn
+
+from app.config.pool import reserved_connections
+from app.core.settings import settings
+
+logger = getLogger(__name__)
+
+SELECT_CONNECTION_LIMIT = """
+    SELECT current_setting('max_connections')::int
+         - current_setting('superuser_reserved_connections')::int;
+"""
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+async def server_connection_limit() -> int:
+    conn = await asyncpg.connect(
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        database=settings.DB_NAME,
+        timeout=10,
+    )
+    try:
+        return await conn.fetchval(SELECT_CONNECTION_LIMIT)
+    finally:
+        await conn.close()
+
+
+def connection_budget() -> Optional[int]:
+    if settings.DB_CONNECTION_BUDGET:
+        return settings.DB_CONNECTION_BUDGET
+
+    try:
+        limit = asyncio.run(server_connection_limit())
+    except Exception as e:
+        logger.warning(f"Could not read max_connections, running unbudgeted: {e}")
+        return None
+
+    return max(1, limit - settings.DB_CONNECTION_HEADROOM)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with N workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="defaults to WEB_CONCURRENCY, then to the available cores",
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper())
+
+    workers = args.workers or int(os.environ.get("WEB_CONCURRENCY") or 0)
+    workers = workers or available_cores()
+
+    budget = connection_budget()
+    if budget is not None:
+        # each worker needs one pool connection besides its reserved ones
+        per_worker = reserved_connections() + 1
+        if workers * per_worker > budget:
+            capped = max(1, budget // per_worker)
+            logger.warning(
+                f"A budget of {budget} connections fits {capped} workers, "
+                f"not {workers}"
+            )
+            workers = capped
+        os.environ["DB_CONNECTION_BUDGET"] = str(budget)
+
+    # read by the spawned workers when they build their settings
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+
+    logger.info(
+        f"Starting {workers} workers"
+        + (f", {budget // workers} connections each" if budget else "")
+    )
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        log_level=args.log_level,
+        proxy_headers=True,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    main()
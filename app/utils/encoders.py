@@ -0,0 +1,199 @@
+import json
+from collections import OrderedDict
+from datetime import date, datetime, time
+from decimal import Decimal
+from json.encoder import encode_basestring
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Sequence,
+    Tuple,
+)
+from uuid import UUID
+
+from app.utils.serializers import serialize_value
+
+Encoder = Callable[[Any], str]
+
+
+def _encode_text(value: str) -> str:
+    return encode_basestring(value)
+
+
+def _encode_int(value: int) -> str:
+    return int.__repr__(value)
+
+
+def _encode_float(value: float) -> str:
+    return float.__repr__(value)
+
+
+def _encode_bool(value: bool) -> str:
+    return "true" if value else "false"
+
+
+def _encode_temporal(value: Any) -> str:
+    return '"' + value.isoformat() + '"'
+
+
+def _encode_str(value: Any) -> str:
+    return encode_basestring(str(value))
+
+
+def _encode_any(value: Any) -> str:
+    return json.dumps(serialize_value(value), default=str, ensure_ascii=False)
+
+
+PY_TYPE_ENCODERS: Dict[type, Encoder] = {
+    str: _encode_text,
+    int: _encode_int,
+    float: _encode_float,
+    bool: _encode_bool,
+    datetime: _encode_temporal,
+    date: _encode_temporal,
+    time: _encode_temporal,
+    Decimal: _encode_str,
+    UUID: _encode_str,
+}
+
+
+def encode_value(value: Any) -> str:
+    if value is None:
+        return "null"
+    return PY_TYPE_ENCODERS.get(type(value), _encode_any)(value)
+
+
+def encode_mapping(row: Mapping[str, Any]) -> str:
+    return (
+        "{"
+        + ",".join(
+            encode_basestring(key) + ":" + encode_value(value)
+            for key, value in row.items()
+        )
+        + "}"
+    )
+
+
+class RecordEncoder:
+    """
+    Encodes records positionally with one encoder per column, picked once
+    from the column's Python type instead of per value.
+    """
+
+    def __init__(self, columns: Sequence[Tuple[str, type]]):
+        self.columns = tuple(columns)
+        self.__plan = [
+            (index, encode_basestring(name) + ":", PY_TYPE_ENCODERS.get(value_type))
+            for index, (name, value_type) in enumerate(self.columns)
+        ]
+
+    def encode_row(self, record: Sequence[Any]) -> str:
+        parts: List[str] = []
+        append = parts.append
+
+        for index, prefix, encoder in self.__plan:
+            value = record[index]
+            if value is None:
+                append(prefix + "null")
+            elif encoder is None:
+                append(prefix + encode_value(value))
+            else:
+                append(prefix + encoder(value))
+
+        return "{" + ",".join(parts) + "}"
+
+    def encode(self, records: Iterable[Sequence[Any]]) -> str:
+        return "[" + ",".join(map(self.encode_row, records)) + "]"
+
+
+# distinct column layouts kept at once; the least recently used go first
+MAX_RECORD_ENCODERS = 256
+
+_encoders: "OrderedDict[Tuple[Tuple[str, type], ...], RecordEncoder]" = OrderedDict()
+
+
+def encoder_for_columns(columns: Sequence[Tuple[str, type]]) -> RecordEncoder:
+    key = tuple(columns)
+    encoder = _encoders.get(key)
+    if encoder is None:
+        encoder = _encoders[key] = RecordEncoder(key)
+        if len(_encoders) > MAX_RECORD_ENCODERS:
+            _encoders.popitem(last=False)
+    else:
+        _encoders.move_to_end(key)
+    return encoder
+
+
+def encoder_for_record(record: Mapping[str, Any]) -> RecordEncoder:
+    """
+    Encoder for the result `record` belongs to. Every value of a column has
+    the type of its first non-null one, so the first record's names and
+    types describe the whole result; a column that is null there is
+    encoded value by value.
+    """
+    return encoder_for_columns([(name, type(value)) for name, value in record.items()])
+
+
+def encode_rows(rows: Any) -> str:
+    if not rows:
+        return "[]"
+
+    if isinstance(rows, RecordSet):
+        return rows.to_json()
+
+    return "[" + ",".join(map(encode_mapping, rows)) + "]"
+
+
+class RecordSet:
+    """
+    Query result kept as asyncpg records together with the encoder for its
+    statement, so it can be written to the response without dict copies.
+    """
+
+    __slots__ = ("records", "encoder")
+
+    def __init__(self, records: List[Any], encoder: RecordEncoder):
+        self.records = records
+        self.encoder = encoder
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __bool__(self) -> bool:
+        return bool(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return RecordSet(self.records[index], self.encoder)
+        return self.records[index]
+
+    def to_json(self) -> str:
+        return self.encoder.encode(self.records)
+
+
+async def stream_ndjson(
+    batches: AsyncIterator[Iterable[Mapping[str, Any]]],
+) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield "".join(encode_mapping(record) + "\n" for record in batch).encode()
+
+
+async def stream_json_array(
+    batches: AsyncIterator[Iterable[Mapping[str, Any]]],
+) -> AsyncIterator[bytes]:
+    separator = "["
+    async for batch in batches:
+        chunk = ",".join(map(encode_mapping, batch))
+        if chunk:
+            yield (separator + chunk).encode()
+            separator = ","
+
+    yield b"[]" if separator == "[" else b"]"
@@ -0,0 +1,83 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from typing import Any, Optional, Tuple, TypeVar
+
+from app.utils.serializers import serialize_value
+
+TRows = TypeVar("TRows")
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+# ids are SERIAL; anything outside int4 would fail in asyncpg, not here
+INT4_MIN, INT4_MAX = -(2**31), 2**31 - 1
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _cursor_value(value: Any, value_type: type) -> Any:
+    # bool is an int to isinstance, and never a valid sort value
+    if isinstance(value, bool):
+        raise InvalidCursorError("Invalid cursor")
+
+    if value_type is int:
+        if not isinstance(value, int) or not INT4_MIN <= value <= INT4_MAX:
+            raise InvalidCursorError("Invalid cursor")
+        return value
+
+    if value_type is float:
+        if not isinstance(value, (int, float)):
+            raise InvalidCursorError("Invalid cursor")
+        return float(value)
+
+    if not isinstance(value, value_type):
+        raise InvalidCursorError("Invalid cursor")
+    return value
+
+
+def encode_cursor(sort_value: Any, id_value: Any) -> str:
+    raw = json.dumps([serialize_value(sort_value), id_value], separators=(",", ":"))
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: Optional[str], sort_type: type = int
+) -> Optional[Tuple[Any, int]]:
+    """
+    (sort value, id) from a cursor built by encode_cursor, checked against
+    `sort_type` and an int id, so a tampered cursor is a 400 and never
+    reaches the query.
+    """
+    if not cursor:
+        return None
+
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = json.loads(urlsafe_b64decode(cursor + padding))
+    except (BinasciiError, ValueError) as e:
+        raise InvalidCursorError("Invalid cursor") from e
+
+    if not isinstance(values, list) or len(values) != 2:
+        raise InvalidCursorError("Invalid cursor")
+
+    return _cursor_value(values[0], sort_type), _cursor_value(values[1], int)
+
+
+def paginate(
+    rows: TRows, limit: int, sort_key: str, tiebreaker: str = "id"
+) -> Tuple[TRows, Optional[str]]:
+    """
+    Trims a page fetched with `limit + 1` rows and builds the cursor for the
+    next one, or None when this is the last page.
+    """
+    if len(rows) <= limit:
+        return rows, None
+
+    page = rows[:limit]
+    last = page[-1]
+
+    return page, encode_cursor(last[sort_key], last[tiebreaker])
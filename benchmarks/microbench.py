@@ -0,0 +1,331 @@
+"""
+Microbenchmarks for the per-request CPU work that needs no database: query
+building, serialization, response envelopes and request validation.
+
+    python -m benchmarks.microbench                       # this tree
+    python -m benchmarks.microbench --filter query_builder
+    python -m benchmarks.microbench --compare main HEAD   # two git revisions
+    python -m benchmarks.microbench --compare HEAD~3 . --threshold 0.05
+
+Each case is timed with the GC disabled, in repeats of enough calls to last
+--min-time seconds. It reports the median ns/op, the spread between repeats
+and the peak bytes allocated by one call (tracemalloc). CPython keeps no
+allocation counter outside debug builds, so peak bytes stand in for
+allocations/op.
+
+--compare checks each revision out in a temporary git worktree ("." is the
+working tree) and runs this same file against it. It exits 1 when a case got
+slower by more than --threshold.
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# settings are validated at import time, the values are never used here
+for _name, _value in (
+    ("DB_HOST", "localhost"),
+    ("DB_USER", "bench"),
+    ("DB_PASSWORD", "bench"),
+    ("DB_NAME", "bench"),
+    ("SECRET_KEY", "bench"),
+):
+    os.environ.setdefault(_name, _value)
+
+NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+EMPLOYEE_ROWS = [
+    {
+        "id": i,
+        "first_name": f"Nombre {i}",
+        "last_name": f"Apellido {i}",
+        "email": f"empleado{i}@taller.mx",
+        "phone": f"55{i:08d}",
+        "address": f"Calle {i}, Ciudad de México",
+        "is_active": i % 7 != 0,
+        "role_id": i % 5 + 1,
+        "created_at": NOW - timedelta(minutes=i),
+        "updated_at": NOW,
+    }
+    for i in range(1, 51)
+]
+
+EMPLOYEE_PAYLOAD = {
+    "first_name": "María",
+    "last_name": "Hernández",
+    "email": "maria.hernandez@taller.mx",
+    "phone": "5512345678",
+    "address": "Calle Madero 12, Ciudad de México",
+    "is_active": True,
+    "password": "una-contraseña-segura",
+    "role_id": 2,
+}
+
+
+def case_query_builder_select() -> Callable[[], Any]:
+    from app.database.query_builder import QueryBuilder
+
+    def run():
+        qb = QueryBuilder("user", "employees")
+        qb.select("id", "first_name", "last_name", "email", "is_active")
+        qb.where(email="empleado1@taller.mx", phone=None, is_active=True)
+        qb.where_like(first_name="Mar%", last_name=None)
+        return qb.build_select()
+
+    return run
+
+
+def case_query_builder_insert() -> Callable[[], Any]:
+    from app.database.query_builder import QueryBuilder
+
+    def run():
+        qb = QueryBuilder("user", "employees")
+        qb.insert(**EMPLOYEE_PAYLOAD)
+        return qb.build_insert(["id", "email"])
+
+    return run
+
+
+def case_query_builder_update() -> Callable[[], Any]:
+    from app.database.query_builder import QueryBuilder
+
+    def run():
+        qb = QueryBuilder("user", "roles")
+        qb.set(name="Restaurador", description="Restauración de óleos", is_active=True)
+        qb.where(id=3)
+        return qb.build_update()
+
+    return run
+
+
+def case_serialize_value() -> Callable[[], Any]:
+    from app.utils.serializers import serialize_value
+
+    return lambda: serialize_value(NOW)
+
+
+def case_serialize_data() -> Callable[[], Any]:
+    from app.utils.serializers import serialize_data
+
+    return lambda: serialize_data(EMPLOYEE_ROWS)
+
+
+def case_api_response_success() -> Callable[[], Any]:
+    from app.schemas.responses import ApiResponse
+
+    # building the response renders the body, so this covers encoding too
+    return lambda: ApiResponse.success("Success", EMPLOYEE_ROWS)
+
+
+def case_api_response_from_status() -> Callable[[], Any]:
+    from app.schemas.responses import from_status
+
+    return lambda: from_status(404, "Employee not found")
+
+
+def case_validate_create_employee() -> Callable[[], Any]:
+    from app.schemas.employees import CreateEmployeeSchema
+
+    return lambda: CreateEmployeeSchema.model_validate(EMPLOYEE_PAYLOAD)
+
+
+def case_validate_update_employee() -> Callable[[], Any]:
+    from app.schemas.employees import UpdateEmployeeSchema
+
+    payload = {**EMPLOYEE_PAYLOAD, "id": 42}
+    return lambda: UpdateEmployeeSchema.model_validate(payload)
+
+
+CASES: Dict[str, Callable[[], Callable[[], Any]]] = {
+    "query_builder.select": case_query_builder_select,
+    "query_builder.insert": case_query_builder_insert,
+    "query_builder.update": case_query_builder_update,
+    "serializers.serialize_value": case_serialize_value,
+    "serializers.serialize_data[50]": case_serialize_data,
+    "responses.success[50]": case_api_response_success,
+    "responses.from_status": case_api_response_from_status,
+    "schemas.create_employee": case_validate_create_employee,
+    "schemas.update_employee": case_validate_update_employee,
+}
+
+
+def calibrate(fn: Callable[[], Any], min_time: float) -> int:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_time:
+            return number
+        number *= 2
+
+
+def time_case(fn: Callable[[], Any], repeat: int, min_time: float) -> List[float]:
+    number = calibrate(fn, min_time)
+    timings = []
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            for _ in range(number):
+                fn()
+            timings.append((time.perf_counter_ns() - start) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return timings
+
+
+def peak_bytes(fn: Callable[[], Any], samples: int = 200) -> float:
+    fn()  # first call may fill caches, which is not per-op cost
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(samples):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return statistics.median(peaks)
+
+
+def run_cases(pattern: Optional[str], repeat: int, min_time: float) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name, factory in CASES.items():
+        if pattern and pattern not in name:
+            continue
+        try:
+            fn = factory()
+            fn()
+        except Exception as e:
+            # the case targets code this revision does not have
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+
+        timings = time_case(fn, repeat, min_time)
+        median = statistics.median(timings)
+        results[name] = {
+            "ns_per_op": median,
+            "spread": (max(timings) - min(timings)) / median if median else 0.0,
+            "peak_bytes_per_op": peak_bytes(fn),
+        }
+    return results
+
+
+def print_results(results: Dict[str, Any]):
+    for name, stats in results.items():
+        if "error" in stats:
+            print(f"  {name:<32} {stats['error']}")
+            continue
+        print(
+            f"  {name:<32} {stats['ns_per_op']:12,.0f} ns/op"
+            f"  ±{stats['spread'] * 100:4.1f}%"
+            f"  {stats['peak_bytes_per_op']:10,.0f} B/op"
+        )
+
+
+def run_revision(revision: str, args) -> Dict[str, Any]:
+    """Runs this file against `revision` in a throwaway worktree."""
+    command = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--repeat",
+        str(args.repeat),
+        "--min-time",
+        str(args.min_time),
+        "--json",
+    ]
+    if args.filter:
+        command += ["--filter", args.filter]
+
+    if revision == ".":
+        root = os.getcwd()
+        output = subprocess.check_output(command, cwd=root, env=_env(root), text=True)
+        return json.loads(output)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = os.path.join(tmp, "tree")
+        subprocess.check_call(
+            ["git", "worktree", "add", "--detach", "--quiet", worktree, revision]
+        )
+        try:
+            output = subprocess.check_output(
+                command, cwd=worktree, env=_env(worktree), text=True
+            )
+        finally:
+            subprocess.check_call(["git", "worktree", "remove", "--force", worktree])
+    return json.loads(output)
+
+
+def _env(root: str) -> Dict[str, str]:
+    return {**os.environ, "PYTHONPATH": root}
+
+
+def compare(args) -> int:
+    base_rev, head_rev = args.compare
+    print(f"Running {base_rev} ...", file=sys.stderr)
+    base = run_revision(base_rev, args)
+    print(f"Running {head_rev} ...", file=sys.stderr)
+    head = run_revision(head_rev, args)
+
+    regressions = 0
+    print(f"{'case':<34}{base_rev:>14}{head_rev:>14}   change")
+    for name in CASES:
+        a, b = base.get(name), head.get(name)
+        if a is None or b is None:
+            continue
+        if "error" in a or "error" in b:
+            print(f"  {name:<32}{'n/a':>14}{'n/a':>14}")
+            continue
+
+        change = b["ns_per_op"] / a["ns_per_op"] - 1
+        # a change inside the noise of either run is not a regression
+        noise = max(args.threshold, a["spread"], b["spread"])
+        flag = ""
+        if change > noise:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(
+            f"  {name:<32}{a['ns_per_op']:12,.0f}ns{b['ns_per_op']:12,.0f}ns"
+            f"  {change * 100:+6.1f}%"
+            f"  {b['peak_bytes_per_op'] - a['peak_bytes_per_op']:+8,.0f} B{flag}"
+        )
+
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filter", default=None, help="run cases containing this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.1)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"))
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(args))
+
+    results = run_cases(args.filter, args.repeat, args.min_time)
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+
+# app.core.settings reads these at import time; none of these tests connect
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_USER", "postgres")
+os.environ.setdefault("DB_PASSWORD", "postgres")
+os.environ.setdefault("DB_NAME", "taller_arte_test")
+os.environ.setdefault("SECRET_KEY", "test-secret")
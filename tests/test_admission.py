@@ -0,0 +1,134 @@
+import asyncio
+from typing import Any, Dict
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.config.pool import AdaptiveLimiter
+from app.core.admission import (
+    AdmissionControlMiddleware,
+    AdmissionController,
+    TokenBucket,
+    parse_route_limits,
+)
+from app.core.security import create_access_token, get_current_employee, token_cache
+from app.core.settings import settings
+
+
+def controller(**overrides) -> AdmissionController:
+    options = dict(
+        enabled=True,
+        client_rate=0,
+        client_burst=0,
+        route_limit=0,
+        route_limits={},
+        read_max_wait_ms=0,
+        write_max_wait_ms=0,
+    )
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(2, now=0.0)
+
+    assert bucket.take(1.0, 2, now=0.0) == 0
+    assert bucket.take(1.0, 2, now=0.0) == 0
+    assert bucket.take(1.0, 2, now=0.0) == 1.0
+    assert bucket.take(1.0, 2, now=0.5) == 0.5
+    assert bucket.take(1.0, 2, now=1.0) == 0
+
+
+def test_token_bucket_caps_at_burst():
+    bucket = TokenBucket(0, now=0.0)
+
+    bucket.take(1.0, 2, now=100.0)
+
+    assert bucket.tokens == 1
+
+
+def test_parse_route_limits():
+    assert parse_route_limits(" get /api/v1/x/{id}=4, POST /api/v1/x=2,") == {
+        "GET /api/v1/x/{id}": 4,
+        "POST /api/v1/x": 2,
+    }
+    assert parse_route_limits("") == {}
+
+
+def test_client_over_its_burst_is_throttled():
+    admission = controller(client_rate=0.001, client_burst=1)
+
+    assert admission.admit("10.0.0.1", "GET", "GET /x") is None
+    throttled = admission.admit("10.0.0.1", "GET", "GET /x")
+
+    assert throttled.status_code == 429
+    assert int(throttled.headers["Retry-After"]) >= 1
+    assert admission.admit("10.0.0.2", "GET", "GET /x") is None
+
+
+def test_route_at_capacity_is_shed_until_released():
+    admission = controller(route_limit=1, route_limits={"POST /x": 2})
+
+    assert admission.admit("a", "GET", "GET /x") is None
+    assert admission.admit("a", "GET", "GET /x").status_code == 503
+    assert admission.admit("a", "POST", "POST /x") is None
+    assert admission.admit("a", "POST", "POST /x") is None
+
+    admission.release("GET /x")
+
+    assert admission.admit("a", "GET", "GET /x") is None
+    stats = admission.stats()
+    assert stats["admitted"] == 4
+    assert stats["shed_route"] == 1
+    assert stats["in_flight"] == 3
+
+
+def test_priority_waiters_are_served_first():
+    async def scenario():
+        limiter = AdaptiveLimiter(1)
+        order = []
+
+        async def worker(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+            limiter.release()
+
+        await limiter.acquire()
+        tasks = [
+            asyncio.create_task(worker("r1", False)),
+            asyncio.create_task(worker("w1", True)),
+            asyncio.create_task(worker("r2", False)),
+            asyncio.create_task(worker("w2", True)),
+        ]
+        await asyncio.sleep(0)
+        assert limiter.waiters == 4
+        assert limiter.waiters_ahead(priority=True) == 2
+
+        limiter.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["w1", "w2", "r1", "r2"]
+
+
+def test_bearer_token_is_verified_once_per_request():
+    app = FastAPI()
+
+    @app.get(f"{settings.API_V1_STR}/me")
+    async def me(claims: Dict[str, Any] = Depends(get_current_employee)):
+        return {"sub": claims["sub"]}
+
+    app.add_middleware(AdmissionControlMiddleware, routes=app.routes)
+    client = TestClient(app)
+    token_cache.clear()
+
+    def lookups() -> int:
+        return token_cache.hits + token_cache.misses
+
+    for token, expected in [(create_access_token(42), 200), ("junk", 401)]:
+        before = lookups()
+        response = client.get(
+            f"{settings.API_V1_STR}/me", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == expected
+        assert lookups() == before + 1
@@ -0,0 +1,195 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core import audit
+from app.core.audit import AUDIT_COLUMNS, AuditLog
+from app.core.security import _current_claims
+
+
+class FakeQueryManager:
+    """Stands in for QueryManager in app.core.audit; failures come first."""
+
+    copies = []
+    failures = 0
+
+    async def copy_records(self, table, records, columns, schema):
+        if FakeQueryManager.failures:
+            FakeQueryManager.failures -= 1
+            raise ConnectionError("database is down")
+        FakeQueryManager.copies.append([dict(zip(columns, r)) for r in records])
+
+
+@pytest.fixture(autouse=True)
+def fake_database(monkeypatch):
+    FakeQueryManager.copies = []
+    FakeQueryManager.failures = 0
+    monkeypatch.setattr(audit, "QueryManager", FakeQueryManager)
+    monkeypatch.setattr(audit, "RETRY_DELAY_SECONDS", 0.01)
+
+
+def audit_log(**overrides) -> AuditLog:
+    options = dict(
+        max_size=100,
+        batch_size=10,
+        interval=60.0,
+        overflow="block",
+        block_timeout=1.0,
+        flush_on_shutdown=True,
+        max_attempts=3,
+    )
+    options.update(overrides)
+    return AuditLog(**options)
+
+
+def flushed_events():
+    return [event for copy in FakeQueryManager.copies for event in copy]
+
+
+def test_full_batch_is_flushed_without_waiting_for_the_interval():
+    log = audit_log(batch_size=2)
+
+    async def scenario():
+        log.start()
+        await log.record_many("create", "employees", [(1, {}), (2, {})])
+        await asyncio.sleep(0.05)
+        assert log.stats()["flushed"] == 2
+        await log.shutdown()
+
+    asyncio.run(scenario())
+
+    assert [len(copy) for copy in FakeQueryManager.copies] == [2]
+
+
+def test_events_carry_the_actor_and_redact_passwords():
+    log = audit_log()
+
+    async def scenario():
+        _current_claims.set({"sub": "5"})
+        log.start()
+        await log.record("update", "employees", 9, {"email": "a@b.mx", "password": "x"})
+        await log.shutdown()
+
+    asyncio.run(scenario())
+
+    [event] = flushed_events()
+    assert list(event) == AUDIT_COLUMNS
+    assert (event["actor_id"], event["action"], event["entity_id"]) == (5, "update", 9)
+    assert json.loads(event["changes"]) == {
+        "email": "a@b.mx",
+        "password": "[redacted]",
+    }
+
+
+def test_interval_flushes_a_partial_batch():
+    log = audit_log(interval=0.01)
+
+    async def scenario():
+        log.start()
+        await log.record("delete", "roles", 3)
+        await asyncio.sleep(0.1)
+        assert log.stats()["queued"] == 0
+        await log.shutdown()
+
+    asyncio.run(scenario())
+
+    assert flushed_events()[0]["changes"] is None
+
+
+def test_drop_mode_sheds_events_past_max_size():
+    log = audit_log(max_size=2, overflow="drop")
+
+    async def scenario():
+        await log.record_many("create", "roles", [(n, None) for n in range(5)])
+
+    asyncio.run(scenario())
+
+    assert log.stats()["queued"] == 2
+    assert log.stats()["dropped"] == 3
+
+
+def test_block_mode_shares_one_deadline_per_call():
+    FakeQueryManager.failures = 100
+    log = audit_log(max_size=1, block_timeout=0.1, max_attempts=100)
+
+    async def scenario():
+        log.start()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await log.record_many("create", "roles", [(n, None) for n in range(4)])
+        elapsed = loop.time() - start
+        log.flush_on_shutdown = False
+        await log.shutdown()
+        return elapsed
+
+    elapsed = asyncio.run(scenario())
+
+    assert elapsed < 0.3
+    assert log.stats()["blocked"] == 3
+    assert log.stats()["dropped"] == 3
+
+
+def test_failed_flush_is_retried_then_stored():
+    FakeQueryManager.failures = 2
+    log = audit_log(batch_size=1)
+
+    async def scenario():
+        log.start()
+        await log.record("create", "roles", 1)
+        await asyncio.sleep(0.1)
+        await log.shutdown()
+
+    asyncio.run(scenario())
+
+    assert len(flushed_events()) == 1
+    assert log.stats()["flush_failures"] == 2
+    assert log.stats()["dead_lettered"] == 0
+
+
+def test_batch_that_keeps_failing_is_dead_lettered(caplog):
+    FakeQueryManager.failures = 100
+    log = audit_log(batch_size=1, max_attempts=2)
+
+    async def scenario():
+        log.start()
+        await log.record("create", "roles", 1, {"name": "ops"})
+        await log.record("create", "roles", 2, {"name": "qa"})
+        await asyncio.sleep(0.1)
+        await log.shutdown()
+
+    with caplog.at_level("ERROR", logger="app.core.audit.dead_letter"):
+        asyncio.run(scenario())
+
+    assert flushed_events() == []
+    assert log.stats()["dead_lettered"] == 2
+    assert log.stats()["queued"] == 0
+    dead = [r for r in caplog.records if r.name == "app.core.audit.dead_letter"]
+    assert [json.loads(r.getMessage())["entity_id"] for r in dead] == [1, 2]
+
+
+def test_shutdown_drains_the_queue():
+    log = audit_log()
+
+    async def scenario():
+        log.start()
+        await log.record_many("create", "roles", [(n, None) for n in range(25)])
+        await log.shutdown()
+
+    asyncio.run(scenario())
+
+    assert [len(copy) for copy in FakeQueryManager.copies] == [10, 10, 5]
+
+
+def test_shutdown_without_flush_discards_the_queue():
+    log = audit_log(flush_on_shutdown=False)
+
+    async def scenario():
+        log.start()
+        await log.record("create", "roles", 1)
+        await log.shutdown()
+
+    asyncio.run(scenario())
+
+    assert flushed_events() == []
+    assert log.stats()["queued"] == 0
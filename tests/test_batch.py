@@ -0,0 +1,156 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.config.replicas import RequestConsistency, _consistency
+from app.database.batch import (
+    Statement,
+    fuse,
+    fused_cache,
+    is_read_only,
+    returns_rows,
+    unpack_fused,
+)
+from app.database.query_cache import query_cache
+from app.database.query_manager import QueryManager
+
+
+def test_fuse_renumbers_placeholders_across_statements():
+    batch, params = fuse(
+        [
+            Statement(
+                "INSERT INTO t (a, b) VALUES ($1, $2) RETURNING id", (1, 2), "new"
+            ),
+            Statement("UPDATE u SET x = $1 WHERE id = $2", ("x", 7)),
+            Statement("SELECT * FROM v WHERE a = $1", (3,)),
+        ]
+    )
+
+    assert params == (1, 2, "x", 7, 3)
+    assert batch.compiled.param_count == 5
+    assert "VALUES ($1, $2)" in batch.compiled.sql
+    assert "SET x = $3 WHERE id = $4" in batch.compiled.sql
+    assert "WHERE a = $5" in batch.compiled.sql
+    assert batch.names == ("new", "s1", "s2")
+    assert batch.returns_rows == (True, False, True)
+
+
+def test_fuse_counts_dml_without_returning():
+    batch, _ = fuse([Statement("DELETE FROM t WHERE id = $1;", (1,), "gone")])
+
+    assert "DELETE FROM t WHERE id = $1 RETURNING 1" in batch.compiled.sql
+    assert "(SELECT count(*) FROM gone) AS gone_count" in batch.compiled.sql
+
+
+def test_fuse_rejects_statements_that_cannot_be_ctes():
+    with pytest.raises(ValueError):
+        fuse([Statement("CREATE TABLE t (id int)")])
+
+
+@pytest.mark.parametrize(
+    "names", [("a", "a"), ("Bad-Name", "b"), ("1st", "b")], ids=str
+)
+def test_fuse_validates_statement_names(names):
+    with pytest.raises(ValueError):
+        fuse([Statement("SELECT 1", (), name) for name in names])
+
+
+def test_returns_rows():
+    assert returns_rows("SELECT 1")
+    assert returns_rows("  (SELECT 1)")
+    assert returns_rows("UPDATE t SET a = 1 RETURNING id")
+    assert not returns_rows("UPDATE t SET a = 1")
+
+
+def test_unpack_fused_pairs_columns_with_rows():
+    batch, _ = fuse(
+        [
+            Statement("SELECT id, name FROM t", (), "listed"),
+            Statement("UPDATE t SET a = 1", (), "touched"),
+            Statement("SELECT id FROM t WHERE false", (), "empty"),
+        ]
+    )
+    record = {
+        "listed_rows": [(1, "a"), (2, "b")],
+        "listed_columns": ["id", "name"],
+        "touched_count": 4,
+        "empty_rows": None,
+        "empty_columns": None,
+    }
+
+    listed, touched, empty = unpack_fused(batch, record)
+
+    assert listed.rows == [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+    assert listed.rowcount == 2
+    assert touched.rows == [] and touched.rowcount == 4
+    assert empty.rows == [] and empty.rowcount == 0
+
+
+def test_fused_batches_have_their_own_cache():
+    statements = [Statement("SELECT 1", (), "one"), Statement("SELECT 2", (), "two")]
+    shapes = query_cache.stats()["size"]
+
+    first, _ = fuse(statements)
+    second, _ = fuse(statements)
+
+    assert second is first
+    assert fused_cache.stats()["hits"] >= 1
+    assert query_cache.stats()["size"] == shapes
+
+
+@pytest.mark.parametrize(
+    "queries, read_only",
+    [
+        (["SELECT 1", " (SELECT 2)"], True),
+        (["SELECT 1", "UPDATE t SET a = 1"], False),
+        (["SELECT id FROM t WHERE id = $1 FOR UPDATE"], False),
+        (["SELECT id FROM t FOR NO KEY UPDATE SKIP LOCKED"], False),
+        (["WITH d AS (DELETE FROM t RETURNING id) SELECT * FROM d"], False),
+    ],
+)
+def test_only_plain_selects_are_read_only(queries, read_only):
+    assert is_read_only([Statement(query) for query in queries]) is read_only
+
+
+class FakeConnection:
+    async def fetch(self, query, *params):
+        return [{"id": 1}]
+
+    async def execute(self, query, *params):
+        return "UPDATE 1"
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class FakeRequestConnection:
+    def __init__(self):
+        self.acquired = []
+
+    async def acquire(self, readonly: bool = False):
+        self.acquired.append(readonly)
+        return FakeConnection()
+
+
+@pytest.mark.parametrize(
+    "queries, readonly",
+    [
+        (["SELECT id FROM t", "SELECT id FROM u"], True),
+        (["SELECT id FROM t", "UPDATE t SET a = 1"], False),
+    ],
+)
+def test_batch_routes_like_its_statements(queries, readonly):
+    db = FakeRequestConnection()
+    state = RequestConsistency(read_your_writes=True)
+
+    async def scenario():
+        _consistency.set(state)
+        return await QueryManager(db=db).batch([Statement(q) for q in queries])
+
+    results = asyncio.run(scenario())
+
+    assert db.acquired == [readonly]
+    assert state.wrote is not readonly
+    assert [result.rowcount for result in results] == [1, 1]
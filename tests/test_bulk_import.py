@@ -0,0 +1,49 @@
+import pytest
+
+from app.modules.auth.employees.bulk_import import (
+    BulkPayloadError,
+    parse_rows,
+    to_staging_record,
+    validate_rows,
+)
+
+EMPLOYEE = {
+    "first_name": "Ana",
+    "last_name": "Pérez",
+    "email": "ana@taller.mx",
+    "password": "s3cret-pass",
+    "role_id": 2,
+}
+
+
+def test_csv_rows_drop_empty_cells():
+    body = "\ufefffirst_name,phone,role_id\nAna,,2\n".encode()
+
+    assert parse_rows("text/csv; charset=utf-8", body) == [
+        {"first_name": "Ana", "role_id": "2"}
+    ]
+
+
+@pytest.mark.parametrize(
+    "body", [b"\xff", b"{not json", b'{"email": "a@b.mx"}', b"[1, 2]"]
+)
+def test_unusable_payloads_are_rejected(body):
+    with pytest.raises(BulkPayloadError):
+        parse_rows("application/json", body)
+
+
+def test_validation_numbers_rows_from_one():
+    valid, rejected = validate_rows([EMPLOYEE, {**EMPLOYEE, "email": "nope"}])
+
+    assert [row_num for row_num, _ in valid] == [1]
+    assert rejected[0]["row"] == 2
+    assert rejected[0]["errors"][0]["field"] == "email"
+
+
+def test_staging_record_carries_the_hash_not_the_password():
+    [(row_num, payload)], _ = validate_rows([EMPLOYEE])
+
+    record = to_staging_record(row_num, payload, "$2b$hash")
+
+    assert record[0] == 1
+    assert "$2b$hash" in record and EMPLOYEE["password"] not in record
@@ -0,0 +1,64 @@
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from uuid import UUID
+
+from app.utils.encoders import (
+    RecordSet,
+    encode_rows,
+    encode_value,
+    encoder_for_columns,
+    encoder_for_record,
+)
+from app.utils.serializers import serialize_data
+
+ROW = {
+    "id": 7,
+    "name": 'Ana "La" Pérez\n',
+    "is_active": True,
+    "ratio": 0.25,
+    "hired_on": date(2024, 5, 1),
+    "updated_at": datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    "phone": None,
+}
+
+
+def test_mapping_rows_match_serialize_data():
+    assert json.loads(encode_rows([ROW])) == serialize_data([ROW])
+
+
+def test_record_encoder_matches_serialize_data():
+    encoder = encoder_for_record(ROW)
+    records = [tuple(ROW.values()), (8, "Luis", False, 1.0, None, None, "555")]
+
+    encoded = RecordSet(records, encoder).to_json()
+
+    assert json.loads(encoded) == serialize_data(
+        [dict(zip(ROW, record)) for record in records]
+    )
+
+
+def test_decimals_and_uuids_are_encoded_as_exact_strings():
+    token = UUID("12345678-1234-5678-1234-567812345678")
+
+    assert encode_value(Decimal("1234.50")) == '"1234.50"'
+    assert encode_value(token) == f'"{token}"'
+
+
+def test_null_first_value_falls_back_to_per_value_encoding():
+    encoder = encoder_for_columns([("id", int), ("phone", type(None))])
+
+    assert json.loads(encoder.encode([(1, None), (2, "555")])) == [
+        {"id": 1, "phone": None},
+        {"id": 2, "phone": "555"},
+    ]
+
+
+def test_encoders_are_shared_per_column_layout():
+    assert encoder_for_columns([("id", int)]) is encoder_for_columns([("id", int)])
+    assert encoder_for_columns([("id", int)]) is not encoder_for_columns([("id", str)])
+
+
+def test_empty_rows():
+    assert encode_rows([]) == "[]"
+    assert encode_rows(None) == "[]"
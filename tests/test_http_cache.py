@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.http_cache import (
+    PreconditionError,
+    etag_matches,
+    if_match_version,
+    not_modified,
+    row_etag,
+    with_etag,
+)
+from app.database.seeder_query import (
+    CREATE_FUNCTION_BUMP_TABLE_VERSION_ON_COMMIT_EXCLUDED,
+    MIGRATIONS,
+)
+from app.schemas.responses import ApiResponse
+
+UPDATED_AT = datetime(2026, 3, 4, 5, 6, 7, 890000, tzinfo=timezone.utc)
+
+
+def test_etag_matches_uses_weak_comparison():
+    assert etag_matches('"1.2"', '"1.2"')
+    assert etag_matches('W/"1.2"', '"1.2"')
+    assert etag_matches('"0.1", "1.2"', '"1.2"')
+    assert etag_matches("*", '"1.2"')
+    assert not etag_matches('"1.3"', '"1.2"')
+    assert not etag_matches(None, '"1.2"')
+
+
+def test_not_modified_carries_the_validator():
+    response = not_modified('"3.4"')
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"3.4"'
+    assert response.headers["Cache-Control"] == "no-cache, must-revalidate"
+
+
+def test_only_successful_responses_get_an_etag():
+    assert with_etag(ApiResponse.ok(), '"1"').headers["ETag"] == '"1"'
+    assert "ETag" not in with_etag(ApiResponse.not_found(), '"1"').headers
+
+
+def test_a_bump_takes_one_sequence_value():
+    sql = CREATE_FUNCTION_BUMP_TABLE_VERSION_ON_COMMIT_EXCLUDED
+
+    assert sql.count("nextval(") == 1
+    assert "SET version = EXCLUDED.version" in sql
+    assert ("function_bump_table_version_on_commit_excluded", sql) in MIGRATIONS
+
+
+def test_if_match_round_trips_row_etag():
+    assert if_match_version(row_etag(UPDATED_AT)) == UPDATED_AT
+    assert if_match_version(UPDATED_AT.isoformat()) == UPDATED_AT
+
+
+def test_if_match_star_only_requires_the_row():
+    assert if_match_version("*") is None
+
+
+@pytest.mark.parametrize(
+    "if_match",
+    [
+        None,
+        "",
+        'W/"2026-03-04T05:06:07+00:00"',
+        '"a", "b"',
+        '"not a date"',
+        '"2026-03-04T05:06:07"',
+    ],
+)
+def test_if_match_rejects_unusable_headers(if_match):
+    with pytest.raises(PreconditionError):
+        if_match_version(if_match)
@@ -0,0 +1,28 @@
+from app.core import metrics as metrics_module
+from app.core.metrics import OVERFLOW_QUERY_ID, MetricsRegistry, query_fingerprint
+
+
+def test_series_carry_the_fingerprint_not_the_sql():
+    registry = MetricsRegistry(1000)
+    query = "SELECT secret_column FROM t WHERE id = $1"
+
+    registry.observe_query(query, 0.002, rows=1)
+    rendered = registry.render()
+
+    assert f'query_id="{query_fingerprint(query)}"' in rendered
+    assert "secret_column" not in rendered
+
+
+def test_shapes_past_the_limit_share_one_overflow_series(monkeypatch):
+    monkeypatch.setattr(metrics_module, "MAX_QUERY_SHAPES", 2)
+    registry = MetricsRegistry(1000)
+
+    for n in range(5):
+        registry.observe_query(f"SELECT {n}", 0.001, rows=1)
+
+    queries = registry.queries()
+    assert [q.query_id for q in queries][-1] == OVERFLOW_QUERY_ID
+    assert len(queries) == 3
+    assert queries[-1].latency.count == 3
+    assert queries[-1].rows == 3
+    assert registry.render().count('db_query_rows_total{query_id="other"}') == 1
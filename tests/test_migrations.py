@@ -0,0 +1,28 @@
+import pytest
+
+from app.database.migrations import Migration, MigrationDriftError, _pending
+
+STEPS = [
+    Migration("0001_schemas", "CREATE SCHEMA IF NOT EXISTS app;"),
+    Migration("0002_tables", "CREATE TABLE IF NOT EXISTS app.t (id int);"),
+]
+
+
+def test_checksum_ignores_surrounding_whitespace():
+    padded = Migration("a", " SELECT 1;\n")
+
+    assert padded.checksum == Migration("a", "SELECT 1;").checksum
+
+
+def test_pending_skips_applied_steps():
+    applied = {STEPS[0].name: STEPS[0].checksum}
+
+    assert _pending(STEPS, applied) == [STEPS[1]]
+    assert _pending(STEPS, {}) == STEPS
+
+
+def test_edited_applied_step_is_drift():
+    applied = {STEPS[0].name: STEPS[0].checksum, STEPS[1].name: "0" * 64}
+
+    with pytest.raises(MigrationDriftError, match="0002_tables"):
+        _pending(STEPS, applied)
@@ -0,0 +1,69 @@
+import json
+from base64 import urlsafe_b64encode
+from datetime import datetime, timezone
+
+import pytest
+
+from app.utils.pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+    paginate,
+)
+
+
+def raw_cursor(value) -> str:
+    return urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42, 42)) == (42, 42)
+    assert decode_cursor(encode_cursor(0.75, 9), float) == (0.75, 9)
+
+
+def test_cursor_serializes_datetimes():
+    moment = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    assert decode_cursor(encode_cursor(moment, 1), str) == (moment.isoformat(), 1)
+
+
+def test_empty_cursor_is_the_first_page():
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+
+def test_float_cursor_accepts_integral_scores():
+    assert decode_cursor(raw_cursor([1, 2]), float) == (1.0, 2)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64 !",
+        raw_cursor({"id": 1}),
+        raw_cursor([1, 2, 3]),
+        raw_cursor(["x", {}]),
+        raw_cursor([1, "2"]),
+        raw_cursor([True, 1]),
+        raw_cursor([1, 2**40]),
+        raw_cursor([1.5, 1]),
+    ],
+)
+def test_tampered_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def test_paginate_trims_the_lookahead_row():
+    rows = [{"id": i} for i in range(1, 5)]
+
+    page, cursor = paginate(rows, 3, "id")
+
+    assert page == rows[:3]
+    assert decode_cursor(cursor) == (3, 3)
+
+
+def test_paginate_last_page_has_no_cursor():
+    rows = [{"id": 1}, {"id": 2}]
+
+    assert paginate(rows, 2, "id") == (rows, None)
@@ -0,0 +1,74 @@
+import asyncio
+
+import bcrypt
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import PasswordHasher
+
+
+def run(hasher: PasswordHasher, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await hasher.shutdown()
+
+    return asyncio.run(main())
+
+
+def test_hash_and_verify_off_the_event_loop():
+    hasher = PasswordHasher(workers=1, rounds=4, max_pending=4)
+
+    async def scenario():
+        hashed = await hasher.hash("s3cret-pass")
+        valid = await hasher.verify("s3cret-pass", hashed)
+        invalid = await hasher.verify("wrong-pass", hashed)
+        return hashed, valid, invalid
+
+    hashed, valid, invalid = run(hasher, scenario)
+
+    assert hashed.startswith("$2b$04$")
+    assert (valid, invalid) == (True, False)
+    assert hasher.stats()["hashed"] == 1
+    assert hasher.stats()["verified"] == 2
+
+
+def test_long_passwords_are_truncated_like_bcrypt_4():
+    hasher = PasswordHasher(workers=1, rounds=4, max_pending=4)
+    password = "x" * 80
+
+    async def scenario():
+        hashed = await hasher.hash(password)
+        return await hasher.verify("x" * 72, hashed)
+
+    assert run(hasher, scenario)
+
+
+def test_malformed_hash_does_not_verify():
+    hasher = PasswordHasher(workers=1, rounds=4, max_pending=4)
+
+    assert not run(hasher, lambda: hasher.verify("s3cret-pass", "not a hash"))
+
+
+def test_single_operations_are_rejected_past_max_pending():
+    hasher = PasswordHasher(workers=1, rounds=4, max_pending=0)
+
+    with pytest.raises(HTTPException) as error:
+        run(hasher, lambda: hasher.hash("s3cret-pass"))
+
+    assert error.value.status_code == 503
+    assert error.value.headers == {"Retry-After": "1"}
+    assert hasher.stats()["rejected"] == 1
+
+
+def test_hash_many_keeps_the_input_order():
+    hasher = PasswordHasher(workers=2, rounds=4, max_pending=1)
+    passwords = [f"password-{n}" for n in range(5)]
+
+    hashes = run(hasher, lambda: hasher.hash_many(passwords, chunk_size=2))
+
+    assert len(hashes) == 5
+    for password, hashed in zip(passwords, hashes):
+        assert bcrypt.checkpw(password.encode(), hashed.encode())
+    assert hasher.stats()["hashed"] == 5
@@ -0,0 +1,76 @@
+import pytest
+from pydantic import ValidationError
+
+from app.database.patch import build_bulk_update, returning_columns, row_patches
+from app.schemas.auth import BulkPatchRole
+from app.schemas.employees import BulkPatchEmployee
+
+
+def test_returning_columns_always_lead_with_key_and_version():
+    allowed = ("id", "email", "phone", "updated_at")
+
+    assert returning_columns(None, allowed) == ["id", "updated_at"]
+    assert returning_columns(" phone,email,id ", allowed) == [
+        "id",
+        "updated_at",
+        "phone",
+        "email",
+    ]
+
+
+def test_returning_columns_rejects_unknown_fields():
+    with pytest.raises(ValueError, match="password"):
+        returning_columns("email,password", ("id", "email", "updated_at"))
+
+
+def test_row_patches_keep_only_the_fields_sent():
+    items = [
+        BulkPatchEmployee(id=1, changes={"phone": None}),
+        BulkPatchEmployee(
+            id=2, updated_at="2026-01-01T00:00:00+00:00", changes={"is_active": False}
+        ),
+    ]
+
+    first, second = row_patches(items)
+
+    assert first.values == {"phone": None} and first.version is None
+    assert second.values == {"is_active": False}
+    assert second.version.year == 2026
+
+
+@pytest.mark.parametrize(
+    "items",
+    [
+        [],
+        [{"id": 1, "changes": {}}],
+        [
+            {"id": 1, "changes": {"phone": None}},
+            {"id": 1, "changes": {"address": None}},
+        ],
+    ],
+)
+def test_row_patches_rejects_unusable_requests(items):
+    with pytest.raises(ValueError):
+        row_patches([BulkPatchEmployee(**item) for item in items])
+
+
+def test_bulk_update_text_depends_on_the_column_set_only():
+    types = {"email": "text", "is_active": "bool"}
+
+    query = build_bulk_update("user", "employees", ("email", "is_active"), types)
+
+    assert "unnest($1::int[], $2::timestamptz[], $3::text[], $4::bool[])" in query
+    assert "SET email = u.email, is_active = u.is_active" in query
+    again = build_bulk_update("user", "employees", ("email", "is_active"), types)
+    assert again is query
+
+
+@pytest.mark.parametrize("schema", [BulkPatchEmployee, BulkPatchRole])
+def test_bulk_versions_need_a_utc_offset(schema):
+    with pytest.raises(ValidationError, match="timezone"):
+        schema(id=1, updated_at="2026-01-01T00:00:00", changes={"is_active": True})
+
+    item = schema(
+        id=1, updated_at="2026-01-01T00:00:00-06:00", changes={"is_active": True}
+    )
+    assert item.updated_at.utcoffset() is not None
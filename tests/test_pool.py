@@ -0,0 +1,83 @@
+import asyncio
+
+from app.config.pool import AdaptiveLimiter, AdaptivePoolController
+
+
+def test_resize_wakes_waiters_and_tracks_peak():
+    async def scenario():
+        limiter = AdaptiveLimiter(1)
+        await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        limiter.resize(2)
+        await waiting
+        assert limiter.in_use == 2
+        assert limiter.reset_peak() == 2
+
+        limiter.release()
+        limiter.release()
+        assert limiter.reset_peak() == 2
+        assert limiter.peak_in_use == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        limiter = AdaptiveLimiter(1)
+        await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert limiter.waiters == 0
+
+        limiter.release()
+        assert limiter.in_use == 0
+
+    asyncio.run(scenario())
+
+
+def controller(limit: int, in_use: int = 0) -> AdaptivePoolController:
+    limiter = AdaptiveLimiter(limit)
+    limiter.in_use = limiter.peak_in_use = in_use
+    return AdaptivePoolController(
+        limiter, min_size=2, max_size=10, target_wait=0.01, interval=5
+    )
+
+
+def test_controller_grows_the_limit_when_requests_queue():
+    pool = controller(limit=4, in_use=4)
+    for _ in range(10):
+        pool.record_wait(0.05)
+
+    pool.adjust()
+    assert pool.limiter.limit == 5
+
+    pool.limiter.limit = 9
+    pool.record_wait(0.05)
+    pool.adjust()
+    assert pool.limiter.limit == 10
+
+
+def test_controller_shrinks_an_idle_pool_down_to_min_size():
+    pool = controller(limit=3)
+
+    pool.adjust()
+    pool.adjust()
+    pool.adjust()
+
+    assert pool.limiter.limit == 2
+
+
+def test_controller_holds_a_busy_pool_within_target():
+    pool = controller(limit=4, in_use=3)
+    pool.record_wait(0.001)
+
+    pool.adjust()
+
+    assert pool.limiter.limit == 4
+    assert pool.p99_wait() == 0.001
@@ -0,0 +1,37 @@
+from app.core.query_advisor import Predicates, suggest_indexes
+
+QUERY = (
+    'SELECT id FROM "user".employees WHERE is_active = $1 AND role_id = $2 '
+    "AND email ILIKE $3 ORDER BY id ASC LIMIT $4"
+)
+
+
+def test_predicates_are_read_from_the_sql():
+    predicates = Predicates(QUERY, (True, 3, "%a%", 51))
+
+    assert predicates.equal == ["role_id"]
+    assert predicates.ilike == ["email"]
+    assert predicates.flags == [("is_active", True)]
+    assert predicates.order_by == "id"
+
+
+def test_suggestions_are_partial_on_boolean_flags():
+    suggestions = suggest_indexes(
+        "user", "employees", Predicates(QUERY, (True, 3, "%a%", 51))
+    )
+
+    assert suggestions == [
+        "CREATE INDEX CONCURRENTLY idx_employees_email_trgm_partial "
+        'ON "user".employees USING gin (email gin_trgm_ops) WHERE is_active;',
+        "CREATE INDEX CONCURRENTLY idx_employees_role_id_id_partial "
+        'ON "user".employees USING btree (role_id, id) WHERE is_active;',
+    ]
+
+
+def test_ilike_alone_only_suggests_the_trigram_index():
+    query = 'SELECT id FROM "user".roles WHERE name ILIKE $1 ORDER BY id'
+
+    assert suggest_indexes("user", "roles", Predicates(query, ("%x%",))) == [
+        "CREATE INDEX CONCURRENTLY idx_roles_name_trgm "
+        'ON "user".roles USING gin (name gin_trgm_ops);'
+    ]
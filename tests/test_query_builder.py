@@ -0,0 +1,63 @@
+from app.database.query_builder import QueryBuilder
+
+
+def test_keyset_first_page():
+    qb = QueryBuilder("user", "employees")
+    qb.select("id", "email").where(is_active=True).keyset("id", 51)
+
+    query, params = qb.build_select()
+
+    assert query == (
+        'SELECT id, email FROM "user".employees WHERE is_active = $1 '
+        "ORDER BY id ASC LIMIT $2"
+    )
+    assert params == (True, 51)
+
+
+def test_keyset_after_cursor_on_the_tiebreaker():
+    qb = QueryBuilder("user", "employees")
+    qb.select("id").where(email="a@b.mx").keyset("id", 11, after=(40, 40))
+
+    query, params = qb.build_select()
+
+    assert query == (
+        'SELECT id FROM "user".employees WHERE email = $1 AND id > $2 '
+        "ORDER BY id ASC LIMIT $3"
+    )
+    assert params == ("a@b.mx", 40, 11)
+
+
+def test_keyset_after_cursor_on_another_column_descending():
+    qb = QueryBuilder("user", "roles")
+    qb.select("id").keyset("name", 5, after=("ops", 3), direction="DESC")
+
+    query, params = qb.build_select()
+
+    assert query == (
+        'SELECT id FROM "user".roles WHERE (name, id) < ($1, $2) '
+        "ORDER BY name DESC, id DESC LIMIT $3"
+    )
+    assert params == ("ops", 3, 5)
+
+
+def test_set_nullable_writes_none_as_null():
+    qb = QueryBuilder("user", "employees")
+    qb.set_nullable(phone=None, address="Calle 1").where(id=3)
+
+    query, params = qb.build_update(["id"])
+
+    assert query == (
+        'UPDATE "user".employees SET phone = $1, address = $2 WHERE id = $3 '
+        "RETURNING id"
+    )
+    assert params == (None, "Calle 1", 3)
+
+
+def test_set_skips_none():
+    qb = QueryBuilder("user", "roles")
+    qb.set(name="ops", description=None).where(id=1)
+
+    query, params = qb.build_update()
+
+    assert query == 'UPDATE "user".roles SET name = $1 WHERE id = $2'
+    assert params == ("ops", 1)
@@ -0,0 +1,67 @@
+import pytest
+
+from app.database.query_builder import QueryBuilder
+from app.database.query_cache import CompiledQuery, QueryCache, query_cache
+
+
+def compiled(sql):
+    return lambda: CompiledQuery(sql, 0)
+
+
+def test_query_cache_evicts_least_recently_used():
+    cache = QueryCache(max_size=2)
+
+    cache.get_or_compile("a", compiled("A"))
+    cache.get_or_compile("b", compiled("B"))
+    cache.get_or_compile("a", compiled("A"))
+    cache.get_or_compile("c", compiled("C"))
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_or_compile("a", compiled("other")).sql == "A"
+    assert cache.get_or_compile("b", compiled("B2")).sql == "B2"
+
+
+def test_query_cache_keeps_caching_past_max_size():
+    cache = QueryCache(max_size=2)
+
+    for key in "abcd":
+        cache.get_or_compile(key, compiled(key))
+    cache.get_or_compile("d", compiled("other"))
+
+    assert cache.stats() == {
+        "size": 2,
+        "hits": 1,
+        "misses": 4,
+        "evictions": 2,
+        "hit_rate": 0.2,
+    }
+
+
+def test_zero_size_cache_compiles_every_time():
+    cache = QueryCache(max_size=0)
+
+    cache.get_or_compile("a", compiled("A"))
+
+    assert cache.get_or_compile("a", compiled("A2")).sql == "A2"
+    assert cache.stats()["size"] == 0
+
+
+def test_bind_checks_the_param_count():
+    assert CompiledQuery("SELECT $1", 1).bind([5]) == (5,)
+    assert CompiledQuery("SELECT 1", 0).bind([]) is None
+    with pytest.raises(ValueError):
+        CompiledQuery("SELECT $1", 1).bind([])
+
+
+def test_builder_reuses_the_text_for_the_same_shape():
+    def build(email):
+        qb = QueryBuilder("user", "employees")
+        return qb.select("id").where(email=email).compile_select()
+
+    first, first_params = build("a@b.mx")
+    hits = query_cache.hits
+    second, second_params = build("c@d.mx")
+
+    assert second is first
+    assert query_cache.hits == hits + 1
+    assert (first_params, second_params) == (["a@b.mx"], ["c@d.mx"])
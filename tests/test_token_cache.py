@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+from jose import JWTError, jwt
+
+from app.core import security
+from app.core.security import PasswordHasher, TokenCache, create_access_token
+from app.core.settings import settings
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(security.time, "time", clock)
+    return clock
+
+
+def token(subject, expires_in: int = 600) -> str:
+    claims = {"sub": str(subject), "exp": int(time.time()) + expires_in}
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def test_second_lookup_skips_the_signature_check(clock):
+    cache = TokenCache(max_size=10, ttl_seconds=300)
+    access_token = create_access_token(7, {"role_id": 2})
+
+    first = cache.verify(access_token)
+    second = cache.verify(access_token)
+
+    assert second is first
+    assert first["sub"] == "7" and first["role_id"] == 2
+    assert (cache.hits, cache.misses, cache.verifications) == (1, 1, 1)
+
+
+def test_entries_expire_with_the_ttl(clock):
+    cache = TokenCache(max_size=10, ttl_seconds=300)
+    access_token = token(1)
+
+    cache.verify(access_token)
+    clock.now += 301
+    cache.verify(access_token)
+
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_entries_never_outlive_the_token(clock):
+    cache = TokenCache(max_size=10, ttl_seconds=300)
+    access_token = token(1, expires_in=60)
+
+    cache.verify(access_token)
+    clock.now += 61
+    cache.verify(access_token)
+
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_least_recently_used_token_is_evicted(clock):
+    cache = TokenCache(max_size=2, ttl_seconds=300)
+    tokens = [token(n) for n in range(3)]
+
+    cache.verify(tokens[0])
+    cache.verify(tokens[1])
+    cache.verify(tokens[0])
+    cache.verify(tokens[2])
+    cache.verify(tokens[0])
+    cache.verify(tokens[1])
+
+    assert cache.stats()["size"] == 2
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_invalid_tokens_are_not_cached(clock):
+    cache = TokenCache(max_size=10, ttl_seconds=300)
+
+    for _ in range(2):
+        with pytest.raises(JWTError):
+            cache.verify(token(1) + "x")
+
+    assert cache.stats()["size"] == 0
+    assert cache.misses == 2
+
+
+def test_dummy_hash_uses_the_configured_rounds():
+    hasher = PasswordHasher(workers=1, rounds=5, max_pending=4)
+
+    async def scenario():
+        try:
+            first, second = await asyncio.gather(
+                hasher.dummy_hash(), hasher.dummy_hash()
+            )
+            valid = await hasher.verify("s3cret-pass", first)
+            return first, second, valid
+        finally:
+            await hasher.shutdown()
+
+    first, second, valid = asyncio.run(scenario())
+
+    assert first.startswith("$2b$05$")
+    assert second == first
+    assert not valid
@@ -0,0 +1,61 @@
+import asyncio
+import re
+
+import asyncpg
+
+import app.main  # noqa: F401  registers every hot statement
+from app.database.warmup import HOT_STATEMENTS, warm_pool
+
+
+class FakeConnection:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.fetched = []
+
+    async def fetch(self, query, *args):
+        if self.fail:
+            raise asyncpg.UndefinedTableError("relation does not exist")
+        self.fetched.append((query, args))
+        return []
+
+
+class FakePool:
+    def __init__(self, conns):
+        self.idle = list(conns)
+        self.released = []
+
+    def get_min_size(self) -> int:
+        return len(self.idle)
+
+    async def acquire(self):
+        await asyncio.sleep(0)
+        return self.idle.pop()
+
+    async def release(self, conn):
+        self.released.append(conn)
+
+
+def test_hot_statements_are_run_with_their_text_unchanged():
+    conns = [FakeConnection(), FakeConnection()]
+    pool = FakePool(conns)
+
+    warmed = asyncio.run(warm_pool(pool))
+
+    assert warmed == 2
+    assert sorted(map(id, pool.released)) == sorted(map(id, conns))
+    for conn in conns:
+        assert conn.fetched == HOT_STATEMENTS
+
+
+def test_failed_statements_do_not_stop_the_warm_up():
+    pool = FakePool([FakeConnection(fail=True)])
+
+    assert asyncio.run(warm_pool(pool)) == 1
+    assert len(pool.released) == 1
+
+
+def test_every_hot_statement_binds_all_its_parameters():
+    assert len(HOT_STATEMENTS) >= 3
+    for query, args in HOT_STATEMENTS:
+        placeholders = {int(n) for n in re.findall(r"\$(\d+)", query)}
+        assert placeholders == set(range(1, len(args) + 1))